@@ -3,15 +3,18 @@ from __future__ import absolute_import
 import logging
 
 from django.contrib.auth.models import User
+from django.contrib.contenttypes import generic
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
 from django.db import models
 from django.db.models import Q
+from django.db.models.query import QuerySet
 from django.utils.translation import ugettext
 
 from common.models import AnonymousUserSingleton
-from permissions.models import Permission, RoleMember
+from permissions.classes import PermissionResolver
+from permissions.models import Membership, Permission
 
 from .classes import AccessHolder, ClassAccessHolder, get_source_object
 
@@ -80,32 +83,20 @@ class AccessEntryManager(models.Manager):
             # Object doesn't have a content type, therefore allow access
             return True
 
-        try:
-            self.model.objects.get(
-                permission=permission.get_stored_permission(),
-                holder_type=ContentType.objects.get_for_model(actor),
-                holder_id=actor.pk,
-                content_type=content_type,
-                object_id=obj.pk
-            )
-        except self.model.DoesNotExist:
-            # If not check if the actor's memberships is one of
-            # the access's holder?
-            roles = RoleMember.objects.get_roles_for_member(actor)
-
-            if isinstance(actor, User):
-                groups = actor.groups.all()
-            else:
-                groups = []
-
-            for membership in list(set(roles) | set(groups)):
-                if self.has_access(permission, membership, obj, db_only):
-                    return True
+        # Access granted to the actor or to any of the groups and roles
+        # it belongs to
+        access_entries = self.model.objects.filter(
+            Membership.objects.get_holder_query(actor),
+            permission=permission.get_stored_permission(),
+            content_type=content_type,
+            object_id=obj.pk
+        )
 
-            logger.debug('Fallthru')
-            return False
+        resolver = PermissionResolver.get_for(actor)
+        if resolver:
+            return resolver.resolve(('access', permission.get_stored_permission().pk, content_type.pk, obj.pk), access_entries.exists)
         else:
-            return True
+            return access_entries.exists()
 
     def check_access(self, permission, actor, obj):
         # TODO: Merge with has_access
@@ -130,53 +121,51 @@ class AccessEntryManager(models.Manager):
         raise PermissionDenied(ugettext(u'Insufficient access.'))
 
     def get_allowed_class_objects(self, permission, actor, cls, related=None):
+        """
+        Return a QuerySet of the instances of a class for which the actor
+        holds the specified permission
+        """
+        return cls.objects.filter(self.get_access_query(permission, actor, cls, related))
+
+    def get_access_query(self, permission, actor, cls, related=None):
+        """
+        Return a Q object selecting the instances of a class for which
+        the actor holds the specified permission, using subqueries on the
+        access entries so that the filtering happens in the database.
+        When related is the name of a foreign key or generic foreign key
+        of the class, the access is checked on the related object instead
+        """
         logger.debug('related: %s' % related)
 
-        actor = AnonymousUserSingleton.objects.passthru_check(actor)
-        actor_type = ContentType.objects.get_for_model(actor)
-        content_type = ContentType.objects.get_for_model(cls)
+        access_entries = self.model.objects.filter(
+            Membership.objects.get_holder_query(actor),
+            permission=permission.get_stored_permission()
+        )
 
-        # Calculate actor role membership ACL query
-        total_queries = Q()
-        for role in RoleMember.objects.get_roles_for_member(actor):
-            role_type = ContentType.objects.get_for_model(role)
-            if related:
-                query = Q(holder_type=role_type, holder_id=role.pk, permission=permission.get_stored_permission)
-            else:
-                query = Q(holder_type=role_type, holder_id=role.pk, content_type=content_type, permission=permission.get_stored_permission)
-            if not total_queries:
-                total_queries = query
-            else:
-                total_queries = total_queries | query
-
-        # Calculate actor group membership ACL query
-        if isinstance(actor, User):
-            groups = actor.groups.all()
-        else:
-            groups = []
-
-        for group in groups:
-            group_type = ContentType.objects.get_for_model(group)
-            if related:
-                query = Q(holder_type=group_type, holder_id=group.pk, permission=permission.get_stored_permission)
-            else:
-                query = Q(holder_type=group_type, holder_id=group.pk, content_type=content_type, permission=permission.get_stored_permission)
-            if not total_queries:
-                total_queries = query
-            else:
-                total_queries = total_queries | query
-
-        if related:
-            actor_query = Q(holder_type=actor_type, holder_id=actor.pk, permission=permission.get_stored_permission)
-            master_list = [obj.content_object for obj in self.model.objects.select_related().filter(actor_query | total_queries)]
-            logger.debug('master_list: %s' % master_list)
-            # TODO: update to use Q objects and check performance diff
-            # kwargs = {'%s__in' % related: master_list}
-            # Q(**kwargs)
-            return (obj for obj in cls.objects.all() if getattr(obj, related) in master_list)
-        else:
-            actor_query = Q(holder_type=actor_type, holder_id=actor.pk, content_type=content_type, permission=permission.get_stored_permission)
-            return (obj.content_object for obj in self.model.objects.filter(actor_query | total_queries))
+        if not related:
+            content_type = ContentType.objects.get_for_model(cls)
+            return Q(pk__in=access_entries.filter(content_type=content_type).values('object_id'))
+
+        for field in cls._meta.virtual_fields:
+            if field.name == related and isinstance(field, generic.GenericForeignKey):
+                # Objects of any content type can be related, match each
+                # content type with access entries separately
+                object_id_field = cls._meta.get_field(field.fk_field)
+                query = None
+                for content_type_id in access_entries.values_list('content_type', flat=True).distinct():
+                    object_ids = access_entries.filter(content_type=content_type_id).values('object_id')
+                    if not isinstance(object_id_field, models.IntegerField):
+                        # Text object keys can't be compared to the
+                        # integer object ids in the database
+                        object_ids = [unicode(object_id) for object_id in object_ids.values_list('object_id', flat=True)]
+
+                    content_type_query = Q(**{field.ct_field: content_type_id, '%s__in' % field.fk_field: object_ids})
+                    query = content_type_query if query is None else query | content_type_query
+
+                return query if query is not None else Q(pk__in=[])
+
+        content_type = ContentType.objects.get_for_model(cls._meta.get_field(related).rel.to)
+        return Q(**{'%s__in' % related: access_entries.filter(content_type=content_type).values('object_id')})
 
     def get_acl_url(self, obj):
         content_type = ContentType.objects.get_for_model(obj)
@@ -227,26 +216,23 @@ class AccessEntryManager(models.Manager):
             if actor.is_superuser or actor.is_staff:
                 return object_list
 
-        try:
-            if object_list.count() == 0:
-                return object_list
-        except TypeError:
-            # object_list is not a queryset
-            if len(object_list) == 0:
-                return object_list
-
-        try:
-            # Try to process as a QuerySet
-            qs = object_list.filter(pk__in=[obj.pk for obj in self.get_allowed_class_objects(permission, actor, object_list[0].__class__, related)])
+        if isinstance(object_list, QuerySet):
+            qs = object_list.filter(self.get_access_query(permission, actor, object_list.model, related))
             logger.debug('qs: %s' % qs)
 
-            if qs.count() == 0 and exception_on_empty:
+            if exception_on_empty and not qs.exists() and object_list.exists():
                 raise PermissionDenied
 
             return qs
-        except AttributeError:
+        else:
             # Fallback to a filtered list
-            object_list = list(set(object_list) & set(self.get_allowed_class_objects(permission, actor, object_list[0].__class__, related)))
+            object_list = list(object_list)
+            if len(object_list) == 0:
+                return object_list
+
+            cls = object_list[0].__class__
+            allowed_pks = set(self.get_allowed_class_objects(permission, actor, cls, related).filter(pk__in=[obj.pk for obj in object_list]).values_list('pk', flat=True))
+            object_list = [obj for obj in object_list if obj.pk in allowed_pks]
             logger.debug('object_list: %s' % object_list)
             if len(object_list) == 0 and exception_on_empty:
                 raise PermissionDenied
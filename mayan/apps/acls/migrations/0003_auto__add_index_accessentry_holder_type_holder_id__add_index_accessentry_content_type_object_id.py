@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding index on 'AccessEntry', fields ['holder_type', 'holder_id']
+        db.create_index(u'acls_accessentry', ['holder_type_id', 'holder_id'])
+
+        # Adding index on 'AccessEntry', fields ['content_type', 'object_id']
+        db.create_index(u'acls_accessentry', ['content_type_id', 'object_id'])
+
+    def backwards(self, orm):
+        # Removing index on 'AccessEntry', fields ['content_type', 'object_id']
+        db.delete_index(u'acls_accessentry', ['content_type_id', 'object_id'])
+
+        # Removing index on 'AccessEntry', fields ['holder_type', 'holder_id']
+        db.delete_index(u'acls_accessentry', ['holder_type_id', 'holder_id'])
+
+    models = {
+        u'acls.accessentry': {
+            'Meta': {'object_name': 'AccessEntry', 'index_together': "[('holder_type', 'holder_id'), ('content_type', 'object_id')]"},
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'object_content_type'", 'to': u"orm['contenttypes.ContentType']"}),
+            'holder_id': ('django.db.models.fields.PositiveIntegerField', [], {}),
+            'holder_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'access_holder'", 'to': u"orm['contenttypes.ContentType']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'object_id': ('django.db.models.fields.PositiveIntegerField', [], {}),
+            'permission': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['permissions.StoredPermission']"})
+        },
+        u'acls.creatorsingleton': {
+            'Meta': {'object_name': 'CreatorSingleton'},
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'acls.defaultaccessentry': {
+            'Meta': {'object_name': 'DefaultAccessEntry'},
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'default_access_entry_class'", 'to': u"orm['contenttypes.ContentType']"}),
+            'holder_id': ('django.db.models.fields.PositiveIntegerField', [], {}),
+            'holder_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'default_access_entry_holder'", 'to': u"orm['contenttypes.ContentType']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'permission': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['permissions.StoredPermission']"})
+        },
+        u'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        u'permissions.storedpermission': {
+            'Meta': {'ordering': "('namespace',)", 'unique_together': "(('namespace', 'name'),)", 'object_name': 'StoredPermission'},
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'namespace': ('django.db.models.fields.CharField', [], {'max_length': '64'})
+        }
+    }
+
+    complete_apps = ['acls']
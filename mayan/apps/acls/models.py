@@ -49,6 +49,7 @@ class AccessEntry(models.Model):
     objects = AccessEntryManager()
 
     class Meta:
+        index_together = [('holder_type', 'holder_id'), ('content_type', 'object_id')]
         verbose_name = _(u'access entry')
         verbose_name_plural = _(u'access entries')
 
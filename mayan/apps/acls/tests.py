@@ -0,0 +1,106 @@
+from __future__ import absolute_import
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.contrib.comments.models import Comment
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.utils.timezone import now
+
+from documents.models import Document, DocumentType, DocumentVersion
+from documents.permissions import PERMISSION_DOCUMENT_VIEW
+from history.models import History, HistoryType
+from permissions.models import Role
+
+from .models import AccessEntry
+
+TEST_USER_USERNAME = 'test_user'
+TEST_USER_PASSWORD = 'test_user_password'
+
+
+class AccessQueryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username=TEST_USER_USERNAME, password=TEST_USER_PASSWORD)
+        self.permission = PERMISSION_DOCUMENT_VIEW.get_stored_permission()
+        self.document_type = DocumentType.objects.create(name='test doc type')
+        self.documents = [Document.objects.create(document_type=self.document_type) for number in range(3)]
+
+    def _get_allowed_documents(self):
+        return list(AccessEntry.objects.get_allowed_class_objects(PERMISSION_DOCUMENT_VIEW, self.user, Document).order_by('pk'))
+
+    def test_no_access(self):
+        self.assertEqual(self._get_allowed_documents(), [])
+        self.assertFalse(AccessEntry.objects.has_access(PERMISSION_DOCUMENT_VIEW, self.user, self.documents[0]))
+
+    def test_direct_grant(self):
+        AccessEntry.objects.grant(self.permission, self.user, self.documents[0])
+
+        self.assertEqual(self._get_allowed_documents(), [self.documents[0]])
+        self.assertTrue(AccessEntry.objects.has_access(PERMISSION_DOCUMENT_VIEW, self.user, self.documents[0]))
+        self.assertFalse(AccessEntry.objects.has_access(PERMISSION_DOCUMENT_VIEW, self.user, self.documents[1]))
+
+        AccessEntry.objects.revoke(self.permission, self.user, self.documents[0])
+        self.assertEqual(self._get_allowed_documents(), [])
+
+    def test_group_grant(self):
+        group = Group.objects.create(name='test group')
+        AccessEntry.objects.grant(self.permission, group, self.documents[1])
+        self.assertEqual(self._get_allowed_documents(), [])
+
+        self.user.groups.add(group)
+        self.assertEqual(self._get_allowed_documents(), [self.documents[1]])
+        self.assertTrue(AccessEntry.objects.has_access(PERMISSION_DOCUMENT_VIEW, self.user, self.documents[1]))
+
+    def test_role_grant(self):
+        role = Role.objects.create(name='test_role', label='test role')
+        AccessEntry.objects.grant(self.permission, role, self.documents[2])
+        self.assertEqual(self._get_allowed_documents(), [])
+
+        role.add_member(self.user)
+        self.assertEqual(self._get_allowed_documents(), [self.documents[2]])
+
+        role.remove_member(self.user)
+        self.assertEqual(self._get_allowed_documents(), [])
+
+    def test_role_grant_through_group(self):
+        group = Group.objects.create(name='test group')
+        role = Role.objects.create(name='test_role', label='test role')
+        role.add_member(group)
+        AccessEntry.objects.grant(self.permission, role, self.documents[0])
+
+        self.user.groups.add(group)
+        self.assertEqual(self._get_allowed_documents(), [self.documents[0]])
+
+    def test_related_foreign_key(self):
+        # Without stored files, only the rows are needed
+        DocumentVersion.objects.bulk_create([DocumentVersion(document=document, file='test_%d' % document.pk, timestamp=now()) for document in self.documents])
+        versions = list(DocumentVersion.objects.order_by('document'))
+        AccessEntry.objects.grant(self.permission, self.user, self.documents[1])
+
+        allowed_versions = AccessEntry.objects.filter_objects_by_access(PERMISSION_DOCUMENT_VIEW, self.user, DocumentVersion.objects.all(), related='document')
+        self.assertEqual(list(allowed_versions), [versions[1]])
+
+        # Lists are filtered the same way
+        self.assertEqual(AccessEntry.objects.filter_objects_by_access(PERMISSION_DOCUMENT_VIEW, self.user, versions, related='document'), [versions[1]])
+
+    def test_related_generic_foreign_key(self):
+        history_type = HistoryType.objects.create(namespace='test', name='test')
+        content_type = ContentType.objects.get_for_model(Document)
+        history = [History.objects.create(content_type=content_type, object_id=document.pk, history_type=history_type) for document in self.documents]
+        # An object of another content type with the same primary key
+        History.objects.create(content_type=ContentType.objects.get_for_model(DocumentType), object_id=self.documents[0].pk, history_type=history_type)
+        AccessEntry.objects.grant(self.permission, self.user, self.documents[0])
+
+        allowed_history = AccessEntry.objects.filter_objects_by_access(PERMISSION_DOCUMENT_VIEW, self.user, History.objects.all(), related='content_object')
+        self.assertEqual(list(allowed_history), [history[0]])
+
+    def test_related_generic_foreign_key_text_object_id(self):
+        content_type = ContentType.objects.get_for_model(Document)
+        comments = [
+            Comment.objects.create(content_type=content_type, object_pk=unicode(document.pk), site_id=settings.SITE_ID, comment='test comment')
+            for document in self.documents
+        ]
+        AccessEntry.objects.grant(self.permission, self.user, self.documents[2])
+
+        allowed_comments = AccessEntry.objects.filter_objects_by_access(PERMISSION_DOCUMENT_VIEW, self.user, Comment.objects.all(), related='content_object')
+        self.assertEqual(list(allowed_comments), [comments[2]])
@@ -32,3 +32,34 @@ def apply_default_acls(obj, actor=None):
                 content_object=obj,
             )
             access_entry.save()
+
+
+def apply_default_acls_bulk(objs, actor=None):
+    """
+    Same as apply_default_acls for a list of objects of the same type,
+    the access entries of all the objects are created with a single insert
+    """
+    logger.debug('actor, init: %s' % actor)
+    objs = [get_source_object(obj) for obj in objs]
+    if not objs:
+        return
+
+    if actor:
+        actor = AnonymousUserSingleton.objects.passthru_check(actor)
+
+    content_type = ContentType.objects.get_for_model(objs[0])
+
+    access_entries = []
+    for default_acl in DefaultAccessEntry.objects.filter(content_type=content_type):
+        holder = CreatorSingleton.objects.passthru_check(default_acl.holder_object, actor)
+
+        if holder:
+            access_entries.extend(
+                AccessEntry(
+                    permission=default_acl.permission,
+                    holder_object=holder,
+                    content_object=obj,
+                ) for obj in objs
+            )
+
+    AccessEntry.objects.bulk_create(access_entries)
@@ -1,3 +1,7 @@
+import binascii
+import os
+import struct
+import time
 import zipfile
 
 try:
@@ -11,9 +15,16 @@ try:
 except ImportError:
     from StringIO import StringIO
 
+from django.core.files import File
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 
+# Size of the blocks in which files are read and compressed
+CHUNK_SIZE = 64 * 1024
+DATA_DESCRIPTOR_FLAG = 0x08
+DATA_DESCRIPTOR_SIGNATURE = 'PK\x07\x08'
+
+
 class NotACompressedFile(Exception):
     pass
 
@@ -88,13 +99,116 @@ class CompressedFile(object):
         return SimpleUploadedFile(name=filename, content=self.write().read())
 
     def children(self):
+        """
+        Return the files in the archive, each file is read from the archive
+        as it is consumed instead of being loaded in memory, so each one
+        must be read before requesting the next
+        """
         try:
             # Try for a ZIP file
             zfobj = zipfile.ZipFile(self.file_object)
             filenames = [filename for filename in zfobj.namelist() if not filename.endswith('/')]
-            return (SimpleUploadedFile(name=filename, content=zfobj.read(filename)) for filename in filenames)
+            return (self._open_child(zfobj, filename) for filename in filenames)
         except zipfile.BadZipfile:
             raise NotACompressedFile
 
+    def _open_child(self, zfobj, filename):
+        child = File(zfobj.open(filename), name=os.path.basename(filename))
+        child.size = zfobj.getinfo(filename).file_size
+        return child
+
+    def close(self):
+        self.zf.close()
+
+
+class _StreamBuffer(object):
+    """
+    Write only file like object that keeps the data written to it until
+    it is collected, and keeps count of the bytes written
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.position += len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def collect(self):
+        data = ''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ZipStream(object):
+    """
+    Write a ZIP archive sequentially as chunks of data, without holding
+    the archive or the files added to it in memory.  The checksum and
+    sizes of each file are written in a data descriptor after its content,
+    so that the archive never needs to be seeked back
+    """
+    def __init__(self, compression=COMPRESSION, chunk_size=CHUNK_SIZE):
+        self.buffer = _StreamBuffer()
+        self.zf = zipfile.ZipFile(self.buffer, mode='w', compression=compression, allowZip64=True)
+        self.chunk_size = chunk_size
+
+    def add_file(self, file_input, arcname, date_time=None):
+        """
+        Return a generator of the chunks of the archive containing the
+        file, the file is read as the chunks are consumed
+        """
+        zinfo = zipfile.ZipInfo(arcname, date_time=date_time or time.localtime(time.time())[:6])
+        zinfo.compress_type = self.zf.compression
+        zinfo.flag_bits |= DATA_DESCRIPTOR_FLAG
+        # fix for Linux zip files read in Windows
+        zinfo.create_system = 0
+        zinfo.external_attr = 0600 << 16
+        zinfo.header_offset = self.buffer.tell()
+        zinfo.CRC = zinfo.compress_size = zinfo.file_size = 0
+        self.buffer.write(zinfo.FileHeader(zip64=False))
+        yield self.buffer.collect()
+
+        if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        else:
+            compressor = None
+
+        crc = 0
+        for data in iter(lambda: file_input.read(self.chunk_size), ''):
+            crc = binascii.crc32(data, crc)
+            zinfo.file_size += len(data)
+            if compressor:
+                data = compressor.compress(data)
+
+            if data:
+                zinfo.compress_size += len(data)
+                self.buffer.write(data)
+                yield self.buffer.collect()
+
+        if compressor:
+            data = compressor.flush()
+            zinfo.compress_size += len(data)
+            self.buffer.write(data)
+
+        zinfo.CRC = crc & 0xffffffff
+        if zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT:
+            self.buffer.write(struct.pack('<4sLQQ', DATA_DESCRIPTOR_SIGNATURE, zinfo.CRC, zinfo.compress_size, zinfo.file_size))
+        else:
+            self.buffer.write(struct.pack('<4sLLL', DATA_DESCRIPTOR_SIGNATURE, zinfo.CRC, zinfo.compress_size, zinfo.file_size))
+
+        self.zf.filelist.append(zinfo)
+        self.zf.NameToInfo[zinfo.filename] = zinfo
+        yield self.buffer.collect()
+
     def close(self):
+        """
+        Return the last chunk of the archive, the central directory
+        """
         self.zf.close()
+        return self.buffer.collect()
@@ -0,0 +1,322 @@
+from __future__ import absolute_import
+
+from collections import OrderedDict
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import threading
+
+from django.utils.encoding import smart_str
+
+from .utils import fs_cleanup
+
+# Low water mark, as a fraction of the maximum size, down to which a file
+# cache is pruned once it goes over its maximum size
+DEFAULT_LOW_WATER_MARK = 0.9
+# Two levels of 256 sub directories each
+DEFAULT_SHARD_DEPTH = 2
+# Separates the group part of a key from the rest, entries of the same
+# group are stored in the same shard and can be invalidated together
+GROUP_SEPARATOR = u'-'
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache(object):
+    """
+    In-process, size bounded cache for small binary values with least
+    recently used eviction
+    """
+    def __init__(self, maximum_size=0, maximum_entry_size=None):
+        self.maximum_size = maximum_size or 0
+        self.maximum_entry_size = maximum_entry_size or self.maximum_size / 10
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        if not self.maximum_size:
+            return None
+
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            else:
+                # Reinsert to mark it as the most recently used entry
+                self._entries[key] = value
+                self.hits += 1
+                return value
+
+    def set(self, key, value):
+        if not self.maximum_size or len(value) > self.maximum_entry_size:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+
+            self._entries[key] = value
+            self.size += len(value)
+
+            while self.size > self.maximum_size:
+                evicted_key, evicted_value = self._entries.popitem(last=False)
+                self.size -= len(evicted_value)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            try:
+                self.size -= len(self._entries.pop(key))
+            except KeyError:
+                pass
+
+    def invalidate_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self.size -= len(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class FileCache(object):
+    """
+    Size bounded on disk cache of files, stored in a sharded directory
+    layout and pruned using a least recently used policy.  An optional
+    in-process memory tier keeps the contents of small, frequently read
+    entries.
+    Keys must be valid filenames, hexadecimal digests are recommended.
+    Keys in the form <group>-<name> are sharded by their group.
+    """
+    _registry = {}
+
+    @classmethod
+    def get_all(cls):
+        return cls._registry.values()
+
+    @classmethod
+    def get(cls, name):
+        return cls._registry[name]
+
+    def __init__(self, name, label, path, maximum_size=None, memory_size=0, shard_depth=DEFAULT_SHARD_DEPTH, low_water_mark=DEFAULT_LOW_WATER_MARK):
+        self.name = name
+        self.label = label
+        self.path = path
+        self.maximum_size = maximum_size
+        self.shard_depth = shard_depth
+        self.low_water_mark = low_water_mark
+        self.memory = MemoryCache(maximum_size=memory_size)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Size of the whole cache when it was last measured and size of the
+        # entries this process committed since then.  Their sum is this
+        # process's estimate of the cache size, the entries committed by
+        # other processes using the same path are only accounted for when
+        # this process measures the cache again
+        self._size = None
+        self._committed = 0
+        self._pruning = False
+        self._prune_thread = None
+        self._lock = threading.Lock()
+        self.__class__._registry[name] = self
+
+    def __unicode__(self):
+        return unicode(self.label)
+
+    @staticmethod
+    def get_group_key(group, name):
+        return GROUP_SEPARATOR.join([group, name])
+
+    def _get_shard(self, key):
+        digest = hashlib.md5(smart_str(key.split(GROUP_SEPARATOR, 1)[0])).hexdigest()
+        return [digest[level * 2:level * 2 + 2] for level in range(self.shard_depth)]
+
+    def get_path(self, key):
+        """
+        Return the absolute path for a key, creating its shard directory
+        if needed
+        """
+        directory = os.path.join(self.path, *self._get_shard(key))
+        try:
+            os.makedirs(directory)
+        except OSError as exception:
+            if exception.errno != errno.EEXIST:
+                raise
+
+        return os.path.join(directory, key)
+
+    def exists(self, key):
+        """
+        Return whether a key is cached and mark it as recently used
+        """
+        filepath = os.path.join(self.path, *(self._get_shard(key) + [key]))
+        try:
+            os.utime(filepath, None)
+        except OSError:
+            self.misses += 1
+            return False
+        else:
+            self.hits += 1
+            return True
+
+    def read(self, key):
+        """
+        Return the content of a cached key, trying the memory tier first
+        """
+        data = self.memory.get(key)
+        if data is None:
+            with open(self.get_path(key), 'rb') as descriptor:
+                data = descriptor.read()
+            self.memory.set(key, data)
+
+        return data
+
+    def commit(self, key):
+        """
+        Account for a file just written at the path of a key and prune
+        the cache in the background if it may be over its maximum size
+        """
+        try:
+            size = os.path.getsize(self.get_path(key))
+        except OSError:
+            return
+
+        with self._lock:
+            self._committed += size
+            if not self.maximum_size or self._pruning:
+                return
+
+            if self._size is not None and self._size + self._committed <= self.maximum_size:
+                return
+
+            # Measuring and pruning walk the whole cache, they are kept
+            # away from the request that committed the entry
+            self._pruning = True
+
+        self._prune_thread = threading.Thread(target=self._prune_in_background, name=u'file_cache-%s' % self.name)
+        self._prune_thread.daemon = True
+        self._prune_thread.start()
+
+    def _prune_in_background(self):
+        try:
+            self.prune()
+        except Exception as exception:
+            logger.error('error pruning cache: %s; %s' % (self.name, exception))
+        finally:
+            with self._lock:
+                self._pruning = False
+
+    def invalidate(self, key):
+        self.memory.invalidate(key)
+        fs_cleanup(self.get_path(key))
+
+    def invalidate_group(self, group):
+        """
+        Delete all the entries whose keys were created with get_group_key
+        for the given group
+        """
+        prefix = self.get_group_key(group, u'')
+        self.memory.invalidate_prefix(prefix)
+        directory = os.path.join(self.path, *self._get_shard(group))
+        try:
+            filenames = os.listdir(directory)
+        except OSError:
+            return
+
+        for filename in filenames:
+            if filename.startswith(prefix):
+                fs_cleanup(os.path.join(directory, filename))
+
+    def get_size(self):
+        return sum(size for mtime, size, filepath in self._get_entries())
+
+    def _get_entries(self):
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            # Hidden entries are files and directories being written
+            dirnames[:] = [dirname for dirname in dirnames if not dirname.startswith('.')]
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+
+                filepath = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(filepath)
+                except OSError:
+                    # Removed by another process
+                    continue
+                else:
+                    yield stat.st_mtime, stat.st_size, filepath
+
+    def prune(self):
+        """
+        Measure the cache and, if it is over its maximum size, delete the
+        least recently used files until its size falls under the low water
+        mark
+        """
+        with self._lock:
+            self._committed = 0
+
+        entries = sorted(self._get_entries())
+        size = sum(entry[1] for entry in entries)
+        if self.maximum_size and size > self.maximum_size:
+            target_size = self.maximum_size * self.low_water_mark
+            logger.debug('pruning cache: %s, size: %d, target size: %d', self.name, size, target_size)
+
+            for mtime, entry_size, filepath in entries:
+                if size <= target_size:
+                    break
+
+                fs_cleanup(filepath)
+                self.memory.invalidate(os.path.basename(filepath))
+                size -= entry_size
+                self.evictions += 1
+
+        with self._lock:
+            self._size = size
+
+    def clear(self):
+        """
+        Delete every cached file one shard at a time, so that no single
+        directory needs to be listed in full
+        """
+        self.memory.clear()
+        for entry in os.listdir(self.path):
+            entry_path = os.path.join(self.path, entry)
+            if os.path.isdir(entry_path):
+                shutil.rmtree(entry_path, ignore_errors=True)
+            else:
+                # Unsharded file left by a previous cache layout
+                fs_cleanup(entry_path)
+
+        with self._lock:
+            self._size = 0
+            self._committed = 0
+
+    def get_statistics(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': self._size + self._committed if self._size is not None else self.get_size(),
+            'maximum_size': self.maximum_size,
+            'memory_hits': self.memory.hits,
+            'memory_misses': self.memory.misses,
+            'memory_evictions': self.memory.evictions,
+            'memory_size': self.memory.size,
+            'memory_maximum_size': self.memory.maximum_size,
+            'memory_entries': len(self.memory),
+        }
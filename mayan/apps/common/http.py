@@ -0,0 +1,113 @@
+from __future__ import absolute_import
+
+import re
+
+from django.http import HttpResponse, StreamingHttpResponse
+
+from .compressed_files import CHUNK_SIZE, ZipStream
+
+BYTE_RANGE_RE = re.compile(r'^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$', re.I)
+
+
+def parse_byte_range(header, size):
+    """
+    Return the first and last byte positions requested by the value of
+    a Range header for a file of the given size, None when the header
+    is not a single byte range or is missing, which means the whole file
+    is served, and raise ValueError when the range can't be satisfied
+    """
+    match = BYTE_RANGE_RE.match(header or '')
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range, the last bytes of the file
+        length = int(last)
+        if not length or not size:
+            raise ValueError
+        return max(size - length, 0), size - 1
+
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        raise ValueError
+
+    return first, last
+
+
+def read_chunks(descriptor, length, chunk_size=CHUNK_SIZE):
+    """
+    Yield the next length bytes of a file and close it once read
+    """
+    try:
+        while length > 0:
+            data = descriptor.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        descriptor.close()
+
+
+def serve_file_range(request, descriptor, size, save_as, content_type, etag=None):
+    """
+    Stream an open file as a download, honoring the byte range requested
+    by clients resuming an interrupted download.  The file is closed once
+    the response is consumed
+    """
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # Only resumed when the file is known to be the one partially downloaded
+    if not if_range or (etag and if_range == etag):
+        try:
+            byte_range = parse_byte_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            descriptor.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response
+
+    if byte_range:
+        first, last = byte_range
+        descriptor.seek(first)
+        response = StreamingHttpResponse(read_chunks(descriptor, last - first + 1), status=206, content_type=content_type)
+        response['Content-Range'] = 'bytes %d-%d/%d' % (first, last, size)
+        response['Content-Length'] = last - first + 1
+    else:
+        response = StreamingHttpResponse(read_chunks(descriptor, size), content_type=content_type)
+        response['Content-Length'] = size
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = 'attachment; filename=%s' % save_as
+    if etag:
+        response['ETag'] = etag
+
+    return response
+
+
+def serve_compressed_files(files, save_as):
+    """
+    Stream a ZIP archive of (file opener, archive name) pairs as a download,
+    each file is opened, compressed and closed as the response is consumed,
+    so that only one is open at a time
+    """
+    def chunks():
+        zip_stream = ZipStream()
+        for opener, arcname in files:
+            descriptor = opener()
+            try:
+                for data in zip_stream.add_file(descriptor, arcname=arcname):
+                    yield data
+            finally:
+                descriptor.close()
+
+        yield zip_stream.close()
+
+    response = StreamingHttpResponse(chunks(), content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename=%s' % save_as
+    return response
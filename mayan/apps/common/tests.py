@@ -1,5 +1,15 @@
 from __future__ import absolute_import
 
+import os
+import shutil
+import tempfile
+import zipfile
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from StringIO import StringIO
+
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
@@ -8,6 +18,10 @@ from django.test import TestCase
 
 import common
 
+from .compressed_files import ZipStream
+from .file_caches import FileCache, MemoryCache
+from .http import parse_byte_range
+
 TEST_ADMIN_EMAIL = 'admin@admin.com'
 TEST_ADMIN_PASSWORD = 'test_admin_password'
 TEST_ADMIN_USERNAME = 'test_admin'
@@ -67,3 +81,125 @@ class UserLoginTestCase(TestCase):
             response = self.client.post(settings.LOGIN_URL, {'email': TEST_ADMIN_EMAIL, 'password': TEST_ADMIN_PASSWORD}, follow=True)
             response = self.client.get(reverse('document_list'))
             self.assertEqual(response.status_code, 200)
+
+
+class FileCacheTestCase(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = FileCache(name='test_cache', label='Test cache', path=self.path, maximum_size=1000, memory_size=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _add_entry(self, key, size):
+        with open(self.cache.get_path(key), 'wb') as descriptor:
+            descriptor.write('x' * size)
+        self.cache.commit(key)
+        # Pruning runs in the background
+        if self.cache._prune_thread:
+            self.cache._prune_thread.join()
+
+    def test_sharded_layout(self):
+        self._add_entry('0123456789abcdef', 10)
+        self.assertTrue(self.cache.exists('0123456789abcdef'))
+        self.assertFalse(os.path.exists(os.path.join(self.path, '0123456789abcdef')))
+        self.assertEqual(self.cache.get_size(), 10)
+
+    def test_hits_and_misses(self):
+        self.assertFalse(self.cache.exists('missing'))
+        self._add_entry('present', 10)
+        self.assertTrue(self.cache.exists('present'))
+        statistics = self.cache.get_statistics()
+        self.assertEqual(statistics['hits'], 1)
+        self.assertEqual(statistics['misses'], 1)
+
+    def test_least_recently_used_eviction(self):
+        for index in range(4):
+            self._add_entry('entry_%d' % index, 300)
+            # Make modification times distinct and ordered
+            os.utime(self.cache.get_path('entry_%d' % index), (index, index))
+
+        self.assertFalse(self.cache.exists('entry_0'))
+        self.assertTrue(self.cache.exists('entry_3'))
+        self.assertTrue(self.cache.get_size() <= 1000)
+        self.assertTrue(self.cache.evictions >= 1)
+
+    def test_size_estimate(self):
+        self._add_entry('entry_1', 100)
+        self._add_entry('entry_2', 200)
+        self.assertEqual(self.cache.get_statistics()['size'], 300)
+        # Files being written are not part of the cache
+        with open(os.path.join(os.path.dirname(self.cache.get_path('entry_1')), '.partial'), 'wb') as descriptor:
+            descriptor.write('x' * 2000)
+        self.cache.prune()
+        self.assertEqual(self.cache.get_statistics()['size'], 300)
+        self.assertTrue(self.cache.exists('entry_1'))
+
+    def test_invalidate_and_clear(self):
+        self._add_entry('entry_1', 10)
+        self._add_entry('entry_2', 10)
+        self.cache.invalidate('entry_1')
+        self.assertFalse(self.cache.exists('entry_1'))
+        self.cache.clear()
+        self.assertFalse(self.cache.exists('entry_2'))
+        self.assertEqual(self.cache.get_size(), 0)
+
+    def test_invalidate_group(self):
+        key_1 = self.cache.get_group_key('group_1', 'variant_1')
+        key_2 = self.cache.get_group_key('group_1', 'variant_2')
+        key_3 = self.cache.get_group_key('group_2', 'variant_1')
+        for key in (key_1, key_2, key_3):
+            self._add_entry(key, 10)
+
+        # All the entries of a group are stored in the same shard
+        self.assertEqual(os.path.dirname(self.cache.get_path(key_1)), os.path.dirname(self.cache.get_path(key_2)))
+        self.cache.invalidate_group('group_1')
+        self.assertFalse(self.cache.exists(key_1))
+        self.assertFalse(self.cache.exists(key_2))
+        self.assertTrue(self.cache.exists(key_3))
+
+
+class MemoryCacheTestCase(TestCase):
+    def test_eviction(self):
+        cache = MemoryCache(maximum_size=30, maximum_entry_size=10)
+        cache.set('a', 'x' * 10)
+        cache.set('b', 'x' * 10)
+        cache.set('c', 'x' * 10)
+        # Touch 'a' so that 'b' becomes the least recently used entry
+        self.assertEqual(cache.get('a'), 'x' * 10)
+        cache.set('d', 'x' * 10)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.size, 30)
+
+    def test_oversized_entries_are_not_stored(self):
+        cache = MemoryCache(maximum_size=30, maximum_entry_size=10)
+        cache.set('a', 'x' * 11)
+        self.assertEqual(cache.get('a'), None)
+
+
+class ZipStreamTestCase(TestCase):
+    def test_archive_contents(self):
+        zip_stream = ZipStream(chunk_size=100)
+        data = StringIO()
+        for arcname, content in ((u'first.txt', 'x' * 1000), (u'caf\xe9.txt', os.urandom(1000)), (u'empty.txt', '')):
+            for chunk in zip_stream.add_file(StringIO(content), arcname=arcname):
+                data.write(chunk)
+        data.write(zip_stream.close())
+
+        archive = zipfile.ZipFile(data)
+        self.assertEqual(archive.testzip(), None)
+        self.assertEqual(archive.namelist(), [u'first.txt', u'caf\xe9.txt', u'empty.txt'])
+        self.assertEqual(archive.read(u'first.txt'), 'x' * 1000)
+        self.assertEqual(archive.read(u'empty.txt'), '')
+
+
+class ByteRangeTestCase(TestCase):
+    def test_parse_byte_range(self):
+        self.assertEqual(parse_byte_range(None, 100), None)
+        self.assertEqual(parse_byte_range('bytes=0-9,20-29', 100), None)
+        self.assertEqual(parse_byte_range('bytes=10-19', 100), (10, 19))
+        self.assertEqual(parse_byte_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_byte_range('bytes=90-200', 100), (90, 99))
+        self.assertEqual(parse_byte_range('bytes=-10', 100), (90, 99))
+        self.assertRaises(ValueError, parse_byte_range, 'bytes=100-', 100)
@@ -8,6 +8,7 @@ from django.utils.encoding import smart_str
 
 from common.conf.settings import TEMPORARY_DIRECTORY
 from common.utils import fs_cleanup
+from mimetype.api import get_mimetype
 
 from .exceptions import OfficeConversionError, UnknownFileFormat
 from .literals import (DEFAULT_PAGE_NUMBER,
@@ -37,7 +38,7 @@ def create_image_cache_filename(input_filepath, *args, **kwargs):
         return None
 
 
-def convert(input_filepath, output_filepath=None, cleanup_files=False, mimetype=None, *args, **kwargs):
+def convert(input_filepath, output_filepath=None, cleanup_files=False, mimetype=None, checksum=None, *args, **kwargs):
     size = kwargs.get('size')
     file_format = kwargs.get('file_format', DEFAULT_FILE_FORMAT)
     zoom = kwargs.get('zoom', DEFAULT_ZOOM_LEVEL)
@@ -55,14 +56,16 @@ def convert(input_filepath, output_filepath=None, cleanup_files=False, mimetype=
         return output_filepath
 
     if office_converter:
+        if not mimetype:
+            # Detected once, for the office converter and the backend
+            with open(input_filepath) as descriptor:
+                mimetype, encoding = get_mimetype(descriptor, input_filepath, mimetype_only=True)
+
         try:
-            office_converter.convert(input_filepath, mimetype=mimetype)
-            if office_converter.exists:
-                input_filepath = office_converter.output_filepath
+            converted_filepath = office_converter.convert(input_filepath, mimetype=mimetype, checksum=checksum)
+            if converted_filepath:
+                input_filepath = converted_filepath
                 mimetype = 'application/pdf'
-            else:
-                # Recycle the already detected mimetype
-                mimetype = office_converter.mimetype
 
         except OfficeConversionError:
             raise UnknownFileFormat('office converter exception')
@@ -100,14 +103,51 @@ def convert(input_filepath, output_filepath=None, cleanup_files=False, mimetype=
     return output_filepath
 
 
-def get_page_count(input_filepath):
+def convert_pages(input_filepath, pages, cleanup_files=False, mimetype=None, file_format=DEFAULT_FILE_FORMAT, checksum=None):
+    """
+    Convert several pages of a file in as few backend invocations as
+    possible, pages is a list of (page number, output filepath,
+    transformations) tuples.  Pages whose output file already exists are
+    skipped.  The checksum of the file, when known, spares hashing it to
+    look up the conversion of office documents
+    """
+    pages = [(page, output_filepath, transformations or []) for page, output_filepath, transformations in pages if not os.path.exists(output_filepath)]
+
+    if not pages:
+        return []
+
+    if office_converter:
+        if not mimetype:
+            # Detected once, for the office converter and the backend
+            with open(input_filepath) as descriptor:
+                mimetype, encoding = get_mimetype(descriptor, input_filepath, mimetype_only=True)
+
+        try:
+            converted_filepath = office_converter.convert(input_filepath, mimetype=mimetype, checksum=checksum)
+            if converted_filepath:
+                input_filepath = converted_filepath
+                mimetype = 'application/pdf'
+
+        except OfficeConversionError:
+            raise UnknownFileFormat('office converter exception')
+
+    try:
+        backend.convert_pages(input_filepath=input_filepath, pages=pages, file_format=file_format, mimetype=mimetype)
+    finally:
+        if cleanup_files:
+            fs_cleanup(input_filepath)
+
+    return [output_filepath for page, output_filepath, transformations in pages]
+
+
+def get_page_count(input_filepath, checksum=None):
     logger.debug('office_converter: %s' % office_converter)
     if office_converter:
         try:
-            office_converter.convert(input_filepath)
-            logger.debug('office_converter.exists: %s' % office_converter.exists)
-            if office_converter.exists:
-                input_filepath = office_converter.output_filepath
+            converted_filepath = office_converter.convert(input_filepath, checksum=checksum)
+            logger.debug('converted_filepath: %s' % converted_filepath)
+            if converted_filepath:
+                input_filepath = converted_filepath
 
         except OfficeConversionError:
             raise UnknownFileFormat('office converter exception')
@@ -1,3 +1,15 @@
+from __future__ import absolute_import
+
+import os
+import re
+import shutil
+
+from common.utils import fs_cleanup
+
+from ..exceptions import ConvertError
+from ..literals import DEFAULT_FILE_FORMAT
+
+
 class ConverterBase(object):
     """
     Base class that all backend classes must inherit
@@ -5,6 +17,41 @@ class ConverterBase(object):
     def convert_file(self, input_filepath, *args, **kwargs):
         raise NotImplementedError("Your %s class has not defined a convert_file() method, which is required." % self.__class__.__name__)
 
+    def convert_pages(self, input_filepath, pages, file_format=DEFAULT_FILE_FORMAT, **kwargs):
+        """
+        Convert several pages of a file, pages is a list of
+        (page number, output filepath, transformations) tuples.
+        Backends able to rasterize a range of pages in a single pass
+        should override this method
+        """
+        for page, output_filepath, transformations in pages:
+            self.convert_file(input_filepath, output_filepath, transformations=transformations, page=page, file_format=file_format, **kwargs)
+
+    def distribute_pages(self, pages, first_page, directory, file_format=DEFAULT_FILE_FORMAT, rasterized_format=DEFAULT_FILE_FORMAT):
+        """
+        Move the page images rasterized in a single pass into a directory
+        to their output filepaths, applying the transformations of each
+        page.  The rasterized files are matched in numerical order with
+        the page range starting at first_page
+        """
+        filenames = sorted(os.listdir(directory), key=lambda filename: int(re.findall(r'\d+', filename)[-1]))
+        rasterized = dict((first_page + index, os.path.join(directory, filename)) for index, filename in enumerate(filenames))
+
+        try:
+            for page, output_filepath, transformations in pages:
+                try:
+                    page_filepath = rasterized[page]
+                except KeyError:
+                    raise ConvertError('page %d was not rasterized' % page)
+
+                if transformations or file_format.lower() != rasterized_format.lower():
+                    self.convert_file(page_filepath, output_filepath, transformations=transformations, file_format=file_format)
+                else:
+                    shutil.move(page_filepath, output_filepath)
+        finally:
+            for filepath in rasterized.values():
+                fs_cleanup(filepath)
+
     def convert_document(self, document, *args, **kwargs):
         raise NotImplementedError("Your %s class has not defined a convert_document() method, which is required." % self.__class__.__name__)
 
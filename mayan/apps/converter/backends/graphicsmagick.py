@@ -1,7 +1,10 @@
 from __future__ import absolute_import
 
-import subprocess
+import os
 import re
+import shutil
+import subprocess
+import tempfile
 
 from . import ConverterBase
 from ..conf.settings import GM_PATH, GM_SETTINGS
@@ -82,6 +85,42 @@ class GraphicsMagick(ConverterBase):
             else:
                 raise ConvertError(error_line)
 
+    def convert_pages(self, input_filepath, pages, file_format=DEFAULT_FILE_FORMAT, **kwargs):
+        if not pages:
+            return
+
+        # Rasterize the whole page range with a single convert run
+        first_page = min(page for page, output_filepath, transformations in pages)
+        last_page = max(page for page, output_filepath, transformations in pages)
+
+        # Graphicsmagick page numbers are 0 base
+        input_arg = u'%s[%d-%d]' % (input_filepath, first_page - 1, last_page - 1)
+
+        directory = tempfile.mkdtemp()
+        try:
+            command = []
+            command.append(unicode(GM_PATH))
+            command.append(u'convert')
+            command.extend(unicode(GM_SETTINGS).split())
+            command.append(unicode(input_arg))
+            command.append(u'+adjoin')
+            if file_format.lower() == u'jpeg' or file_format.lower() == u'jpg':
+                command.append(u'-quality')
+                command.append(u'85')
+            command.append(u'%s:%s' % (file_format, os.path.join(directory, u'page_%d')))
+            proc = subprocess.Popen(command, close_fds=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+            return_code = proc.wait()
+            if return_code != 0:
+                error_line = proc.stderr.readline()
+                if (CONVERTER_ERROR_STRING_NO_DECODER in error_line) or (CONVERTER_ERROR_STARTS_WITH in error_line):
+                    raise UnknownFileFormat
+                else:
+                    raise ConvertError(error_line)
+
+            self.distribute_pages(pages, first_page, directory, file_format=file_format, rasterized_format=file_format)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
     def get_format_list(self):
         """
         Call GraphicsMagick to parse all of it's supported file formats, and
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import os
+import shutil
 import tempfile
 
 import slate
@@ -20,6 +21,8 @@ from ..exceptions import UnknownFileFormat
 from ..literals import (TRANSFORMATION_RESIZE, TRANSFORMATION_ROTATE,
     TRANSFORMATION_ZOOM, DEFAULT_PAGE_NUMBER, DEFAULT_FILE_FORMAT)
 
+GHOSTSCRIPT_FILE_FORMAT = u'jpeg'
+
 Image.init()
 
 
@@ -62,30 +65,10 @@ class Python(ConverterBase):
 
         if mimetype == 'application/pdf' and USE_GHOSTSCRIPT:
             # If file is a PDF open it with ghostscript and convert it to
-            # TIFF
-            first_page_tmpl = '-dFirstPage=%d' % page
-            last_page_tmpl = '-dLastPage=%d' % page
+            # JPEG
             fd, tmpfile = tempfile.mkstemp()
             os.close(fd)
-            output_file_tmpl = '-sOutputFile=%s' % tmpfile
-            input_file_tmpl = '-f%s' % input_filepath
-            args = [
-                'gs', '-q', '-dQUIET', '-dSAFER', '-dBATCH',
-                '-dNOPAUSE', '-dNOPROMPT',
-                first_page_tmpl, last_page_tmpl,
-                '-sDEVICE=jpeg', '-dJPEGQ=95',
-                '-r150', output_file_tmpl,
-                input_file_tmpl,
-                '-c "60000000 setvmthreshold"',  # use 30MB
-                '-dNOGC',  # No garbage collection
-                '-dMaxBitmap=500000000',
-                '-dAlignToPixels=0',
-                '-dGridFitTT=0',
-                '-dTextAlphaBits=4',
-                '-dGraphicsAlphaBits=4',
-            ]
-
-            ghostscript.Ghostscript(*args)
+            self.execute_ghostscript(input_filepath, tmpfile, first_page=page, last_page=page)
             page = 1  # Don't execute the following while loop
             input_filepath = tmpfile
 
@@ -132,6 +115,48 @@ class Python(ConverterBase):
 
         im.save(output_filepath, format=file_format)
 
+    def convert_pages(self, input_filepath, pages, file_format=DEFAULT_FILE_FORMAT, **kwargs):
+        mimetype = kwargs.get('mimetype', None)
+        if not mimetype:
+            mimetype, encoding = get_mimetype(open(input_filepath, 'rb'), input_filepath, mimetype_only=True)
+
+        if mimetype == 'application/pdf' and USE_GHOSTSCRIPT and pages:
+            # Rasterize the whole page range with a single ghostscript run
+            first_page = min(page for page, output_filepath, transformations in pages)
+            last_page = max(page for page, output_filepath, transformations in pages)
+            directory = tempfile.mkdtemp()
+            try:
+                self.execute_ghostscript(input_filepath, os.path.join(directory, 'page_%d'), first_page=first_page, last_page=last_page)
+                self.distribute_pages(pages, first_page, directory, file_format=file_format, rasterized_format=GHOSTSCRIPT_FILE_FORMAT)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        else:
+            super(Python, self).convert_pages(input_filepath, pages, file_format=file_format, mimetype=mimetype)
+
+    def execute_ghostscript(self, input_filepath, output_filepath, first_page, last_page):
+        """
+        Rasterize a range of pages of a PDF file, when more than one page
+        is requested the output filepath must include a %d placeholder for
+        the page number
+        """
+        args = [
+            'gs', '-q', '-dQUIET', '-dSAFER', '-dBATCH',
+            '-dNOPAUSE', '-dNOPROMPT',
+            '-dFirstPage=%d' % first_page, '-dLastPage=%d' % last_page,
+            '-sDEVICE=jpeg', '-dJPEGQ=95',
+            '-r150', '-sOutputFile=%s' % output_filepath,
+            '-f%s' % input_filepath,
+            '-c "60000000 setvmthreshold"',  # use 30MB
+            '-dNOGC',  # No garbage collection
+            '-dMaxBitmap=500000000',
+            '-dAlignToPixels=0',
+            '-dGridFitTT=0',
+            '-dTextAlphaBits=4',
+            '-dGraphicsAlphaBits=4',
+        ]
+
+        ghostscript.Ghostscript(*args)
+
     def get_format_list(self):
         """
         Introspect PIL's internal registry to obtain a list of the
@@ -1,5 +1,8 @@
 """Configuration options for the converter app"""
 
+import os
+
+from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 
 from smart_settings.api import register_settings
@@ -14,5 +17,10 @@ register_settings(
         {'name': u'GM_SETTINGS', 'global_name': u'CONVERTER_GM_SETTINGS', 'default': u''},
         {'name': u'GRAPHICS_BACKEND', 'global_name': u'CONVERTER_GRAPHICS_BACKEND', 'default': u'converter.backends.python.Python', 'description': _(u'Graphics conversion backend to use.  Options are: converter.backends.imagemagick.ImageMagick, converter.backends.graphicsmagick.GraphicsMagick and converter.backends.python.Python')},
         {'name': u'LIBREOFFICE_PATH', 'global_name': u'CONVERTER_LIBREOFFICE_PATH', 'default': u'/usr/bin/libreoffice', 'exists': True, 'description': _(u'Path to the libreoffice program.')},
+        {'name': u'OFFICE_WORKERS', 'global_name': u'CONVERTER_OFFICE_WORKERS', 'default': 2, 'description': _(u'Number of long running LibreOffice processes each Mayan process keeps to convert office documents, when the python-uno package is installed.  Use 0 to start a new LibreOffice process for each document instead.')},
+        {'name': u'OFFICE_WORKER_MAXIMUM_JOBS', 'global_name': u'CONVERTER_OFFICE_WORKER_MAXIMUM_JOBS', 'default': 200, 'description': _(u'Number of documents a LibreOffice process converts before it is replaced by a new one, to release the memory it accumulates.')},
+        {'name': u'OFFICE_CACHE_PATH', 'global_name': u'CONVERTER_OFFICE_CACHE_PATH', 'default': os.path.join(settings.MEDIA_ROOT, 'office_cache'), 'exists': True},
+        {'name': u'OFFICE_CACHE_MAXIMUM_SIZE', 'global_name': u'CONVERTER_OFFICE_CACHE_MAXIMUM_SIZE', 'default': 500 * 1024 * 1024, 'description': _(u'Maximum size in bytes of the cache of office documents converted to PDF.  Least recently used conversions are deleted when the cache grows past this size.  Use None to disable the limit.')},
+        {'name': u'OFFICE_CONVERSION_TIMEOUT', 'global_name': u'CONVERTER_OFFICE_CONVERSION_TIMEOUT', 'default': 120, 'description': _(u'Maximum amount of seconds the conversion of an office document can take, the LibreOffice process converting it is restarted when exceeded.')},
     ]
 )
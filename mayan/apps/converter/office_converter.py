@@ -1,16 +1,48 @@
 from __future__ import absolute_import
 
+import atexit
+import hashlib
 import logging
 import os
+import Queue
+import shutil
+import signal
 import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+except ImportError:
+    uno = None
 
 from common.conf.settings import TEMPORARY_DIRECTORY
 from mimetype.api import get_mimetype
 
-from .conf.settings import LIBREOFFICE_PATH
+from .conf.settings import (LIBREOFFICE_PATH, OFFICE_CONVERSION_TIMEOUT,
+                            OFFICE_WORKER_MAXIMUM_JOBS, OFFICE_WORKERS)
 from .exceptions import OfficeBackendError, UnknownFileFormat
 
-CACHED_FILE_SUFFIX = u'_office_converter'
+# Size of the blocks in which files are hashed
+CHUNK_SIZE = 64 * 1024
+
+# Seconds a new LibreOffice process has to start accepting connections
+OFFICE_WORKER_STARTUP_TIMEOUT = 30
+OFFICE_WORKER_CONNECT_INTERVAL = 0.5
+# Seconds a LibreOffice process has to exit when asked before it is killed
+OFFICE_WORKER_STOP_TIMEOUT = 5
+
+# PDF export filter of each kind of office document
+PDF_EXPORT_FILTERS = (
+    (u'com.sun.star.text.GenericTextDocument', u'writer_pdf_Export'),
+    (u'com.sun.star.sheet.SpreadsheetDocument', u'calc_pdf_Export'),
+    (u'com.sun.star.presentation.PresentationDocument', u'impress_pdf_Export'),
+    (u'com.sun.star.drawing.DrawingDocument', u'draw_pdf_Export'),
+)
 
 CONVERTER_OFFICE_FILE_MIMETYPES = [
     u'application/msword',
@@ -52,48 +84,76 @@ CONVERTER_OFFICE_FILE_MIMETYPES = [
 
 logger = logging.getLogger(__name__)
 
+# Single pool of LibreOffice processes per process, see get_backend_pool
+_backend_pool = None
+_backend_pool_lock = threading.Lock()
+
 
 class OfficeConverter(object):
-    def __init__(self):
-        self.backend_class = OfficeConverterBackendDirect
-        self.backend = self.backend_class()
-        self.exists = False
-        self.mimetype = None
-        self.encoding = None
+    """
+    Convert office documents to PDF, keeping the conversions in a file
+    cache keyed by the checksum of the documents, so that each document is
+    converted once no matter its path or how many times it is requested
+    """
+    def __init__(self, cache):
+        if OFFICE_WORKERS and uno:
+            self.backend = get_backend_pool()
+        else:
+            self.backend = OfficeConverterBackendDirect()
+        self.cache = cache
 
     def mimetypes(self):
         return CONVERTER_OFFICE_FILE_MIMETYPES
 
-    def convert(self, input_filepath, mimetype=None):
-        self.exists = False
-        self.mimetype = None
-        self.encoding = None
-
-        self.input_filepath = input_filepath
+    def get_cached_filepath(self, checksum):
+        """
+        Return the path of the existing conversion of a document or None
+        """
+        if checksum and self.cache.exists(checksum):
+            return self.cache.get_path(checksum)
 
+    def convert(self, input_filepath, mimetype=None, checksum=None):
+        """
+        Return the path of the PDF conversion of an office document or None
+        if the file is not an office document.  The checksum of the file is
+        calculated when not provided
+        """
         # Make sure file is of a known office format
-        if mimetype:
-            self.mimetype = mimetype
-        else:
-            self.mimetype, self.encoding = get_mimetype(open(self.input_filepath), self.input_filepath, mimetype_only=True)
+        if not mimetype:
+            with open(input_filepath) as descriptor:
+                mimetype, encoding = get_mimetype(descriptor, input_filepath, mimetype_only=True)
 
-        if self.mimetype in CONVERTER_OFFICE_FILE_MIMETYPES:
-            # Cache results of conversion
-            self.output_filepath = os.path.join(TEMPORARY_DIRECTORY, u''.join([self.input_filepath, CACHED_FILE_SUFFIX]))
-            self.exists = os.path.exists(self.output_filepath)
-            if not self.exists:
+        if mimetype in CONVERTER_OFFICE_FILE_MIMETYPES:
+            cache_key = checksum or get_file_checksum(input_filepath)
+            output_filepath = self.cache.get_path(cache_key)
+            if not self.cache.exists(cache_key):
+                # Converted next to its final path and moved in place, so
+                # that concurrent conversions never see a partial file
+                temporary_path = os.path.join(os.path.dirname(output_filepath), u'.%s' % uuid.uuid4().hex)
                 try:
-                    self.backend.convert(self.input_filepath, self.output_filepath)
-                    self.exists = True
+                    self.backend.convert(input_filepath, temporary_path)
+                    if not os.path.exists(temporary_path):
+                        raise OfficeBackendError('no output from the office backend')
+                    os.rename(temporary_path, output_filepath)
                 except OfficeBackendError as exception:
                     # convert exception so that at least the mime type icon is displayed
                     raise UnknownFileFormat(exception)
+                finally:
+                    if os.path.exists(temporary_path):
+                        os.unlink(temporary_path)
+
+                self.cache.commit(cache_key)
+
+            return output_filepath
 
-    def __unicode__(self):
-        return getattr(self, 'output_filepath', None)
 
-    def __str__(self):
-        return str(self.__unicode__())
+def get_file_checksum(filepath):
+    file_hash = hashlib.sha256()
+    with open(filepath, 'rb') as descriptor:
+        for chunk in iter(lambda: descriptor.read(CHUNK_SIZE), ''):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
 
 
 class OfficeConverterBackendDirect(object):
@@ -107,8 +167,10 @@ class OfficeConverterBackendDirect(object):
         """
         Executes libreoffice using subprocess's Popen
         """
-        self.input_filepath = input_filepath
-        self.output_filepath = output_filepath
+        # LibreOffice names the output after the input, it is written to a
+        # directory next to output_filepath so that it can be renamed in
+        # place without crossing filesystems
+        output_directory = tempfile.mkdtemp(prefix=u'.', dir=os.path.dirname(output_filepath))
 
         command = []
         command.append(self.libreoffice_path)
@@ -116,9 +178,9 @@ class OfficeConverterBackendDirect(object):
         command.append(u'--headless')
         command.append(u'--convert-to')
         command.append(u'pdf')
-        command.append(self.input_filepath)
+        command.append(input_filepath)
         command.append(u'--outdir')
-        command.append(TEMPORARY_DIRECTORY)
+        command.append(output_directory)
 
         logger.debug('command: %s' % command)
 
@@ -132,15 +194,211 @@ class OfficeConverterBackendDirect(object):
             logger.debug('stderr: %s' % readline)
             if return_code != 0:
                 raise OfficeBackendError(readline)
-            filename, extension = os.path.splitext(os.path.basename(self.input_filepath))
+            filename, extension = os.path.splitext(os.path.basename(input_filepath))
             logger.debug('filename: %s' % filename)
             logger.debug('extension: %s' % extension)
 
-            converted_output = os.path.join(TEMPORARY_DIRECTORY, os.path.extsep.join([filename, 'pdf']))
+            converted_output = os.path.join(output_directory, os.path.extsep.join([filename, 'pdf']))
             logger.debug('converted_output: %s' % converted_output)
 
-            os.rename(converted_output, self.output_filepath)
+            os.rename(converted_output, output_filepath)
         except OSError as exception:
             raise OfficeBackendError(exception)
         except Exception as exception:
             logger.error('Unhandled exception', exc_info=exception)
+        finally:
+            shutil.rmtree(output_directory, ignore_errors=True)
+
+
+def make_properties(**kwargs):
+    properties = []
+    for name, value in kwargs.items():
+        property_value = PropertyValue()
+        property_value.Name = name
+        property_value.Value = value
+        properties.append(property_value)
+
+    return tuple(properties)
+
+
+class OfficeWorker(object):
+    """
+    Long running headless LibreOffice process with a profile of its own,
+    converting the documents it is sent through UNO over a local pipe
+    """
+    def __init__(self, libreoffice_path, number):
+        self.libreoffice_path = libreoffice_path
+        self.number = number
+        self.process = None
+        self.desktop = None
+        self.pid = None
+        self.jobs = 0
+
+    def start(self):
+        self.pid = os.getpid()
+        self.jobs = 0
+        name = u'mayan_office-%d-%d' % (self.pid, self.number)
+        self.profile_path = os.path.join(TEMPORARY_DIRECTORY, name)
+        connection = u'pipe,name=%s;urp;StarOffice.ComponentContext' % name
+
+        command = []
+        command.append(self.libreoffice_path)
+        command.append(u'--headless')
+        command.append(u'--invisible')
+        command.append(u'--nologo')
+        command.append(u'--nodefault')
+        command.append(u'--norestore')
+        command.append(u'--nofirststartwizard')
+        command.append(u'-env:UserInstallation=%s' % uno.systemPathToFileUrl(self.profile_path))
+        command.append(u'--accept=%s' % connection)
+
+        logger.debug('command: %s' % command)
+
+        with open(os.devnull, 'r+') as devnull:
+            # In a session of its own, so that the whole process group can
+            # be killed, the launcher doesn't forward signals
+            self.process = subprocess.Popen(command, close_fds=True, stdin=devnull, stdout=devnull, stderr=devnull, preexec_fn=os.setsid)
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(u'com.sun.star.bridge.UnoUrlResolver', local_context)
+        deadline = time.time() + OFFICE_WORKER_STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(u'uno:%s' % connection)
+            except NoConnectException:
+                if self.process.poll() is not None or time.time() > deadline:
+                    self.stop()
+                    raise OfficeBackendError('LibreOffice process didn\'t start')
+                time.sleep(OFFICE_WORKER_CONNECT_INTERVAL)
+            else:
+                break
+
+        self.desktop = context.ServiceManager.createInstanceWithContext(u'com.sun.star.frame.Desktop', context)
+        logger.debug('started LibreOffice process: %s' % name)
+
+    def is_alive(self):
+        # Processes started by a parent process can't be used after a fork
+        if not self.process or self.pid != os.getpid() or self.process.poll() is not None:
+            return False
+
+        try:
+            self.desktop.getComponents()
+        except Exception:
+            return False
+        else:
+            return True
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def stop(self):
+        if self.process and self.pid == os.getpid():
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+
+            deadline = time.time() + OFFICE_WORKER_STOP_TIMEOUT
+            while self.process.poll() is None and time.time() < deadline:
+                time.sleep(OFFICE_WORKER_CONNECT_INTERVAL)
+
+            self.kill()
+            self.process.wait()
+            shutil.rmtree(self.profile_path, ignore_errors=True)
+
+        self.process = None
+        self.desktop = None
+
+    def convert(self, input_filepath, output_filepath):
+        document = self.desktop.loadComponentFromURL(uno.systemPathToFileUrl(os.path.abspath(input_filepath)), u'_blank', 0, make_properties(Hidden=True, ReadOnly=True))
+        if not document:
+            raise OfficeBackendError('LibreOffice can\'t open the file')
+
+        try:
+            for service, filter_name in PDF_EXPORT_FILTERS:
+                if document.supportsService(service):
+                    break
+            else:
+                raise OfficeBackendError('no PDF export filter for the file')
+
+            document.storeToURL(uno.systemPathToFileUrl(os.path.abspath(output_filepath)), make_properties(FilterName=filter_name))
+        finally:
+            document.close(True)
+
+        self.jobs += 1
+
+
+def get_backend_pool():
+    """
+    Return the pool of LibreOffice processes of this process, created on
+    first use and shared by all the converters
+    """
+    global _backend_pool
+
+    with _backend_pool_lock:
+        if not _backend_pool:
+            _backend_pool = OfficeConverterBackendPool()
+
+        return _backend_pool
+
+
+class OfficeConverterBackendPool(object):
+    """
+    Dispatch documents to a fixed number of long running LibreOffice
+    processes, started on first use and replaced when they stop
+    responding, exceed the conversion timeout or reach their maximum
+    number of jobs
+    """
+    def __init__(self):
+        if not uno:
+            raise OfficeBackendError('python-uno is not installed')
+
+        self.libreoffice_path = LIBREOFFICE_PATH if LIBREOFFICE_PATH else u'/usr/bin/libreoffice'
+        if not os.path.exists(self.libreoffice_path):
+            raise OfficeBackendError('cannot find LibreOffice executable')
+        logger.debug('self.libreoffice_path: %s' % self.libreoffice_path)
+
+        self.workers = [OfficeWorker(self.libreoffice_path, number) for number in range(OFFICE_WORKERS)]
+        self.idle_workers = Queue.Queue()
+        for worker in self.workers:
+            self.idle_workers.put(worker)
+
+        atexit.register(self.stop)
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def convert(self, input_filepath, output_filepath):
+        try:
+            worker = self.idle_workers.get(timeout=OFFICE_CONVERSION_TIMEOUT)
+        except Queue.Empty:
+            raise OfficeBackendError('no LibreOffice process became available')
+
+        try:
+            if not worker.is_alive():
+                worker.stop()
+                worker.start()
+
+            watchdog = threading.Timer(OFFICE_CONVERSION_TIMEOUT, worker.kill)
+            watchdog.start()
+            try:
+                worker.convert(input_filepath, output_filepath)
+            finally:
+                watchdog.cancel()
+        except OfficeBackendError:
+            raise
+        except Exception as exception:
+            # UNO errors, including the ones of a process killed by the
+            # watchdog, the process is replaced on its next job
+            logger.error('LibreOffice process error: %s' % exception)
+            worker.stop()
+            raise OfficeBackendError(exception)
+        else:
+            if worker.jobs >= OFFICE_WORKER_MAXIMUM_JOBS:
+                worker.stop()
+        finally:
+            self.idle_workers.put(worker)
@@ -1,13 +1,30 @@
 from __future__ import absolute_import
 
-from common.utils import load_backend
+import tempfile
 
-from .conf.settings import GRAPHICS_BACKEND
+from django.utils.translation import ugettext_lazy as _
+
+from common.file_caches import FileCache
+from common.utils import load_backend, validate_path
+
+from .conf import settings as converter_settings
+from .conf.settings import GRAPHICS_BACKEND, OFFICE_CACHE_MAXIMUM_SIZE
 from .exceptions import OfficeBackendError
 from .office_converter import OfficeConverter
 
+if (not validate_path(converter_settings.OFFICE_CACHE_PATH)) or (not converter_settings.OFFICE_CACHE_PATH):
+    setattr(converter_settings, 'OFFICE_CACHE_PATH', tempfile.mkdtemp())
+
+# PDF conversions of office documents, keyed by the checksum of the
+# document, shared by page counting, page rendering and text extraction
+office_cache = FileCache(
+    name='office_conversions', label=_(u'Office document conversions'),
+    path=converter_settings.OFFICE_CACHE_PATH,
+    maximum_size=OFFICE_CACHE_MAXIMUM_SIZE
+)
+
 try:
-    office_converter = OfficeConverter()
+    office_converter = OfficeConverter(cache=office_cache)
 except OfficeBackendError:
     office_converter = None
 
@@ -3,11 +3,13 @@ from __future__ import absolute_import
 from django.conf import settings
 from django.contrib.comments.models import Comment
 from django.contrib.contenttypes import generic
+from django.contrib.contenttypes.models import ContentType
 from django.utils.translation import ugettext_lazy as _
 
 from acls.api import class_permissions
 from common.utils import encapsulate
 from documents.models import Document
+from dynamic_search.classes import SearchModel
 from navigation.api import register_links, register_model_list_columns
 
 from .links import (comment_delete, comment_add,
@@ -47,6 +49,8 @@ Document.add_to_class(
     )
 )
 
+SearchModel.add_index_trigger_for('documents.Document', Comment, lambda instance: [int(instance.object_pk)] if instance.content_type == ContentType.objects.get_for_model(Document) else [])
+
 class_permissions(Document, [
     PERMISSION_COMMENT_CREATE,
     PERMISSION_COMMENT_DELETE,
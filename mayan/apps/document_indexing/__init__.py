@@ -11,7 +11,7 @@ from navigation.api import (register_top_menu, register_sidebar_template,
     register_links)
 from project_setup.api import register_setup
 
-from .api import update_indexes, delete_indexes
+from .api import delete_indexes, queue_index_update, set_document_deleted
 from .links import (index_setup, index_setup_list, index_setup_create, index_setup_edit,
     index_setup_delete, index_setup_view, index_setup_document_types, template_node_create,
     template_node_edit, template_node_delete, index_parent, document_index_list,
@@ -21,23 +21,23 @@ from .models import Index, IndexTemplateNode, IndexInstanceNode
 
 @receiver(pre_delete, dispatch_uid='document_index_delete', sender=Document)
 def document_index_delete(sender, **kwargs):
+    set_document_deleted(kwargs['instance'])
     delete_indexes(kwargs['instance'])
 
 
-@receiver(post_save, dispatch_uid='document_metadata_index_update', sender=DocumentMetadata)
-def document_metadata_index_update(sender, **kwargs):
-    delete_indexes(kwargs['instance'].document)
-    update_indexes(kwargs['instance'].document)
+@receiver(post_delete, dispatch_uid='document_index_post_delete', sender=Document)
+def document_index_post_delete(sender, **kwargs):
+    set_document_deleted(kwargs['instance'], deleted=False)
 
 
-@receiver(pre_delete, dispatch_uid='document_metadata_index_delete', sender=DocumentMetadata)
-def document_metadata_index_delete(sender, **kwargs):
-    delete_indexes(kwargs['instance'].document)
+@receiver(post_save, dispatch_uid='document_metadata_index_update', sender=DocumentMetadata)
+def document_metadata_index_update(sender, **kwargs):
+    queue_index_update(kwargs['instance'].document)
 
 
 @receiver(post_delete, dispatch_uid='document_metadata_index_post_delete', sender=DocumentMetadata)
 def document_metadata_index_post_delete(sender, **kwargs):
-    update_indexes(kwargs['instance'].document)
+    queue_index_update(kwargs['instance'].document)
 
 
 register_top_menu('indexes', document_index_main_menu_link)
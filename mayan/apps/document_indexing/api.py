@@ -1,11 +1,16 @@
 from __future__ import absolute_import
 
-from django.db.models import Q
+from contextlib import contextmanager
+import threading
+
+from django.db import transaction
 from django.template.defaultfilters import slugify
+from django.utils.encoding import force_text
 from django.utils.translation import ugettext
 from django.utils.translation import ugettext_lazy as _
 
 from metadata.classes import MetadataClass
+from metadata.models import DocumentMetadata
 
 from .conf.settings import (AVAILABLE_INDEXING_FUNCTIONS,
     MAX_SUFFIX_COUNT, SLUGIFY_PATHS)
@@ -13,7 +18,8 @@ from .exceptions import MaxSuffixCountReached
 from .filesystem import (fs_create_index_directory,
     fs_create_document_link, fs_delete_document_link,
     fs_delete_index_directory, assemble_suffixed_filename)
-from .models import Index, IndexInstanceNode, DocumentRenameCount
+from .models import (Index, IndexTemplateNode, IndexInstanceNode,
+    DocumentRenameCount)
 
 if SLUGIFY_PATHS:
     SLUGIFY_FUNCTION = slugify
@@ -22,28 +28,121 @@ else:
     SLUGIFY_FUNCTION = lambda x: x
 
 
+# Index updates postponed by atomic_index_updates, per thread
+_local = threading.local()
+
+
 # External functions
 def update_indexes(document):
     """
-    Update or create all the index instances related to a document
+    Update or create all the index instances related to a document, only
+    the links to the document that changed are created or removed
     """
-    warnings = []
+    document, template_nodes, links, warnings = evaluate_documents([document])[0]
+
+    instance_nodes = {}
+    current_links = {}
+    for document_rename_count in DocumentRenameCount.objects.filter(document=document).select_related('index_instance_node'):
+        index_instance = document_rename_count.index_instance_node
+        path = get_instance_node_path(index_instance, instance_nodes)
+        if path in current_links:
+            # Left behind by an earlier update
+            warnings.extend(remove_document_link(document, document_rename_count))
+        else:
+            current_links[path] = index_instance
+
+    # New nodes are created before the stale links are removed, the nodes
+    # shared by both are then never empty and are kept
+    for path in sorted(set(template_nodes) - set(instance_nodes), key=len):
+        warnings.extend(get_or_create_instance_node(path, template_nodes, instance_nodes)[1])
 
-    eval_dict = {}
-    document_metadata_dict = dict([(metadata.metadata_type.name, metadata.value) for metadata in document.metadata.all() if metadata.value])
-    eval_dict['document'] = document
-    eval_dict['metadata'] = MetadataClass(document_metadata_dict)
+    for path in sorted(links - set(current_links)):
+        warnings.extend(create_document_link(document, instance_nodes[path]))
 
-    # Only update indexes where the document type is found or that do not have any document type specified
-    for index in Index.objects.filter(Q(enabled=True) & (Q(document_types=None) | Q(document_types=document.document_type))):
-        root_instance, created = IndexInstanceNode.objects.get_or_create(index_template_node=index.template_root, parent=None)
-        for template_node in index.template_root.get_children():
-            index_warnings = cascade_eval(eval_dict, document, template_node, root_instance)
-            warnings.extend(index_warnings)
+    for path in set(current_links) - links:
+        warnings.extend(cascade_document_remove(document, current_links[path]))
 
     return warnings
 
 
+def get_index_templates():
+    """
+    Return the enabled indexes with their template root and the primary
+    keys of the document types they are restricted to.  The template
+    trees are loaded with a single query, the children of each template
+    node are set as its template_children attribute
+    """
+    indexes = list(Index.objects.filter(enabled=True).prefetch_related('document_types'))
+
+    template_roots = {}
+    template_nodes = {}
+    # In tree order, parents are found before their children
+    for template_node in IndexTemplateNode.objects.filter(index__in=indexes).order_by('tree_id', 'lft'):
+        template_node.template_children = []
+        template_nodes[template_node.pk] = template_node
+        if template_node.parent_id:
+            template_nodes[template_node.parent_id].template_children.append(template_node)
+        else:
+            template_roots[template_node.index_id] = template_node
+
+    return [
+        (index, template_roots[index.pk], set([document_type.pk for document_type in index.document_types.all()]))
+        for index in indexes if index.pk in template_roots
+    ]
+
+
+def get_metadata_dicts(documents):
+    """
+    Return the metadata values of each document by metadata type name,
+    read with a single query
+    """
+    metadata_dicts = dict([(document.pk, {}) for document in documents])
+    for document_pk, name, value in DocumentMetadata.objects.filter(document__in=documents).values_list('document', 'metadata_type__name', 'value'):
+        if value:
+            metadata_dicts[document_pk][name] = value
+
+    return metadata_dicts
+
+
+def evaluate_documents(documents, index_templates=None):
+    """
+    Evaluate the indexes for many documents at once, the metadata of all
+    of them and the template trees are loaded once.  Return for each
+    document a tuple of the document, the template nodes of the index
+    instances it belongs to and the subset of those that link to the
+    document, both by path, and the warnings.  Index instance nodes are
+    identified by the path of (template node, value) pairs from the root
+    of their index
+    """
+    if index_templates is None:
+        index_templates = get_index_templates()
+
+    documents = list(documents)
+    metadata_dicts = get_metadata_dicts(documents)
+
+    results = []
+    for document in documents:
+        warnings = []
+
+        eval_dict = {}
+        eval_dict['document'] = document
+        eval_dict['metadata'] = MetadataClass(metadata_dicts[document.pk])
+
+        template_nodes = {}
+        links = set()
+        # Only indexes where the document type is found or that do not have any document type specified
+        for index, template_root, document_type_pks in index_templates:
+            if not document_type_pks or document.document_type_id in document_type_pks:
+                root_path = ((template_root.pk, u''),)
+                template_nodes[root_path] = template_root
+                for template_node in template_root.template_children:
+                    warnings.extend(evaluate_template_node(eval_dict, template_node, root_path, template_nodes, links))
+
+        results.append((document, template_nodes, links, warnings))
+
+    return results
+
+
 def delete_indexes(document):
     """
     Delete all the index instances related to a document
@@ -57,6 +156,64 @@ def delete_indexes(document):
     return warnings
 
 
+@contextmanager
+def atomic_index_updates():
+    """
+    Run a block in a transaction and update the indexes of each document
+    changed inside of it once, before the transaction is committed,
+    instead of once per change.  Unlike SearchModel.defer_index_updates
+    the updates are part of the transaction
+    """
+    if getattr(_local, 'pending', None) is not None:
+        # Nested, the outermost block updates the indexes
+        with transaction.atomic():
+            yield
+        return
+
+    _local.pending = {}
+    try:
+        with transaction.atomic():
+            yield
+            while _local.pending:
+                document_pk, document = _local.pending.popitem()
+                update_indexes(document)
+    finally:
+        _local.pending = None
+
+
+def queue_index_update(document):
+    """
+    Update the indexes of a document, postponed until the end of the
+    current atomic_index_updates block if any
+    """
+    if document.pk in getattr(_local, 'deleted', ()):
+        # Its index links are already gone
+        return
+
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending[document.pk] = document
+    else:
+        update_indexes(document)
+
+
+def set_document_deleted(document, deleted=True):
+    """
+    Stop updating the indexes of a document while it is being deleted,
+    its metadata is deleted after it is removed from the indexes
+    """
+    if not hasattr(_local, 'deleted'):
+        _local.deleted = set()
+
+    if deleted:
+        _local.deleted.add(document.pk)
+        pending = getattr(_local, 'pending', None)
+        if pending:
+            pending.pop(document.pk, None)
+    else:
+        _local.deleted.discard(document.pk)
+
+
 # Internal functions
 def find_lowest_available_suffix(index_instance, document):
     index_instance_documents = DocumentRenameCount.objects.filter(index_instance_node=index_instance)
@@ -71,54 +228,100 @@ def find_lowest_available_suffix(index_instance, document):
     raise MaxSuffixCountReached(ugettext(u'Maximum suffix (%s) count reached.') % MAX_SUFFIX_COUNT)
 
 
-def cascade_eval(eval_dict, document, template_node, parent_index_instance=None):
+def evaluate_template_node(eval_dict, template_node, parent_path, template_nodes, links):
     """
-    Evaluate an enabled index expression and update or create all the
-    related index instances also recursively calling itself to evaluate
-    all the index's children
+    Evaluate an enabled index expression and record the path of the
+    index instance it results in, also recursively calling itself to
+    evaluate all the index's children
     """
     warnings = []
     if template_node.enabled:
         try:
-            result = eval(template_node.expression, eval_dict, AVAILABLE_INDEXING_FUNCTIONS)
+            result = eval(template_node.get_compiled_expression(), eval_dict, AVAILABLE_INDEXING_FUNCTIONS)
         except Exception as exception:
             warnings.append(_(u'Error in document indexing update expression: %(expression)s; %(exception)s') % {
                 'expression': template_node.expression, 'exception': exception})
         else:
             if result:
-                index_instance, created = IndexInstanceNode.objects.get_or_create(index_template_node=template_node, value=result, parent=parent_index_instance)
-                # if created:
-                try:
-                    fs_create_index_directory(index_instance)
-                except Exception as exception:
-                    warnings.append(_(u'Error updating document index, expression: %(expression)s; %(exception)s') % {
-                        'expression': template_node.expression, 'exception': exception})
-
+                path = parent_path + ((template_node.pk, force_text(result)),)
+                template_nodes[path] = template_node
                 if template_node.link_documents:
-                    suffix = find_lowest_available_suffix(index_instance, document)
-                    document_count = DocumentRenameCount(
-                        index_instance_node=index_instance,
-                        document=document,
-                        suffix=suffix
-                    )
-                    document_count.save()
-
-                    try:
-                        fs_create_document_link(index_instance, document, suffix)
-                    except Exception as exception:
-                        warnings.append(_(u'Error updating document index, expression: %(expression)s; %(exception)s') % {
-                            'expression': template_node.expression, 'exception': exception})
-
-                    index_instance.documents.add(document)
-
-                for child in template_node.get_children():
-                    children_warnings = cascade_eval(
-                        eval_dict=eval_dict,
-                        document=document,
-                        template_node=child,
-                        parent_index_instance=index_instance
-                    )
-                    warnings.extend(children_warnings)
+                    links.add(path)
+
+                for child in template_node.template_children:
+                    warnings.extend(evaluate_template_node(eval_dict, child, path, template_nodes, links))
+
+    return warnings
+
+
+def get_instance_node_path(index_instance, instance_nodes):
+    """
+    Return the path of an index instance and record it and its ancestors
+    by path
+    """
+    path = ()
+    for node in index_instance.get_ancestors(include_self=True):
+        path += ((node.index_template_node_id, node.value),)
+        instance_nodes.setdefault(path, node)
+
+    return path
+
+
+def get_or_create_instance_node(path, template_nodes, instance_nodes):
+    """
+    Return the index instance of a path, creating it and its directory
+    if it doesn't exist
+    """
+    warnings = []
+    if path not in instance_nodes:
+        if len(path) > 1:
+            parent, warnings = get_or_create_instance_node(path[:-1], template_nodes, instance_nodes)
+        else:
+            parent = None
+
+        template_node = template_nodes[path]
+        index_instance, created = IndexInstanceNode.objects.get_or_create(index_template_node=template_node, value=path[-1][1], parent=parent)
+        if parent:
+            try:
+                fs_create_index_directory(index_instance)
+            except Exception as exception:
+                warnings.append(_(u'Error updating document index, expression: %(expression)s; %(exception)s') % {
+                    'expression': template_node.expression, 'exception': exception})
+
+        instance_nodes[path] = index_instance
+
+    return instance_nodes[path], warnings
+
+
+def create_document_link(document, index_instance):
+    warnings = []
+    suffix = find_lowest_available_suffix(index_instance, document)
+    document_count = DocumentRenameCount(
+        index_instance_node=index_instance,
+        document=document,
+        suffix=suffix
+    )
+    document_count.save()
+
+    try:
+        fs_create_document_link(index_instance, document, suffix)
+    except Exception as exception:
+        warnings.append(_(u'Error updating document index, expression: %(expression)s; %(exception)s') % {
+            'expression': index_instance.index_template_node.expression, 'exception': exception})
+
+    index_instance.documents.add(document)
+
+    return warnings
+
+
+def remove_document_link(document, document_rename_count):
+    warnings = []
+    try:
+        fs_delete_document_link(document_rename_count.index_instance_node, document, document_rename_count.suffix)
+    except Exception as exception:
+        warnings.append(_(u'Unable to delete document indexing node; %s') % exception)
+
+    document_rename_count.delete()
 
     return warnings
 
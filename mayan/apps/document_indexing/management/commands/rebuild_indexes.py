@@ -0,0 +1,35 @@
+from __future__ import absolute_import
+
+from multiprocessing import cpu_count
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+
+from ...tools import DEFAULT_BATCH_SIZE, do_rebuild_all_indexes
+
+
+class Command(NoArgsCommand):
+    help = 'Rebuild all the document indexes from scratch.'
+    option_list = NoArgsCommand.option_list + (
+        make_option('--batch_size', action='store', dest='batch_size', type='int',
+            default=DEFAULT_BATCH_SIZE, help='Number of documents evaluated '
+                'together by a process.'),
+        make_option('--processes', action='store', dest='processes', type='int',
+            default=cpu_count(), help='Number of processes evaluating the '
+                'indexes of documents at the same time.'),
+    )
+
+    def handle_noargs(self, **options):
+        warnings = do_rebuild_all_indexes(
+            processes=options['processes'],
+            batch_size=max(options['batch_size'], 1),
+            progress=self.report_progress
+        )
+
+        for warning in warnings:
+            print 'Warning: %s' % warning
+
+        print 'Finished.'
+
+    def report_progress(self, count, total):
+        print 'Evaluated %d/%d documents' % (count, total)
@@ -72,9 +72,34 @@ class IndexTemplateNode(MPTTModel):
     enabled = models.BooleanField(default=True, verbose_name=_(u'enabled'), help_text=_(u'Causes this node to be visible and updated when document data changes.'))
     link_documents = models.BooleanField(default=False, verbose_name=_(u'link documents'), help_text=_(u'Check this option to have this node act as a container for documents and not as a parent for further nodes.'))
 
+    # Compiled expression of each node by primary key, with the expression
+    # it was compiled from
+    _compiled_expressions = {}
+
     def __unicode__(self):
         return self.expression
 
+    def save(self, *args, **kwargs):
+        IndexTemplateNode._compiled_expressions.pop(self.pk, None)
+        return super(IndexTemplateNode, self).save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        IndexTemplateNode._compiled_expressions.pop(self.pk, None)
+        return super(IndexTemplateNode, self).delete(*args, **kwargs)
+
+    def get_compiled_expression(self):
+        """
+        Return the expression compiled in to a code object, it is compiled
+        once per process and again when the expression is edited
+        """
+        compiled = IndexTemplateNode._compiled_expressions.get(self.pk)
+        if not compiled or compiled[0] != self.expression:
+            compiled = (self.expression, compile(self.expression, '<index template node: %s>' % self.pk, 'eval'))
+            if self.pk:
+                IndexTemplateNode._compiled_expressions[self.pk] = compiled
+
+        return compiled[1]
+
     @property
     def node_instance(self):
         return self.indexinstancenode_set.get()
@@ -0,0 +1,133 @@
+from __future__ import absolute_import
+
+import os
+
+from django.conf import settings
+from django.core.files.base import File
+from django.test import TestCase
+
+from documents.models import Document, DocumentType
+from metadata.api import save_metadata_list
+from metadata.models import DocumentMetadata, MetadataType
+
+from .api import update_indexes
+from .models import DocumentRenameCount, Index, IndexInstanceNode, IndexTemplateNode
+from .tools import do_rebuild_all_indexes
+
+TEST_SMALL_DOCUMENT_PATH = os.path.join(settings.BASE_DIR, 'contrib', 'sample_documents', 'title_page.png')
+TEST_DOCUMENT_TYPE = 'test_document_type'
+
+
+class IndexTestCase(TestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(name=TEST_DOCUMENT_TYPE)
+        self.metadata_types = [
+            MetadataType.objects.create(name='test_%d' % number, title='test %d' % number)
+            for number in range(2)
+        ]
+        self.index = Index.objects.create(name='test_index', title='Test index')
+
+    def _create_document(self, values):
+        document = Document.objects.create(document_type=self.document_type)
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            document.new_version(file=File(file_object, name='title_page.png'))
+
+        save_metadata_list([{'id': metadata_type.pk, 'value': value} for metadata_type, value in zip(self.metadata_types, values)], document, create=True)
+        return document
+
+    def _create_template_node(self, parent, expression, link_documents=True):
+        return IndexTemplateNode.objects.create(parent=parent, index=self.index, expression=expression, link_documents=link_documents)
+
+    def _get_instance_values(self, document):
+        return sorted(index_instance.value for index_instance in document.indexinstancenode_set.all())
+
+    def tearDown(self):
+        for document in Document.objects.all():
+            document.delete()
+
+
+class UpdateIndexesTestCase(IndexTestCase):
+    def setUp(self):
+        super(UpdateIndexesTestCase, self).setUp()
+        self.template_node = self._create_template_node(self.index.template_root, 'metadata.test_0')
+        self.document = self._create_document(['a'])
+
+    def test_value_change(self):
+        self.assertEqual(self._get_instance_values(self.document), ['a'])
+
+        # Changed without the signals, as an edited index expression would
+        DocumentMetadata.objects.filter(document=self.document).update(value='b')
+        update_indexes(self.document)
+
+        self.assertEqual(self._get_instance_values(self.document), ['b'])
+        # The node left empty is deleted
+        self.assertFalse(IndexInstanceNode.objects.filter(value='a').exists())
+        self.assertEqual(DocumentRenameCount.objects.filter(document=self.document).count(), 1)
+
+    def test_duplicate_link_cleanup(self):
+        index_instance = IndexInstanceNode.objects.get(value='a')
+        DocumentRenameCount.objects.create(index_instance_node=index_instance, document=self.document, suffix=1)
+
+        update_indexes(self.document)
+
+        self.assertEqual(DocumentRenameCount.objects.filter(document=self.document).count(), 1)
+        self.assertEqual(self._get_instance_values(self.document), ['a'])
+
+    def test_disabled_template_node(self):
+        self.template_node.enabled = False
+        self.template_node.save()
+        update_indexes(self.document)
+
+        self.assertEqual(self._get_instance_values(self.document), [])
+        self.assertFalse(DocumentRenameCount.objects.filter(document=self.document).exists())
+
+    def test_no_longer_matching_document_type(self):
+        self.index.document_types.add(DocumentType.objects.create(name='other'))
+        update_indexes(self.document)
+
+        self.assertEqual(self._get_instance_values(self.document), [])
+        self.assertFalse(IndexInstanceNode.objects.filter(value='a').exists())
+
+
+class RebuildIndexesTestCase(IndexTestCase):
+    def _get_snapshot(self):
+        """
+        Return the index instances by path with their tree fields, links
+        and documents
+        """
+        snapshot = []
+        for index_instance in IndexInstanceNode.objects.all():
+            snapshot.append((
+                tuple(ancestor.value for ancestor in index_instance.get_ancestors(include_self=True)),
+                index_instance.level,
+                index_instance.rght - index_instance.lft,
+                tuple(sorted(DocumentRenameCount.objects.filter(index_instance_node=index_instance).values_list('document', 'suffix'))),
+                tuple(sorted(index_instance.documents.values_list('pk', flat=True))),
+            ))
+
+        return sorted(snapshot)
+
+    def test_rebuild_matches_incremental_updates(self):
+        parent_node = self._create_template_node(self.index.template_root, 'metadata.test_0', link_documents=False)
+        self._create_template_node(parent_node, 'metadata.test_1')
+        self._create_template_node(self.index.template_root, 'metadata.test_1')
+        self._create_template_node(self.index.template_root, 'metadata.missing')
+
+        for values in (['a', 'x'], ['a', 'y'], ['b', 'x'], ['a', 'x'], ['b', '']):
+            self._create_document(values)
+
+        incremental = self._get_snapshot()
+        # Documents with the same filename in the same node get suffixes
+        self.assertTrue(any(suffix for path, level, width, links, documents in incremental for document_pk, suffix in links))
+
+        warnings = do_rebuild_all_indexes(batch_size=2)
+
+        # The missing metadata type, for all documents, and the empty value
+        # of the last document, the same warnings are reported once
+        self.assertEqual(len(warnings), 2)
+        self.assertEqual(self._get_snapshot(), incremental)
+
+        # The tree fields are the ones the tree manager computes
+        tree_fields = sorted(IndexInstanceNode.objects.values_list('tree_id', 'lft', 'rght', 'level', 'parent'))
+        IndexInstanceNode.objects.rebuild()
+        self.assertEqual(sorted(IndexInstanceNode.objects.values_list('tree_id', 'lft', 'rght', 'level', 'parent')), tree_fields)
@@ -1,19 +1,306 @@
 from __future__ import absolute_import
 
+import errno
+from multiprocessing import Pool
+import os
+import shutil
+import uuid
+
+from django import db
+from django.db import connection, transaction
+from django.utils.translation import ugettext
+
 from documents.models import Document
 
-from .api import update_indexes
-from .filesystem import fs_delete_directory_recusive
-from .models import Index, IndexInstanceNode, DocumentRenameCount
+from .api import evaluate_documents, get_index_templates
+from .conf.settings import FILESYSTEM_SERVING, MAX_SUFFIX_COUNT
+from .filesystem import assemble_path_from_list, assemble_suffixed_filename
+from .models import IndexInstanceNode, DocumentRenameCount
+
+# Number of documents evaluated together by a worker
+DEFAULT_BATCH_SIZE = 500
+# Number of rows written per insert statement
+BULK_BATCH_SIZE = 1000
+# Separates the name of the served directory of a mirrored index from the
+# version in the name of the hidden directories the served path links to
+VERSION_SEPARATOR = u'.'
+
+# Templates of the enabled indexes, loaded once by each worker process
+_worker_state = {}
+
+
+def do_rebuild_all_indexes(processes=1, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Rebuild all the index instances from scratch.  The index expressions
+    are evaluated for batches of documents by worker processes and the
+    resulting trees are assembled in memory, they are then written with
+    bulk inserts in a single transaction that replaces the existing trees.
+    The filesystem mirrors are created in new directories and the served
+    paths are pointed to them once the transaction is committed.  progress
+    is called with the number of documents evaluated so far and the total
+    """
+    warnings = []
+
+    index_templates = get_index_templates()
+    document_pks = list(Document.objects.order_by('pk').values_list('pk', flat=True))
+    batches = [document_pks[index:index + batch_size] for index in range(0, len(document_pks), batch_size)]
+
+    if processes > 1 and len(batches) > 1:
+        # The processes must not share the parent's connection
+        db.close_connection()
+        pool = Pool(processes=processes, initializer=initialize_worker)
+        results = pool.imap_unordered(evaluate_batch, batches)
+    else:
+        pool = None
+        _worker_state['index_templates'] = index_templates
+        results = (evaluate_batch(batch) for batch in batches)
+
+    # The root of every enabled index exists even if it is empty
+    node_paths = set([((template_root.pk, u''),) for index, template_root, document_type_pks in index_templates])
+    links = {}
+    count = 0
+    try:
+        for batch_results in results:
+            for document_pk, filename, filepath, document_node_paths, document_links, document_warnings in batch_results:
+                node_paths.update(document_node_paths)
+                for path in document_links:
+                    links.setdefault(path, []).append((document_pk, filename, filepath))
+                warnings.extend(document_warnings)
+
+            count += len(batch_results)
+            if progress:
+                progress(count, len(document_pks))
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+
+    instance_nodes = build_instance_nodes(node_paths)
+    document_links, suffix_warnings = assign_suffixes(links)
+    warnings.extend(suffix_warnings)
+
+    index_names = dict([(template_root.pk, index.name) for index, template_root, document_type_pks in index_templates])
+    directories, directory_warnings = create_shadow_directories(instance_nodes, document_links, index_names)
+    warnings.extend(directory_warnings)
+
+    with transaction.atomic():
+        IndexInstanceNode.documents.through.objects.all().delete()
+        DocumentRenameCount.objects.all().delete()
+        # Deleted with a single statement instead of being collected one by
+        # one for the cascade, their relations were deleted above
+        IndexInstanceNode.objects.update(parent=None)
+        cursor = connection.cursor()
+        cursor.execute('DELETE FROM %s' % connection.ops.quote_name(IndexInstanceNode._meta.db_table))
+
+        write_instance_nodes(instance_nodes)
+        write_document_links(instance_nodes, document_links)
+
+    warnings.extend(swap_shadow_directories(directories))
+
+    # Remove duplicates, the same expression usually fails for many documents
+    return sorted(set(warnings))
+
+
+def initialize_worker():
+    _worker_state['index_templates'] = get_index_templates()
+
+
+def evaluate_batch(document_pks):
+    """
+    Evaluate the indexes for a batch of documents, return for each one
+    its primary key, the filename and path of its file, the paths of the
+    index instances it belongs to, the paths of those linking to it and
+    the evaluation warnings
+    """
+    results = []
+    documents = Document.objects.filter(pk__in=document_pks).select_related('latest_version')
+    for document, template_nodes, links, warnings in evaluate_documents(documents, _worker_state['index_templates']):
+        if document.latest_version:
+            filename, filepath = document.latest_version.filename, document.latest_version.file.path
+        else:
+            # Nothing to link to
+            filename, filepath, links = None, None, set()
+
+        results.append((document.pk, filename, filepath, list(template_nodes), list(links), [unicode(warning) for warning in warnings]))
+
+    return results
+
+
+def build_instance_nodes(node_paths):
+    """
+    Return a dictionary of unsaved index instance nodes by path, with their
+    tree fields computed as the tree manager's rebuild would, but without
+    querying the database for each node
+    """
+    children = {}
+    roots = []
+    for path in node_paths:
+        if len(path) == 1:
+            roots.append(path)
+        else:
+            children.setdefault(path[:-1], []).append(path)
+
+    instance_nodes = {}
+
+    def add_node(path, left, tree_id, level):
+        right = left + 1
+        for child_path in sorted(children.get(path, []), key=lambda child_path: child_path[-1][1]):
+            right = add_node(child_path, right, tree_id, level + 1) + 1
+
+        instance_nodes[path] = IndexInstanceNode(
+            index_template_node_id=path[-1][0], value=path[-1][1],
+            lft=left, rght=right, tree_id=tree_id, level=level
+        )
+        return right
+
+    for tree_id, root_path in enumerate(sorted(roots), 1):
+        add_node(root_path, 1, tree_id, 0)
+
+    return instance_nodes
+
+
+def assign_suffixes(links):
+    """
+    Return the documents linked to each index instance path with the suffix
+    that makes their filename unique in it, in order of creation
+    """
+    warnings = []
+    document_links = {}
+    for path, documents in links.items():
+        used_filenames = set()
+        next_suffixes = {}
+        document_links[path] = []
+        for document_pk, filename, filepath in sorted(documents):
+            suffix = next_suffixes.get(filename, 0)
+            while assemble_suffixed_filename(filename, suffix) in used_filenames:
+                suffix += 1
+
+            if suffix >= MAX_SUFFIX_COUNT:
+                warnings.append(ugettext(u'Maximum suffix (%s) count reached.') % MAX_SUFFIX_COUNT)
+                continue
+
+            used_filenames.add(assemble_suffixed_filename(filename, suffix))
+            next_suffixes[filename] = suffix + 1
+            document_links[path].append((document_pk, filename, filepath, suffix))
+
+    return document_links, warnings
+
+
+def write_instance_nodes(instance_nodes):
+    """
+    Insert the index instance nodes one tree level at a time, so that the
+    primary keys of the parents are known when their children are inserted
+    """
+    paths_by_level = {}
+    for path in instance_nodes:
+        paths_by_level.setdefault(len(path), []).append(path)
+
+    for level in sorted(paths_by_level):
+        paths = paths_by_level[level]
+        for path in paths:
+            if level > 1:
+                instance_nodes[path].parent_id = instance_nodes[path[:-1]].pk
+
+        IndexInstanceNode.objects.bulk_create([instance_nodes[path] for path in paths], batch_size=BULK_BATCH_SIZE)
+        # Bulk inserts don't return the primary keys, the tree fields
+        # identify the nodes
+        pks = dict([((tree_id, left), pk) for pk, tree_id, left in IndexInstanceNode.objects.filter(level=level - 1).values_list('pk', 'tree_id', 'lft')])
+        for path in paths:
+            instance_nodes[path].pk = pks[(instance_nodes[path].tree_id, instance_nodes[path].lft)]
+
+
+def write_document_links(instance_nodes, document_links):
+    DocumentRenameCount.objects.bulk_create([
+        DocumentRenameCount(index_instance_node_id=instance_nodes[path].pk, document_id=document_pk, suffix=suffix)
+        for path, documents in document_links.items() for document_pk, filename, filepath, suffix in documents
+    ], batch_size=BULK_BATCH_SIZE)
+
+    IndexInstanceNode.documents.through.objects.bulk_create([
+        IndexInstanceNode.documents.through(indexinstancenode_id=instance_nodes[path].pk, document_id=document_pk)
+        for path, documents in document_links.items() for document_pk, filename, filepath, suffix in documents
+    ], batch_size=BULK_BATCH_SIZE)
+
+
+def get_version_directory(target_directory):
+    """
+    Return the path of a new hidden directory next to the served path of a
+    mirrored index, for the served path to be linked to
+    """
+    parent_directory, name = os.path.split(os.path.normpath(target_directory))
+    return os.path.join(parent_directory, u'.%s%s%s' % (name, VERSION_SEPARATOR, uuid.uuid4().hex))
+
+
+def is_version_directory(target_directory, directory):
+    parent_directory, name = os.path.split(os.path.normpath(target_directory))
+    return os.path.dirname(directory) == parent_directory and os.path.basename(directory).startswith(u'.%s%s' % (name, VERSION_SEPARATOR))
+
+
+def create_shadow_directories(instance_nodes, document_links, index_names):
+    """
+    Create the filesystem mirror of the new index trees in a new hidden
+    directory next to the served path of each mirrored index, return the
+    new directories by index name and the warnings
+    """
+    warnings = []
+    directories = {}
+    for name, target_directory in FILESYSTEM_SERVING.items():
+        directory = get_version_directory(target_directory)
+        try:
+            os.mkdir(directory)
+        except OSError as exception:
+            warnings.append(ugettext(u'Unable to create indexing directory; %s') % exception)
+        else:
+            directories[name] = directory
+
+    for path in sorted(instance_nodes, key=len):
+        name = index_names.get(path[0][0])
+        if name in directories and len(path) > 1:
+            directory = assemble_path_from_list([directories[name]] + [value for template_node_pk, value in path])
+            try:
+                os.mkdir(directory)
+            except OSError as exception:
+                if exception.errno != errno.EEXIST:
+                    warnings.append(ugettext(u'Unable to create indexing directory; %s') % exception)
+                    continue
+
+            for document_pk, filename, filepath, suffix in document_links.get(path, []):
+                try:
+                    os.symlink(filepath, os.path.join(directory, assemble_suffixed_filename(filename, suffix)))
+                except OSError as exception:
+                    warnings.append(ugettext(u'Unable to create symbolic link: %(filepath)s; %(exception)s') % {'filepath': filepath, 'exception': exception})
+
+    return directories, warnings
+
 
+def swap_shadow_directories(directories):
+    """
+    Point the served path of each mirrored index to its new directory by
+    renaming a new symbolic link over it, clients see either the previous
+    or the new mirror.  The previous directory is then deleted
+    """
+    warnings = []
+    for name, directory in directories.items():
+        target_directory = os.path.normpath(FILESYSTEM_SERVING[name])
+        previous_directory = None
+        try:
+            if os.path.islink(target_directory):
+                previous_directory = os.path.join(os.path.dirname(target_directory), os.readlink(target_directory))
+            elif os.path.isdir(target_directory):
+                # Served from a plain directory until now, it is moved aside
+                # once so that the path can become a symbolic link
+                previous_directory = get_version_directory(target_directory)
+                os.rename(target_directory, previous_directory)
 
-def do_rebuild_all_indexes():
-    for index in Index.objects.all():
-        fs_delete_directory_recusive(index)
+            link = get_version_directory(target_directory)
+            os.symlink(os.path.basename(directory), link)
+            os.rename(link, target_directory)
+        except OSError as exception:
+            warnings.append(ugettext(u'Unable to update indexing directory; %s') % exception)
+            shutil.rmtree(directory, ignore_errors=True)
+            continue
 
-    IndexInstanceNode.objects.all().delete()
-    DocumentRenameCount.objects.all().delete()
-    for document in Document.objects.all():
-        update_indexes(document)
+        # Not deleted if the served path linked to a directory of its own
+        if previous_directory and is_version_directory(target_directory, previous_directory):
+            shutil.rmtree(previous_directory, ignore_errors=True)
 
-    return []  # Warnings - None
+    return warnings
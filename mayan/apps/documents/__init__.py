@@ -1,11 +1,11 @@
 from __future__ import absolute_import
 
-import tempfile
-
+from django.db.models.signals import pre_delete, pre_save
+from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 
 from acls.api import class_permissions
-from common.utils import validate_path, encapsulate
+from common.utils import encapsulate
 from dynamic_search.classes import SearchModel
 from history.api import register_history_type
 from history.permissions import PERMISSION_HISTORY_VIEW
@@ -15,9 +15,9 @@ from navigation.api import (register_links, register_top_menu,
     register_sidebar_template)
 from project_setup.api import register_setup
 from rest_api.classes import APIEndPoint
+from scheduler.api import register_interval_job
 from statistics.classes import StatisticNamespace
 
-from .conf import settings as document_settings
 from .conf.settings import THUMBNAIL_SIZE
 from .events import (HISTORY_DOCUMENT_CREATED,
     HISTORY_DOCUMENT_EDITED, HISTORY_DOCUMENT_DELETED)
@@ -46,10 +46,15 @@ from .permissions import (
     PERMISSION_DOCUMENT_DELETE, PERMISSION_DOCUMENT_DOWNLOAD,
     PERMISSION_DOCUMENT_TRANSFORM, PERMISSION_DOCUMENT_EDIT,
     PERMISSION_DOCUMENT_VERSION_REVERT, PERMISSION_DOCUMENT_NEW_VERSION)
-from .statistics import DocumentStatistics, DocumentUsageStatistics
+from .statistics import (DocumentImageCacheStatistics, DocumentStatistics,
+                         DocumentUsageStatistics)
+from .tasks import task_delete_unreferenced_files
 from .urls import api_urls
 from .widgets import document_thumbnail
 
+DELETE_UNREFERENCED_FILES_INTERVAL = 600
+register_interval_job('task_delete_unreferenced_files', _(u'Deletes the stored files of deleted document versions.'), task_delete_unreferenced_files, seconds=DELETE_UNREFERENCED_FILES_INTERVAL)
+
 # History setup
 register_history_type(HISTORY_DOCUMENT_CREATED)
 register_history_type(HISTORY_DOCUMENT_EDITED)
@@ -123,9 +128,6 @@ register_links(Document, [document_view_advanced], menu_name='form_header', posi
 register_links(Document, [document_history_view], menu_name='form_header')
 register_links(Document, [document_version_list], menu_name='form_header')
 
-if (not validate_path(document_settings.CACHE_PATH)) or (not document_settings.CACHE_PATH):
-    setattr(document_settings, 'CACHE_PATH', tempfile.mkdtemp())
-
 register_setup(document_type_setup)
 
 class_permissions(Document, [
@@ -150,10 +152,26 @@ document_search.add_model_field('versions__pages__content', label=_(u'Content'))
 document_search.add_model_field('description', label=_(u'Description'))
 document_search.add_model_field('tags__name', label=_(u'Tags'))
 document_search.add_related_field('comments', 'Comment', 'comment', 'object_pk', label=_(u'Comments'))
+document_search.add_index_trigger(Document, lambda instance: [instance.pk])
+# A document type is shared by many documents, they are indexed in the background
+document_search.add_index_trigger(DocumentType, lambda instance: instance.document_set.values_list('pk', flat=True), background=True)
+document_search.add_index_trigger(DocumentVersion, lambda instance: [instance.document_id])
+document_search.add_index_trigger(DocumentPage, lambda instance: [instance.document_version.document_id])
+
+
+@receiver(pre_save, dispatch_uid='document_page_transformation_invalidate_cache', sender=DocumentPageTransformation)
+@receiver(pre_delete, dispatch_uid='document_page_transformation_delete_invalidate_cache', sender=DocumentPageTransformation)
+def invalidate_page_image_cache(sender, instance, **kwargs):
+    # Runs before the change so the cache key still reflects the
+    # transformations the cached images were created with
+    document_page = instance.document_page
+    document_page.document.invalidate_cached_image(document_page.page_number, version=document_page.document_version_id)
+
 
 namespace = StatisticNamespace(name='documents', label=_(u'Documents'))
 namespace.add_statistic(DocumentStatistics(name='document_stats', label=_(u'Document tendencies')))
 namespace.add_statistic(DocumentUsageStatistics(name='document_usage', label=_(u'Document usage')))
+namespace.add_statistic(DocumentImageCacheStatistics(name='document_image_cache', label=_(u'Document image cache')))
 
 endpoint = APIEndPoint('documents')
 endpoint.register_urls(api_urls)
@@ -31,7 +31,7 @@ class APIDocumentListView(generics.ListCreateAPIView):
     """
 
     serializer_class = DocumentSerializer
-    queryset = Document.objects.all()
+    queryset = Document.objects.with_latest_version().prefetch_related('versions__pages')
 
     permission_classes = (MayanPermission,)
     filter_backends = (MayanObjectPermissionsFilter,)
@@ -45,7 +45,7 @@ class APIDocumentView(generics.RetrieveUpdateDestroyAPIView):
     """
 
     serializer_class = DocumentSerializer
-    queryset = Document.objects.all()
+    queryset = Document.objects.with_latest_version().prefetch_related('versions__pages')
 
     permission_classes = (MayanPermission,)
     mayan_object_permissions = {
@@ -42,5 +42,10 @@ register_settings(
         {'name': u'ROTATION_STEP', 'global_name': u'DOCUMENTS_ROTATION_STEP', 'default': 90, 'description': _(u'Amount in degrees to rotate a document page per user interaction.')},
         #
         {'name': u'CACHE_PATH', 'global_name': u'DOCUMENTS_CACHE_PATH', 'default': os.path.join(settings.MEDIA_ROOT, 'image_cache'), 'exists': True},
+        {'name': u'CACHE_MAXIMUM_SIZE', 'global_name': u'DOCUMENTS_CACHE_MAXIMUM_SIZE', 'default': 500 * 1024 * 1024, 'description': _(u'Maximum size in bytes of the document page image cache.  Least recently used page images are deleted when the cache grows past this size.  Use None to disable the limit.')},
+        {'name': u'CACHE_MEMORY_SIZE', 'global_name': u'DOCUMENTS_CACHE_MEMORY_SIZE', 'default': 0, 'description': _(u'Amount of memory in bytes each process can use to keep frequently requested page images such as thumbnails.  A value of 0 disables the memory cache.')},
+        {'name': u'CACHE_WARM_ON_UPLOAD', 'global_name': u'DOCUMENTS_CACHE_WARM_ON_UPLOAD', 'default': False, 'description': _(u'Render the images of all the pages of new document versions into the image cache when they are uploaded, so that they are ready when first viewed.')},
+        {'name': u'VARIANT_CACHE_PATH', 'global_name': u'DOCUMENTS_VARIANT_CACHE_PATH', 'default': os.path.join(settings.MEDIA_ROOT, 'image_variant_cache'), 'exists': True},
+        {'name': u'VARIANT_CACHE_MAXIMUM_SIZE', 'global_name': u'DOCUMENTS_VARIANT_CACHE_MAXIMUM_SIZE', 'default': 200 * 1024 * 1024, 'description': _(u'Maximum size in bytes of the cache of resized, zoomed and rotated page images.  Use None to disable the limit.')},
     ]
 )
@@ -0,0 +1,66 @@
+from __future__ import absolute_import
+
+from optparse import make_option
+
+from django.core.files import File
+from django.core.management.base import CommandError, LabelCommand
+
+from common.utils import load_backend
+
+from ...models import DocumentVersion
+from ...runtime import storage_backend
+
+
+class Command(LabelCommand):
+    args = '<source storage backend>'
+    help = 'Copy the files of all document versions from the given storage backend, for example storage.backends.filebasedstorage.FileBasedStorage, to the currently configured storage backend.'
+    option_list = LabelCommand.option_list + (
+        make_option('--noinput', action='store_false', dest='interactive',
+            default=True, help='Do not ask the user for confirmation before '
+                'starting.'),
+        make_option('--keep', action='store_true', dest='keep',
+            default=False, help='Do not delete the files from the source '
+                'storage backend after they are copied.'),
+    )
+
+    def handle_label(self, label, **options):
+        try:
+            source_backend = load_backend(label)()
+        except (ImportError, AttributeError) as exception:
+            raise CommandError('Unable to load storage backend: %s; %s' % (label, exception))
+
+        if _confirm(options['interactive']) != 'yes':
+            print 'Cancelled.'
+            return
+
+        total = DocumentVersion.objects.count()
+        stored_names = set()
+        for index, document_version in enumerate(DocumentVersion.objects.order_by('pk').iterator()):
+            source_name = document_version.file.name
+            descriptor = source_backend.open(source_name)
+            try:
+                new_name = storage_backend.save(source_name, File(descriptor))
+            finally:
+                descriptor.close()
+
+            if new_name in stored_names:
+                print '%d/%d %s: duplicate of an already stored file' % (index + 1, total, document_version)
+            else:
+                print '%d/%d %s: stored as %s' % (index + 1, total, document_version, new_name)
+
+            stored_names.add(new_name)
+
+            if new_name != source_name:
+                DocumentVersion.objects.filter(pk=document_version.pk).update(file=new_name)
+                if not options['keep'] and not DocumentVersion.objects.filter(file=source_name).exists():
+                    source_backend.delete(source_name)
+
+        print 'Finished.'
+
+
+def _confirm(interactive):
+    if not interactive:
+        return 'yes'
+    return raw_input('You have requested to copy the files of all document versions to the current storage backend.\n'
+            'Are you sure you want to do this?\n'
+            'Type \'yes\' to continue, or any other value to cancel: ')
@@ -1,11 +1,46 @@
 from __future__ import absolute_import
 
 from ast import literal_eval
+import datetime
+import logging
 
 from django.db import models
+from django.db.models.signals import post_save
 from django.utils.timezone import now
 
-from .conf.settings import RECENT_COUNT
+from converter.exceptions import ConvertError
+
+from .conf.settings import (CACHE_WARM_ON_UPLOAD, CHECKSUM_FUNCTION,
+                            RECENT_COUNT, UUID_FUNCTION, default_checksum)
+from .utils import IngestFile
+
+logger = logging.getLogger(__name__)
+
+
+class DeletedVersionFileManager(models.Manager):
+    def delete_unreferenced_files(self, grace_period):
+        """
+        Delete the stored files of the deleted document versions that no
+        version references anymore.  Files saved again in the last
+        grace_period seconds are left for a later run, the version they
+        were saved for may not be committed yet
+        """
+        document_version_model = models.get_model('documents', 'DocumentVersion')
+        storage = document_version_model._meta.get_field('file').storage
+
+        for deleted_file in self.filter(datetime_deleted__lte=now() - datetime.timedelta(seconds=grace_period)):
+            if not document_version_model.objects.filter(file=deleted_file.name).exists():
+                try:
+                    if storage.exists(deleted_file.name):
+                        if storage.modified_time(deleted_file.name) > datetime.datetime.now() - datetime.timedelta(seconds=grace_period):
+                            continue
+
+                        storage.delete(deleted_file.name)
+                except Exception as exception:
+                    logger.error('error deleting stored file: %s; %s' % (deleted_file.name, exception))
+                    continue
+
+            deleted_file.delete()
 
 
 class DocumentPageTransformationManager(models.Manager):
@@ -52,3 +87,104 @@ class RecentDocumentManager(models.Manager):
 class DocumentTypeManager(models.Manager):
     def get_by_natural_key(self, name):
         return self.get(name=name)
+
+
+class DocumentManager(models.Manager):
+    def with_latest_version(self):
+        """
+        Return the documents along with their latest version, so that the
+        properties of the documents of a list don't query the versions
+        """
+        return self.select_related('latest_version')
+
+    def create_from_files(self, file_objects, document_type=None, description=None):
+        """
+        Create a new document with a single version for each file, using
+        one bulk insert for the documents, one for the versions and one
+        for the pages instead of several queries per file.
+        The post save signals of the new documents and versions are sent
+        once everything is stored.  Return the new documents in the same
+        order as the files
+        """
+        document_version_model = models.get_model('documents', 'DocumentVersion')
+        document_page_model = models.get_model('documents', 'DocumentPage')
+
+        timestamp = now()
+        documents = [
+            self.model(uuid=UUID_FUNCTION(), document_type=document_type, description=description, date_added=timestamp)
+            for file_object in file_objects
+        ]
+        self.bulk_create(documents)
+        # bulk_create doesn't return the primary keys of the new rows
+        document_pks = dict(self.filter(uuid__in=[document.uuid for document in documents]).values_list('uuid', 'pk'))
+
+        versions = []
+        page_counts = []
+        ingests = []
+        stored_files = []
+        try:
+            try:
+                for document, file_object in zip(documents, file_objects):
+                    document.pk = document_pks[document.uuid]
+                    version = document_version_model(document=document, file=file_object, timestamp=timestamp)
+                    # Gather the file's properties while the storage backend
+                    # reads it, same as when saving a single new version
+                    ingest = IngestFile(version.file.file, checksum=CHECKSUM_FUNCTION is default_checksum)
+                    ingests.append(ingest)
+                    version.file.file = ingest
+                    version.file.save(version.file.name, version.file, save=False)
+                    stored_files.append(version.file)
+
+                    if version.update_from_ingest(ingest):
+                        page_counts.append(version.detect_page_count(filepath=ingest.get_filepath()))
+                    else:
+                        version.update_checksum(save=False)
+                        version.update_mimetype(save=False)
+                        page_counts.append(version.detect_page_count())
+
+                    versions.append(version)
+            finally:
+                for ingest in ingests:
+                    ingest.cleanup()
+
+            document_version_model.objects.bulk_create(versions)
+            version_pks = dict(document_version_model.objects.filter(document__in=document_pks.values()).values_list('document', 'pk'))
+
+            pages = []
+            for version, page_count in zip(versions, page_counts):
+                version.pk = version_pks[version.document.pk]
+                self.filter(pk=version.document.pk).update(latest_version=version)
+                version.document.latest_version = version
+                for key in sorted(document_version_model._post_save_hooks):
+                    document_version_model._post_save_hooks[key](version)
+
+                pages.extend(document_page_model(document_version=version, page_number=page_number + 1) for page_number in range(page_count))
+
+            document_page_model.objects.bulk_create(pages)
+        except Exception:
+            # The rows are rolled back with the transaction but the files
+            # are already in the storage.  Content addressed storage
+            # backends return the name of the existing file for content
+            # already stored, so only the files no version outside of this
+            # batch references are deleted, once each
+            for name in set(stored_file.name for stored_file in stored_files):
+                if document_version_model.objects.filter(file=name).exclude(document__in=document_pks.values()).exists():
+                    continue
+
+                try:
+                    document_version_model._meta.get_field('file').storage.delete(name)
+                except Exception as exception:
+                    logger.error('error deleting stored file: %s; %s' % (name, exception))
+            raise
+
+        for document, version in zip(documents, versions):
+            post_save.send(sender=self.model, instance=document, created=True, raw=False, using=self.db, update_fields=None)
+            post_save.send(sender=document_version_model, instance=version, created=True, raw=False, using=self.db, update_fields=None)
+
+            if CACHE_WARM_ON_UPLOAD:
+                try:
+                    document.create_image_cache(version=version.pk)
+                except ConvertError as exception:
+                    logger.error('error warming the image cache of document version: %s; %s' % (version.pk, exception))
+
+        return documents
@@ -19,23 +19,27 @@ from django.utils.timezone import now
 from django.utils.translation import ugettext
 from django.utils.translation import ugettext_lazy as _
 
-from converter.api import (convert, get_page_count,
+from converter.api import (convert, convert_pages, get_page_count,
                            get_available_transformations_choices)
-from converter.exceptions import UnknownFileFormat
-from converter.literals import (DEFAULT_ZOOM_LEVEL, DEFAULT_ROTATION,
-                                DEFAULT_PAGE_NUMBER)
-from mimetype.api import get_mimetype
-
-from .conf.settings import (CACHE_PATH, CHECKSUM_FUNCTION, DISPLAY_SIZE,
-                            UUID_FUNCTION, ZOOM_MAX_LEVEL, ZOOM_MIN_LEVEL)
+from converter.exceptions import ConvertError, UnknownFileFormat
+from converter.literals import (DEFAULT_FILE_FORMAT_MIMETYPE,
+                                DEFAULT_PAGE_NUMBER, DEFAULT_ROTATION,
+                                DEFAULT_ZOOM_LEVEL)
+from dynamic_search.classes import SearchModel
+from mimetype.api import get_buffer_mimetype, get_mimetype
+
+from .conf.settings import (CACHE_WARM_ON_UPLOAD, CHECKSUM_FUNCTION,
+                            DISPLAY_SIZE, UUID_FUNCTION, ZOOM_MAX_LEVEL,
+                            ZOOM_MIN_LEVEL, default_checksum)
 from .exceptions import NewDocumentVersionNotAllowed
 from .literals import (RELEASE_LEVEL_CHOICES, RELEASE_LEVEL_FINAL,
                        VERSION_UPDATE_MAJOR, VERSION_UPDATE_MICRO,
                        VERSION_UPDATE_MINOR)
-from .managers import (DocumentPageTransformationManager, DocumentTypeManager,
+from .managers import (DeletedVersionFileManager, DocumentManager,
+                       DocumentPageTransformationManager, DocumentTypeManager,
                        RecentDocumentManager)
-from .runtime import storage_backend
-from .utils import document_save_to_temp_dir
+from .runtime import page_image_cache, storage_backend, variant_image_cache
+from .utils import IngestFile, document_save_to_temp_dir
 
 # document image cache name hash function
 HASH_FUNCTION = lambda x: hashlib.sha256(x).hexdigest()
@@ -81,13 +85,15 @@ class Document(models.Model):
     document_type = models.ForeignKey(DocumentType, verbose_name=_(u'document type'), null=True, blank=True)
     description = models.TextField(blank=True, null=True, verbose_name=_(u'description'))
     date_added = models.DateTimeField(verbose_name=_(u'added'), db_index=True, editable=False)
+    # Maintained by the document versions when they are created and deleted
+    latest_version = models.ForeignKey('DocumentVersion', null=True, blank=True, editable=False, related_name='+', on_delete=models.SET_NULL, verbose_name=_(u'latest version'))
+
+    objects = DocumentManager()
 
     @staticmethod
     def clear_image_cache():
-        for the_file in os.listdir(CACHE_PATH):
-            file_path = os.path.join(CACHE_PATH, the_file)
-            if os.path.isfile(file_path):
-                os.unlink(file_path)
+        page_image_cache.clear()
+        variant_image_cache.clear()
 
     class Meta:
         verbose_name = _(u'document')
@@ -111,30 +117,77 @@ class Document(models.Model):
             self.date_added = now()
         super(Document, self).save(*args, **kwargs)
 
+    def get_image_cache_key(self, page, version):
+        return DocumentPage.objects.get(document_version=version, page_number=page).get_image_cache_key()
+
     def get_cached_image_name(self, page, version):
-        document_version = DocumentVersion.objects.get(pk=version)
-        document_page = document_version.pages.get(page_number=page)
-        transformations, warnings = document_page.get_transformation_list()
-        hash_value = HASH_FUNCTION(u''.join([document_version.checksum, unicode(page), unicode(transformations)]))
-        return os.path.join(CACHE_PATH, hash_value), transformations
+        cache_key, transformations = self.get_image_cache_key(page, version)
+        return page_image_cache.get_path(cache_key), transformations
 
     def get_image_cache_name(self, page, version):
-        cache_file_path, transformations = self.get_cached_image_name(page, version)
-        if os.path.exists(cache_file_path):
+        cache_key, transformations = self.get_image_cache_key(page, version)
+        cache_file_path = page_image_cache.get_path(cache_key)
+        if page_image_cache.exists(cache_key):
             return cache_file_path
         else:
             document_version = DocumentVersion.objects.get(pk=version)
             document_file = document_save_to_temp_dir(document_version, document_version.checksum)
-            return convert(document_file, output_filepath=cache_file_path, page=page, transformations=transformations, mimetype=self.file_mimetype)
+            convert(document_file, output_filepath=cache_file_path, page=page, transformations=transformations, mimetype=self.file_mimetype, checksum=document_version.checksum)
+            page_image_cache.commit(cache_key)
+            return cache_file_path
 
-    def get_valid_image(self, size=DISPLAY_SIZE, page=DEFAULT_PAGE_NUMBER, zoom=DEFAULT_ZOOM_LEVEL, rotation=DEFAULT_ROTATION, version=None):
+    def get_variant_cache_key(self, page, version, size, zoom, rotation):
+        cache_key, transformations = self.get_image_cache_key(page, version)
+        return variant_image_cache.get_group_key(cache_key, HASH_FUNCTION(u''.join([unicode(size), unicode(zoom), unicode(rotation)]))), cache_key
+
+    def create_image_cache(self, version=None, pages=None):
+        """
+        Render the images of several pages of a document version into the
+        page image cache with a single converter run, by default all the
+        pages are rendered
+        """
         if not version:
             version = self.latest_version.pk
-        image_cache_name = self.get_image_cache_name(page=page, version=version)
 
-        logger.debug('image_cache_name: %s' % image_cache_name)
+        document_version = DocumentVersion.objects.get(pk=version)
+        document_pages = document_version.pages.all()
+        if pages is not None:
+            document_pages = document_pages.filter(page_number__in=pages)
+
+        cache_keys = []
+        missing_pages = []
+        for document_page in document_pages:
+            cache_key, transformations = document_page.get_image_cache_key()
+            if not page_image_cache.exists(cache_key):
+                cache_keys.append(cache_key)
+                missing_pages.append((document_page.page_number, page_image_cache.get_path(cache_key), transformations))
+
+        if missing_pages:
+            document_file = document_save_to_temp_dir(document_version, document_version.checksum)
+            convert_pages(document_file, missing_pages, mimetype=self.file_mimetype, checksum=document_version.checksum)
+            for cache_key in cache_keys:
+                page_image_cache.commit(cache_key)
 
-        return convert(image_cache_name, cleanup_files=False, size=size, zoom=zoom, rotation=rotation)
+    def get_image_variant(self, size=DISPLAY_SIZE, page=DEFAULT_PAGE_NUMBER, zoom=DEFAULT_ZOOM_LEVEL, rotation=DEFAULT_ROTATION, version=None):
+        """
+        Return the variant cache key and file path of a page image with the
+        given size, zoom and rotation applied, creating it if needed
+        """
+        if not version:
+            version = self.latest_version.pk
+
+        variant_cache_key, cache_key = self.get_variant_cache_key(page=page, version=version, size=size, zoom=zoom, rotation=rotation)
+        variant_file_path = variant_image_cache.get_path(variant_cache_key)
+        if not variant_image_cache.exists(variant_cache_key):
+            image_cache_name = self.get_image_cache_name(page=page, version=version)
+            logger.debug('image_cache_name: %s' % image_cache_name)
+            convert(image_cache_name, output_filepath=variant_file_path, cleanup_files=False, size=size, zoom=zoom, rotation=rotation)
+            variant_image_cache.commit(variant_cache_key)
+
+        return variant_cache_key, variant_file_path
+
+    def get_valid_image(self, size=DISPLAY_SIZE, page=DEFAULT_PAGE_NUMBER, zoom=DEFAULT_ZOOM_LEVEL, rotation=DEFAULT_ROTATION, version=None):
+        return self.get_image_variant(size=size, page=page, zoom=zoom, rotation=rotation, version=version)[1]
 
     def get_image(self, size=DISPLAY_SIZE, page=DEFAULT_PAGE_NUMBER, zoom=DEFAULT_ZOOM_LEVEL, rotation=DEFAULT_ROTATION, as_base64=False, version=None):
         if zoom < ZOOM_MIN_LEVEL:
@@ -145,23 +198,22 @@ class Document(models.Model):
 
         rotation = rotation % 360
 
-        file_path = self.get_valid_image(size=size, page=page, zoom=zoom, rotation=rotation, version=version)
+        variant_cache_key, file_path = self.get_image_variant(size=size, page=page, zoom=zoom, rotation=rotation, version=version)
         logger.debug('file_path: %s' % file_path)
 
         if as_base64:
-            mimetype = get_mimetype(open(file_path, 'r'), file_path, mimetype_only=True)[0]
-            image = open(file_path, 'r')
-            base64_data = base64.b64encode(image.read())
-            image.close()
-            return u'data:%s;base64,%s' % (mimetype, base64_data)
+            # Variants are always created in the default file format
+            return u'data:%s;base64,%s' % (DEFAULT_FILE_FORMAT_MIMETYPE, base64.b64encode(variant_image_cache.read(variant_cache_key)))
         else:
             return file_path
 
-    def invalidate_cached_image(self, page):
-        try:
-            os.unlink(self.get_cached_image_name(page, self.latest_version.pk)[0])
-        except OSError:
-            pass
+    def invalidate_cached_image(self, page, version=None):
+        if not version:
+            version = self.latest_version.pk
+
+        cache_key = self.get_image_cache_key(page, version)[0]
+        page_image_cache.invalidate(cache_key)
+        variant_image_cache.invalidate_group(cache_key)
 
     def add_as_recent_document_for_user(self, user):
         RecentDocument.objects.add_document_for_user(user, self)
@@ -264,9 +316,12 @@ class Document(models.Model):
     def page_count(self):
         return self.pages.count()
 
-    @property
-    def latest_version(self):
-        return self.versions.order_by('timestamp').last()
+    def update_latest_version(self):
+        """
+        Point the latest version field to the newest version of the document
+        """
+        self.latest_version = self.versions.order_by('timestamp').last()
+        Document.objects.filter(pk=self.pk).update(latest_version=self.latest_version)
 
     @property
     def first_version(self):
@@ -320,7 +375,7 @@ class DocumentVersion(models.Model):
     comment = models.TextField(blank=True, verbose_name=_(u'comment'))
 
     # File related fields
-    file = models.FileField(upload_to=get_filename_from_uuid, storage=storage_backend, verbose_name=_(u'file'))
+    file = models.FileField(upload_to=get_filename_from_uuid, storage=storage_backend, verbose_name=_(u'file'), db_index=True)
     mimetype = models.CharField(max_length=255, null=True, blank=True, editable=False)
     encoding = models.CharField(max_length=64, null=True, blank=True, editable=False)
     filename = models.CharField(max_length=255, default=u'', editable=False, db_index=True)
@@ -374,25 +429,84 @@ class DocumentVersion(models.Model):
         mimetype, page count and transformation when created
         """
         new_document = not self.pk
+        ingest = None
         if not self.pk:
             self.timestamp = now()
+            if self.file and not self.file._committed:
+                # Gather the file's properties while the storage backend
+                # reads it, instead of reading it back afterwards
+                ingest = IngestFile(self.file.file, checksum=CHECKSUM_FUNCTION is default_checksum)
+                self.file.file = ingest
 
         # Only do this for new documents
         transformations = kwargs.pop('transformations', None)
-        super(DocumentVersion, self).save(*args, **kwargs)
-
-        for key in sorted(DocumentVersion._post_save_hooks):
-            DocumentVersion._post_save_hooks[key](self)
+        try:
+            # Index the new version once, not once per save and per page
+            with SearchModel.defer_index_updates():
+                super(DocumentVersion, self).save(*args, **kwargs)
+
+                if new_document:
+                    # New versions are always the latest
+                    Document.objects.filter(pk=self.document_id).update(latest_version=self)
+                    self.document.latest_version = self
+
+                for key in sorted(DocumentVersion._post_save_hooks):
+                    DocumentVersion._post_save_hooks[key](self)
+
+                if new_document:
+                    # Only do this for new documents
+                    if ingest and self.update_from_ingest(ingest):
+                        self.save()
+                        self.update_page_count(save=False, filepath=ingest.get_filepath())
+                    else:
+                        self.update_checksum(save=False)
+                        self.update_mimetype(save=False)
+                        self.save()
+                        self.update_page_count(save=False)
+        finally:
+            if ingest:
+                ingest.cleanup()
 
         if new_document:
-            # Only do this for new documents
-            self.update_checksum(save=False)
-            self.update_mimetype(save=False)
-            self.save()
-            self.update_page_count(save=False)
             if transformations:
                 self.apply_default_transformations(transformations)
 
+            if CACHE_WARM_ON_UPLOAD:
+                try:
+                    self.document.create_image_cache(version=self.pk)
+                except ConvertError as exception:
+                    logger.error('error warming the image cache of document version: %s; %s' % (self.pk, exception))
+
+    def update_from_ingest(self, ingest):
+        """
+        Update the checksum and mimetype fields from what was gathered
+        while the file was stored, return False if it can't be used
+        and the file must be read back from storage instead
+        """
+        if not ingest.is_complete():
+            return False
+
+        # Pre open hooks may return different content than what was
+        # stored, the gathered properties only apply to unaltered files
+        descriptor = self.open(raw=True)
+        result = self.apply_pre_open_hooks(descriptor)
+        result.close()
+        if result is not descriptor:
+            return False
+
+        if ingest.get_checksum():
+            self.checksum = ingest.get_checksum()
+        else:
+            self.update_checksum(save=False)
+
+        try:
+            self.mimetype, self.encoding = get_buffer_mimetype(ingest.get_prefix(), self.filename)
+        except:
+            self.mimetype = u''
+            self.encoding = u''
+
+        return True
+
     def update_checksum(self, save=True):
         """
         Open a document version's file and update the checksum field using the
@@ -405,24 +519,13 @@ class DocumentVersion(models.Model):
             if save:
                 self.save()
 
-    def update_page_count(self, save=True):
-        handle, filepath = tempfile.mkstemp()
-        # Just need the filepath, close the file description
-        os.close(handle)
-
-        self.save_to_file(filepath)
-        try:
-            detected_pages = get_page_count(filepath)
-        except UnknownFileFormat:
-            # If converter backend doesn't understand the format,
-            # use 1 as the total page count
-            detected_pages = 1
-            self.description = ugettext(u'This document\'s file format is not known, the page count has therefore defaulted to 1.')
-            self.save()
-        try:
-            os.remove(filepath)
-        except OSError:
-            pass
+    def update_page_count(self, save=True, filepath=None):
+        """
+        Detect the number of pages and create or delete the page
+        records to match, an existing local copy of the file can be
+        provided instead of having one saved from storage
+        """
+        detected_pages = self.detect_page_count(filepath=filepath)
 
         current_pages = self.pages.order_by('page_number',)
         if current_pages.count() > detected_pages:
@@ -438,6 +541,33 @@ class DocumentVersion(models.Model):
 
         return detected_pages
 
+    def detect_page_count(self, filepath=None):
+        """
+        Return the number of pages of the document version's file, an
+        existing local copy of the file can be provided instead of having
+        one saved from storage
+        """
+        temporary = not filepath
+        if temporary:
+            handle, filepath = tempfile.mkstemp()
+            # Just need the filepath, close the file description
+            os.close(handle)
+            self.save_to_file(filepath)
+
+        try:
+            return get_page_count(filepath, checksum=self.checksum)
+        except UnknownFileFormat:
+            # If converter backend doesn't understand the format,
+            # use 1 as the total page count
+            self.description = ugettext(u'This document\'s file format is not known, the page count has therefore defaulted to 1.')
+            return 1
+        finally:
+            if temporary:
+                try:
+                    os.remove(filepath)
+                except OSError:
+                    pass
+
     def apply_default_transformations(self, transformations):
         # Only apply default transformations on new documents
         if reduce(lambda x, y: x + y, [page.documentpagetransformation_set.count() for page in self.pages.all()]) == 0:
@@ -459,6 +589,8 @@ class DocumentVersion(models.Model):
         for version in self.document.versions.filter(timestamp__gt=self.timestamp):
             version.delete()
 
+        self.document.update_latest_version()
+
     def update_mimetype(self, save=True):
         """
         Read a document verions's file and determine the mimetype by calling the
@@ -475,8 +607,21 @@ class DocumentVersion(models.Model):
                     self.save()
 
     def delete(self, *args, **kwargs):
-        self.file.storage.delete(self.file.path)
-        return super(DocumentVersion, self).delete(*args, **kwargs)
+        # Content addressed storage backends share a single stored file
+        # between the versions with the same content, the file is deleted
+        # by a task once the deletion is committed and no version references
+        # it anymore
+        DeletedVersionFile.objects.create(name=self.file.name)
+
+        pk = self.pk
+        result = super(DocumentVersion, self).delete(*args, **kwargs)
+
+        # Deleting the version cleared the field, point it to the version
+        # that is now the latest
+        if self.document.latest_version_id == pk:
+            self.document.update_latest_version()
+
+        return result
 
     def exists(self):
         """
@@ -493,11 +638,13 @@ class DocumentVersion(models.Model):
         if raw:
             return self.file.storage.open(self.file.path)
         else:
-            result = self.file.storage.open(self.file.path)
-            for key in sorted(DocumentVersion._pre_open_hooks):
-                result = DocumentVersion._pre_open_hooks[key](result, self)
+            return self.apply_pre_open_hooks(self.file.storage.open(self.file.path))
 
-            return result
+    def apply_pre_open_hooks(self, descriptor):
+        for key in sorted(DocumentVersion._pre_open_hooks):
+            descriptor = DocumentVersion._pre_open_hooks[key](descriptor, self)
+
+        return descriptor
 
     def save_to_file(self, filepath, buffer_size=1024 * 1024):
         """
@@ -536,6 +683,24 @@ class DocumentVersion(models.Model):
         self.save()
 
 
+class DeletedVersionFile(models.Model):
+    """
+    Stored file of a deleted document version, pending deletion from the
+    storage
+    """
+    name = models.CharField(max_length=255, verbose_name=_(u'name'))
+    datetime_deleted = models.DateTimeField(verbose_name=_(u'deleted'), default=lambda: now())
+
+    objects = DeletedVersionFileManager()
+
+    def __unicode__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = _(u'deleted version file')
+        verbose_name_plural = _(u'deleted version files')
+
+
 class DocumentTypeFilename(models.Model):
     """
     List of filenames available to a specific document type for the
@@ -583,6 +748,15 @@ class DocumentPage(models.Model):
     def siblings(self):
         return DocumentPage.objects.filter(document_version=self.document_version)
 
+    def get_image_cache_key(self):
+        """
+        Return the page image cache key, derived from the version checksum,
+        the page number and the page transformations, and the list of
+        transformations
+        """
+        transformations, warnings = self.get_transformation_list()
+        return HASH_FUNCTION(u''.join([self.document_version.checksum, unicode(self.page_number), unicode(transformations)])), transformations
+
     # Compatibility methods
     @property
     def document(self):
@@ -1,7 +1,34 @@
 from __future__ import absolute_import
 
-from common.utils import load_backend
+import tempfile
 
-from .conf.settings import STORAGE_BACKEND
+from django.utils.translation import ugettext_lazy as _
+
+from common.file_caches import FileCache
+from common.utils import load_backend, validate_path
+
+from .conf import settings as document_settings
+from .conf.settings import (CACHE_MAXIMUM_SIZE, CACHE_MEMORY_SIZE,
+                            STORAGE_BACKEND, VARIANT_CACHE_MAXIMUM_SIZE)
 
 storage_backend = load_backend(STORAGE_BACKEND)()
+
+if (not validate_path(document_settings.CACHE_PATH)) or (not document_settings.CACHE_PATH):
+    setattr(document_settings, 'CACHE_PATH', tempfile.mkdtemp())
+
+if (not validate_path(document_settings.VARIANT_CACHE_PATH)) or (not document_settings.VARIANT_CACHE_PATH):
+    setattr(document_settings, 'VARIANT_CACHE_PATH', tempfile.mkdtemp())
+
+page_image_cache = FileCache(
+    name='document_page_images', label=_(u'Document page images'),
+    path=document_settings.CACHE_PATH, maximum_size=CACHE_MAXIMUM_SIZE
+)
+
+# Final resized, zoomed and rotated page images, grouped by the key of the
+# page image they were created from.  Small ones, such as thumbnails, are
+# also kept in memory
+variant_image_cache = FileCache(
+    name='document_page_image_variants', label=_(u'Document page image variants'),
+    path=document_settings.VARIANT_CACHE_PATH,
+    maximum_size=VARIANT_CACHE_MAXIMUM_SIZE, memory_size=CACHE_MEMORY_SIZE
+)
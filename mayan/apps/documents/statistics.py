@@ -7,7 +7,7 @@ from common.utils import pretty_size, pretty_size_10
 from statistics.classes import Statistic
 
 from .models import Document, DocumentType, DocumentPage, DocumentVersion
-from .runtime import storage_backend
+from .runtime import page_image_cache, storage_backend, variant_image_cache
 
 
 def get_used_size(path, file_list):
@@ -82,3 +82,49 @@ class DocumentUsageStatistics(Statistic):
         ])
 
         return results
+
+
+class DocumentImageCacheStatistics(Statistic):
+    def get_cache_results(self, file_cache):
+        statistics = file_cache.get_statistics()
+        requests = statistics['hits'] + statistics['misses']
+        memory_requests = statistics['memory_hits'] + statistics['memory_misses']
+
+        results = [
+            _(u'%(cache)s, hits: %(hits)d, misses: %(misses)d, hit ratio: %(ratio).2f%%') % {
+                'cache': file_cache,
+                'hits': statistics['hits'],
+                'misses': statistics['misses'],
+                'ratio': statistics['hits'] * 100.0 / requests if requests else 0,
+            },
+            _(u'%(cache)s, evictions: %(evictions)d, size: %(size)s of %(maximum_size)s') % {
+                'cache': file_cache,
+                'evictions': statistics['evictions'],
+                'size': pretty_size(statistics['size']),
+                'maximum_size': pretty_size(statistics['maximum_size']) if statistics['maximum_size'] else _(u'unlimited'),
+            },
+        ]
+
+        if statistics['memory_maximum_size']:
+            results.extend([
+                _(u'%(cache)s, memory entries: %(entries)d, hit ratio: %(ratio).2f%%, evictions: %(evictions)d') % {
+                    'cache': file_cache,
+                    'entries': statistics['memory_entries'],
+                    'ratio': statistics['memory_hits'] * 100.0 / memory_requests if memory_requests else 0,
+                    'evictions': statistics['memory_evictions'],
+                },
+                _(u'%(cache)s, memory size: %(size)s of %(maximum_size)s') % {
+                    'cache': file_cache,
+                    'size': pretty_size(statistics['memory_size']),
+                    'maximum_size': pretty_size(statistics['memory_maximum_size']),
+                },
+            ])
+
+        return results
+
+    def get_results(self):
+        results = []
+        for file_cache in (page_image_cache, variant_image_cache):
+            results.extend(self.get_cache_results(file_cache))
+
+        return results
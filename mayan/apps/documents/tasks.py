@@ -0,0 +1,26 @@
+from __future__ import absolute_import
+
+import logging
+
+from lock_manager import Lock, LockError
+
+from .models import DeletedVersionFile
+
+LOCK_EXPIRE = 50
+# Seconds a stored file must be left untouched before it can be deleted
+DELETED_FILE_GRACE_PERIOD = 600
+logger = logging.getLogger(__name__)
+
+
+def task_delete_unreferenced_files():
+    logger.debug('executing...')
+    lock_id = u'task_delete_unreferenced_files'
+    try:
+        logger.debug('trying to acquire lock: %s' % lock_id)
+        lock = Lock.acquire_lock(lock_id, LOCK_EXPIRE)
+        logger.debug('acquired lock: %s' % lock_id)
+        DeletedVersionFile.objects.delete_unreferenced_files(grace_period=DELETED_FILE_GRACE_PERIOD)
+        lock.release()
+    except LockError:
+        logger.debug('unable to obtain lock')
+        pass
@@ -2,19 +2,26 @@ from __future__ import absolute_import
 
 from json import loads
 import os
+import shutil
+import tempfile
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.base import File
 from django.core.urlresolvers import reverse
+from django.db import DatabaseError, transaction
 from django.test.client import Client
 from django.test import TestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from storage.backends.contentaddressedstorage import ContentAddressedStorage
+
 from .literals import VERSION_UPDATE_MAJOR, RELEASE_LEVEL_FINAL
-from .models import Document, DocumentType
+from .models import (DeletedVersionFile, Document, DocumentPage, DocumentType,
+                     DocumentVersion)
+from .utils import IngestFile
 
 TEST_ADMIN_PASSWORD = 'test_admin_password'
 TEST_ADMIN_USERNAME = 'test_admin'
@@ -78,11 +85,66 @@ class DocumentTestCase(TestCase):
 
         self.failUnlessEqual(self.document.latest_version.get_formated_version(), '3.0')
 
+    def test_document_latest_version(self):
+        first_version = self.document.latest_version
+        self.failUnlessEqual(Document.objects.get(pk=self.document.pk).latest_version, first_version)
+
+        new_version_data = {
+            'comment': 'test comment 1',
+            'version_update': VERSION_UPDATE_MAJOR,
+            'release_level': RELEASE_LEVEL_FINAL,
+            'serial': 0,
+        }
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            second_version = self.document.new_version(file=File(file_object), **new_version_data)
+
+        self.failUnlessEqual(Document.objects.get(pk=self.document.pk).latest_version, second_version)
+
+        second_version.delete()
+        self.failUnlessEqual(Document.objects.get(pk=self.document.pk).latest_version, first_version)
+
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            self.document.new_version(file=File(file_object), **new_version_data)
+
+        first_version.revert()
+        self.failUnlessEqual(Document.objects.get(pk=self.document.pk).latest_version, first_version)
+
     def tearDown(self):
         self.document.delete()
         self.document_type.delete()
 
 
+class IngestFileTestCase(TestCase):
+    def test_single_read(self):
+        with open(TEST_DOCUMENT_PATH) as file_object:
+            ingest = IngestFile(file_object)
+            # Read twice, as storage backends may rewind the file
+            for chunk in ingest.chunks():
+                pass
+            for chunk in ingest.chunks():
+                pass
+
+            try:
+                self.failUnlessEqual(ingest.is_complete(), True)
+                self.failUnlessEqual(ingest.get_checksum(), 'c637ffab6b8bb026ed3784afdb07663fddc60099853fae2be93890852a69ecf3')
+                self.failUnlessEqual(os.path.getsize(ingest.get_filepath()), 272213)
+            finally:
+                ingest.cleanup()
+
+    def test_partial_read(self):
+        with open(TEST_DOCUMENT_PATH) as file_object:
+            ingest = IngestFile(file_object)
+            ingest.read(1024)
+            ingest.seek(4096)
+            ingest.read()
+            ingest.read()
+
+            try:
+                self.failUnlessEqual(ingest.is_complete(), False)
+            finally:
+                ingest.cleanup()
+
+
 class DocumentSearchTestCase(TestCase):
     def setUp(self):
         from ocr.parsers import parse_document_page
@@ -131,6 +193,45 @@ class DocumentSearchTestCase(TestCase):
         self.assertEqual(result_count, 1)
         self.assertEqual(flat_list, [self.document])
 
+    def test_search_index_updates(self):
+        from . import document_search
+
+        # Terms are matched by their prefix
+        model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.simple_search('Maya')
+        self.assertEqual(flat_list, [self.document])
+
+        self.document.description = 'unusual description'
+        self.document.save()
+        model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.advanced_search({'description': 'unusual'})
+        self.assertEqual(flat_list, [self.document])
+
+    def test_document_type_change_indexed_in_background(self):
+        from . import document_search
+
+        jobs = []
+
+        class TestPool(object):
+            def submit(self, func, *args, **kwargs):
+                jobs.append((func, args, kwargs))
+                return True
+
+        document_search.get_pool = lambda: TestPool()
+        try:
+            self.document_type.name = 'unusual type'
+            self.document_type.save()
+        finally:
+            del document_search.get_pool
+
+        # Not indexed by the request saving the document type
+        model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.advanced_search({'document_type__name': 'unusual'})
+        self.assertEqual(flat_list, [])
+
+        self.assertEqual(len(jobs), 1)
+        func, args, kwargs = jobs[0]
+        func(*args, **kwargs)
+        model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.advanced_search({'document_type__name': 'unusual'})
+        self.assertEqual(flat_list, [self.document])
+
     def tearDown(self):
         self.document.delete()
         self.document_type.delete()
@@ -282,6 +383,147 @@ class DocumentAPICreateDocumentTestCase(TestCase):
         self.assertEqual(Document.objects.count(), 0)
 
 
+class DocumentAPIBatchUploadTestCase(TestCase):
+    """
+    Functional test to make sure several documents can be created with a
+    single API request
+    """
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username=TEST_ADMIN_USERNAME, email=TEST_ADMIN_EMAIL, password=TEST_ADMIN_PASSWORD)
+        self.document_type = DocumentType.objects.create(name=TEST_DOCUMENT_TYPE)
+
+    def test_batch_upload(self):
+        client = APIClient()
+        client.login(username=TEST_ADMIN_USERNAME, password=TEST_ADMIN_PASSWORD)
+
+        with open(TEST_DOCUMENT_PATH) as document_descriptor:
+            with open(TEST_SMALL_DOCUMENT_PATH) as small_document_descriptor:
+                response = client.post(reverse('document-batch-upload'), {'file': [document_descriptor, small_document_descriptor], 'document_type': self.document_type.pk, 'description': TEST_DOCUMENT_DESCRIPTION})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(loads(response.content)['documents']), 2)
+        self.assertEqual(Document.objects.count(), 2)
+
+        document = Document.objects.get(versions__filename='mayan_11_1.pdf')
+        self.assertEqual(document.document_type, self.document_type)
+        self.assertEqual(document.description, TEST_DOCUMENT_DESCRIPTION)
+        self.assertEqual(document.file_mimetype, 'application/pdf')
+        self.assertEqual(document.checksum, 'c637ffab6b8bb026ed3784afdb07663fddc60099853fae2be93890852a69ecf3')
+        self.assertEqual(document.page_count, 47)
+
+        document = Document.objects.get(versions__filename='title_page.png')
+        self.assertEqual(document.file_mimetype, 'image/png')
+        self.assertEqual(document.page_count, 1)
+
+        for document in Document.objects.all():
+            document.delete()
+
+
+class DocumentCreateFromFilesTestCase(TestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(name=TEST_DOCUMENT_TYPE)
+
+    def test_stored_files_deleted_on_error(self):
+        stored_names = []
+
+        def failing_bulk_create(pages):
+            stored_names.extend(DocumentVersion.objects.values_list('file', flat=True))
+            raise DatabaseError('test error')
+
+        bulk_create = DocumentPage.objects.bulk_create
+        DocumentPage.objects.bulk_create = failing_bulk_create
+        try:
+            with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+                with self.assertRaises(DatabaseError):
+                    with transaction.atomic():
+                        Document.objects.create_from_files([File(file_object, name='title_page.png')], document_type=self.document_type)
+        finally:
+            DocumentPage.objects.bulk_create = bulk_create
+
+        self.assertEqual(len(stored_names), 1)
+        self.assertFalse(DocumentVersion._meta.get_field('file').storage.exists(stored_names[0]))
+        self.assertEqual(Document.objects.count(), 0)
+
+    def test_shared_stored_files_kept_on_error(self):
+        field = DocumentVersion._meta.get_field('file')
+        storage = field.storage
+        field.storage = ContentAddressedStorage()
+        field.storage.location = tempfile.mkdtemp()
+        bulk_create = DocumentPage.objects.bulk_create
+        try:
+            with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+                document = Document.objects.create_from_files([File(file_object, name='title_page.png')], document_type=self.document_type)[0]
+            name = document.latest_version.file.name
+
+            def failing_bulk_create(pages):
+                raise DatabaseError('test error')
+
+            DocumentPage.objects.bulk_create = failing_bulk_create
+            # The same content twice and a file only stored by this batch
+            with open(TEST_SMALL_DOCUMENT_PATH) as file_object, open(TEST_SMALL_DOCUMENT_PATH) as copy_file_object, open(TEST_DOCUMENT_PATH) as other_file_object:
+                file_objects = [File(file_object, name='title_page.png'), File(copy_file_object, name='copy.png'), File(other_file_object, name='mayan_11_1.pdf')]
+                with self.assertRaises(DatabaseError):
+                    with transaction.atomic():
+                        Document.objects.create_from_files(file_objects, document_type=self.document_type)
+
+            self.assertTrue(field.storage.exists(name))
+            self.assertEqual(Document.objects.count(), 1)
+            # Only the file of the first document is left
+            self.assertEqual([filename for directory, directories, filenames in os.walk(field.storage.location) for filename in filenames], [os.path.basename(name)])
+        finally:
+            DocumentPage.objects.bulk_create = bulk_create
+            shutil.rmtree(field.storage.location)
+            field.storage = storage
+
+
+class DocumentVersionDeleteTestCase(TestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(name=TEST_DOCUMENT_TYPE)
+        self.field = DocumentVersion._meta.get_field('file')
+        self.storage = self.field.storage
+        self.field.storage = ContentAddressedStorage()
+        self.field.storage.location = tempfile.mkdtemp()
+
+    def _create_document(self):
+        document = Document.objects.create(document_type=self.document_type)
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            document.new_version(file=File(file_object, name='title_page.png'))
+        return document
+
+    def test_shared_file_deleted_with_last_version(self):
+        documents = [self._create_document() for number in range(2)]
+        name = documents[0].latest_version.file.name
+        self.assertEqual(documents[1].latest_version.file.name, name)
+
+        documents[0].delete()
+        # Nothing is deleted until the task runs
+        self.assertTrue(self.field.storage.exists(name))
+        self.assertEqual(DeletedVersionFile.objects.count(), 1)
+
+        DeletedVersionFile.objects.delete_unreferenced_files(grace_period=0)
+        self.assertTrue(self.field.storage.exists(name))
+        self.assertEqual(DeletedVersionFile.objects.count(), 0)
+
+        documents[1].delete()
+        DeletedVersionFile.objects.delete_unreferenced_files(grace_period=0)
+        self.assertFalse(self.field.storage.exists(name))
+        self.assertEqual(DeletedVersionFile.objects.count(), 0)
+
+    def test_recently_saved_file_kept(self):
+        document = self._create_document()
+        name = document.latest_version.file.name
+        document.delete()
+
+        DeletedVersionFile.objects.delete_unreferenced_files(grace_period=600)
+        self.assertTrue(self.field.storage.exists(name))
+        self.assertEqual(DeletedVersionFile.objects.count(), 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.field.storage.location)
+        self.field.storage = self.storage
+
+
 class DocumentsViewsFunctionalTestCase(TestCase):
     """
     Functional tests to make sure all the moving parts after creating a
@@ -399,3 +641,13 @@ class Issue46TestCase(TestCase):
         # Functional test for the second page of advanced results
         response = self.client.get(reverse('results'), {'versions__filename': 'png', 'page': 2})
         self.assertTrue('List of results (21 - 30 out of 30) (Page 2 of 2)' in response.content)
+
+    def test_search_offset(self):
+        from . import document_search
+
+        model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.advanced_search({'versions__filename': 'png'}, offset=25)
+        self.assertEqual(shown_result_count, 5)
+        self.assertEqual(result_count, self.document_count)
+
+        model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.simple_search('png', offset=25)
+        self.assertEqual(shown_result_count, 5)
@@ -1,8 +1,95 @@
+import hashlib
 import os
+import tempfile
+
+from django.core.files import File
 
 from common.conf.settings import TEMPORARY_DIRECTORY
+from mimetype.api import MAGIC_BUFFER_SIZE
 
 
 def document_save_to_temp_dir(document, filename, buffer_size=1024 * 1024):
     temporary_path = os.path.join(TEMPORARY_DIRECTORY, filename)
     return document.save_to_file(temporary_path, buffer_size)
+
+
+class IngestFile(File):
+    """
+    Wraps a new document version's file while the storage backend reads
+    it, teeing every byte read into an incremental hash, a prefix buffer
+    for mimetype detection and a local copy for page counting, so that
+    the file doesn't have to be read back from storage afterwards.
+    The results are only valid once the whole file was read exactly once
+    in order, see is_complete
+    """
+    def __init__(self, file, name=None, checksum=True):
+        super(IngestFile, self).__init__(file, name)
+        self.hash = hashlib.sha256() if checksum else None
+        self.prefix = []
+        self.prefix_size = 0
+        self.position = 0
+        self.consumed = 0
+        self.finished = False
+        self.skipped = False
+        handle, self.filepath = tempfile.mkstemp(dir=TEMPORARY_DIRECTORY)
+        self.copy = os.fdopen(handle, 'wb')
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self.file.seek(offset, whence)
+        if whence == os.SEEK_SET:
+            self.position = offset
+        else:
+            self.position = self.file.tell()
+
+    def read(self, *args, **kwargs):
+        data = self.file.read(*args, **kwargs)
+        if not data:
+            self.finished = self.position >= self.consumed
+        elif self.position > self.consumed:
+            # Part of the content was never seen
+            self.skipped = True
+        elif self.position + len(data) > self.consumed:
+            # Only feed the bytes that weren't seen by a previous read
+            self._feed(data[self.consumed - self.position:])
+
+        self.position += len(data)
+        return data
+
+    def _feed(self, data):
+        if self.hash:
+            self.hash.update(data)
+
+        if self.prefix_size < MAGIC_BUFFER_SIZE:
+            self.prefix.append(data[:MAGIC_BUFFER_SIZE - self.prefix_size])
+            self.prefix_size += len(self.prefix[-1])
+
+        self.copy.write(data)
+        self.consumed += len(data)
+
+    def is_complete(self):
+        return self.finished and not self.skipped
+
+    def get_checksum(self):
+        if self.hash:
+            return unicode(self.hash.hexdigest())
+
+    def get_prefix(self):
+        return ''.join(self.prefix)
+
+    def get_filepath(self):
+        """
+        Return the path of the local copy, closing it for writing
+        """
+        if not self.copy.closed:
+            self.copy.close()
+
+        return self.filepath
+
+    def cleanup(self):
+        if not self.copy.closed:
+            self.copy.close()
+
+        try:
+            os.remove(self.filepath)
+        except OSError:
+            pass
@@ -8,6 +8,7 @@ from django.conf import settings
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
+from django.db.models.query import QuerySet
 from django.http import HttpResponseRedirect
 from django.shortcuts import render_to_response, get_object_or_404
 from django.template import RequestContext
@@ -17,7 +18,7 @@ from django.utils.translation import ugettext_lazy as _
 import sendfile
 
 from acls.models import AccessEntry
-from common.compressed_files import CompressedFile
+from common.http import serve_compressed_files, serve_file_range
 from common.literals import (PAGE_ORIENTATION_LANDSCAPE, PAGE_ORIENTATION_PORTRAIT,
                              PAGE_SIZE_DIMENSIONS)
 from common.utils import (encapsulate, pretty_size, parse_range, return_diff,
@@ -26,8 +27,7 @@ from common.widgets import two_state_template
 from common.conf.settings import DEFAULT_PAPER_SIZE
 from converter.literals import (DEFAULT_FILE_FORMAT_MIMETYPE, DEFAULT_PAGE_NUMBER,
                                 DEFAULT_ROTATION, DEFAULT_ZOOM_LEVEL)
-from converter.office_converter import OfficeConverter
-from filetransfers.api import serve_file
+from converter.office_converter import CONVERTER_OFFICE_FILE_MIMETYPES
 from history.api import create_history
 from navigation.utils import resolve_to_name
 from permissions.models import Permission
@@ -58,6 +58,9 @@ logger = logging.getLogger(__name__)
 
 def document_list(request, object_list=None, title=None, extra_context=None):
     pre_object_list = object_list if not (object_list is None) else Document.objects.all()
+    if isinstance(pre_object_list, QuerySet) and pre_object_list.model == Document:
+        # The list columns access the latest version of every document
+        pre_object_list = pre_object_list.select_related('latest_version')
 
     try:
         Permission.objects.check_permissions(request.user, [PERMISSION_DOCUMENT_VIEW])
@@ -292,6 +295,20 @@ def document_download(request, document_id=None, document_id_list=None, document
     except PermissionDenied:
         document_versions = AccessEntry.objects.filter_objects_by_access(PERMISSION_DOCUMENT_DOWNLOAD, request.user, document_versions, related='document', exception_on_empty=True)
 
+    if request.method == 'GET' and request.GET.get('original') and len(document_versions) == 1:
+        # Served from its own URL instead of in response to the form, so
+        # that clients can resume interrupted downloads
+        document_version = document_versions[0]
+        descriptor = document_version.file.storage.open(document_version.file.path)
+        return serve_file_range(
+            request,
+            descriptor,
+            size=document_version.size,
+            save_as=u'"%s"' % document_version.filename,
+            content_type=document_version.mimetype if document_version.mimetype else 'application/octet-stream',
+            etag=u'"%s"' % document_version.checksum if document_version.checksum else None
+        )
+
     subtemplates_list = []
     subtemplates_list.append(
         {
@@ -316,39 +333,18 @@ def document_download(request, document_id=None, document_id_list=None, document
         form = DocumentDownloadForm(request.POST, document_versions=document_versions)
         if form.is_valid():
             if form.cleaned_data['compressed'] or len(document_versions) > 1:
-                try:
-                    compressed_file = CompressedFile()
-                    for document_version in document_versions:
-                        descriptor = document_version.open()
-                        compressed_file.add_file(descriptor, arcname=document_version.filename)
-                        descriptor.close()
-
-                    compressed_file.close()
-
-                    return serve_file(
-                        request,
-                        compressed_file.as_file(form.cleaned_data['zip_filename']),
-                        save_as=u'"%s"' % form.cleaned_data['zip_filename'],
-                        content_type='application/zip'
-                    )
-                    # TODO: DO a redirection afterwards
-                except Exception as exception:
-                    if settings.DEBUG:
-                        raise
-                    else:
-                        messages.error(request, exception)
-                        return HttpResponseRedirect(request.META['HTTP_REFERER'])
+                # The documents are read and compressed as the archive is
+                # sent, instead of building the whole archive in memory
+                return serve_compressed_files(
+                    [(version.open, version.filename) for version in document_versions],
+                    save_as=u'"%s"' % form.cleaned_data['zip_filename']
+                )
             else:
                 try:
                     # Test permissions and trigger exception
                     fd = document_versions[0].open()
                     fd.close()
-                    return serve_file(
-                        request,
-                        document_versions[0].file,
-                        save_as=u'"%s"' % document_versions[0].filename,
-                        content_type=document_versions[0].mimetype if document_versions[0].mimetype else 'application/octet-stream'
-                    )
+                    return HttpResponseRedirect(u'%s?%s' % (reverse('document_version_download', args=[document_versions[0].pk]), urlencode({'original': 1})))
                 except Exception as exception:
                     if settings.DEBUG:
                         raise
@@ -442,8 +438,7 @@ def document_find_all_duplicates(request):
 def document_update_page_count(request):
     Permission.objects.check_permissions(request.user, [PERMISSION_DOCUMENT_TOOLS])
 
-    office_converter = OfficeConverter()
-    qs = DocumentVersion.objects.exclude(filename__iendswith='dxf').filter(mimetype__in=office_converter.mimetypes())
+    qs = DocumentVersion.objects.exclude(filename__iendswith='dxf').filter(mimetype__in=CONVERTER_OFFICE_FILE_MIMETYPES)
     previous = request.POST.get('previous', request.GET.get('previous', request.META.get('HTTP_REFERER', '/')))
 
     if request.method == 'POST':
@@ -493,7 +488,6 @@ def document_clear_transformations(request, document_id=None, document_id_list=N
         for document in documents:
             try:
                 for document_page in document.pages.all():
-                    document_page.document.invalidate_cached_image(document_page.page_number)
                     for transformation in document_page.documentpagetransformation_set.all():
                         transformation.delete()
                 messages.success(request, _(u'All the page transformations for document: %s, have been deleted successfully.') % document)
@@ -1234,7 +1228,6 @@ def document_page_transformation_create(request, document_page_id):
     if request.method == 'POST':
         form = DocumentPageTransformationForm(request.POST, initial={'document_page': document_page})
         if form.is_valid():
-            document_page.document.invalidate_cached_image(document_page.page_number)
             form.save()
             messages.success(request, _(u'Document page transformation created successfully.'))
             return HttpResponseRedirect(reverse('document_page_transformation_list', args=[document_page_id]))
@@ -1262,7 +1255,6 @@ def document_page_transformation_edit(request, document_page_transformation_id):
     if request.method == 'POST':
         form = DocumentPageTransformationForm(request.POST, instance=document_page_transformation)
         if form.is_valid():
-            document_page_transformation.document_page.document.invalidate_cached_image(document_page_transformation.document_page.page_number)
             form.save()
             messages.success(request, _(u'Document page transformation edited successfully.'))
             return HttpResponseRedirect(reverse('document_page_transformation_list', args=[document_page_transformation.document_page_id]))
@@ -1295,7 +1287,6 @@ def document_page_transformation_delete(request, document_page_transformation_id
     previous = request.POST.get('previous', request.GET.get('previous', request.META.get('HTTP_REFERER', redirect_view)))
 
     if request.method == 'POST':
-        document_page_transformation.document_page.document.invalidate_cached_image(document_page_transformation.document_page.page_number)
         document_page_transformation.delete()
         messages.success(request, _(u'Document page transformation deleted successfully.'))
         return HttpResponseRedirect(redirect_view)
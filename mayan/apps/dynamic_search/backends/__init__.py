@@ -0,0 +1,27 @@
+class SearchBackendBase(object):
+    """
+    Base class for the search backends.  A search is a list of
+    (search field, terms) tuples, the terms of each field must all match,
+    the fields themselves are ANDed or ORed together
+    """
+    # Backends keeping their own index must be notified of every change
+    # to the searched content
+    indexed = False
+
+    def search(self, search_model, queries, global_and_search=False, offset=0, limit=None):
+        """
+        Return a list of the primary keys of the matching objects, best
+        matches first, and the total number of matches
+        """
+        raise NotImplementedError
+
+    def update_object(self, search_model, pk):
+        """
+        Index the current content of an object, or drop it from the index
+        if it no longer exists
+        """
+
+    def clear(self, search_model):
+        """
+        Drop every indexed object of a search model
+        """
@@ -0,0 +1,69 @@
+from __future__ import absolute_import
+
+import logging
+
+from django.db.models import Q
+
+from . import SearchBackendBase
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseSearchBackend(SearchBackendBase):
+    """
+    Search by issuing a case insensitive substring query per term per
+    field, doesn't need an index but scans the searched tables
+    """
+    def search(self, search_model, queries, global_and_search=False, offset=0, limit=None):
+        result_set = None
+
+        for search_field, terms in queries:
+            model = search_field.get_model()
+            # Get the results of all the terms, only objects that contain
+            # all the terms in this field are included
+            field_result_set = None
+            for query in self.assemble_query(terms, [search_field.field]):
+                logger.debug('query: %s' % query)
+                term_query_result_set = set(model.objects.filter(query).values_list(search_field.return_value, flat=True))
+                if field_result_set is None:
+                    field_result_set = term_query_result_set
+                else:
+                    field_result_set &= term_query_result_set
+
+            if field_result_set is None:
+                continue
+
+            # Related fields return a text object key
+            field_result_set = set(int(pk) for pk in field_result_set)
+            logger.debug('field_result_set: %s' % field_result_set)
+
+            if result_set is None:
+                result_set = field_result_set
+            elif global_and_search:
+                result_set &= field_result_set
+            else:
+                result_set |= field_result_set
+
+        result_list = sorted(result_set or [], reverse=True)
+        if limit:
+            return result_list[offset:offset + limit], len(result_list)
+        else:
+            return result_list[offset:], len(result_list)
+
+    def assemble_query(self, terms, search_fields):
+        """
+        Returns a query, that is a combination of Q objects. That combination
+        aims to search keywords within a model by testing the given search fields.
+        """
+        queries = []
+        for term in terms:
+            or_query = None
+            for field in search_fields:
+                q = Q(**{'%s__%s' % (field, 'icontains'): term})
+                if or_query is None:
+                    or_query = q
+                else:
+                    or_query = or_query | q
+
+            queries.append(or_query)
+        return queries
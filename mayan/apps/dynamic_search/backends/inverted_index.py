@@ -0,0 +1,102 @@
+from __future__ import absolute_import
+
+from collections import defaultdict
+import logging
+import math
+import re
+
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from ..models import SearchIndexEntry
+from . import SearchBackendBase
+
+# Longer terms are truncated, prefix matching still finds them
+TERM_MAXIMUM_LENGTH = 64
+TERM_REGEX = re.compile(r'\w+', re.UNICODE)
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text):
+    return [term[:TERM_MAXIMUM_LENGTH] for term in TERM_REGEX.findall(text.lower())]
+
+
+class InvertedIndexSearchBackend(SearchBackendBase):
+    """
+    Search an inverted index of the terms of every search field kept in
+    the database.  Terms are matched by prefix, results are ranked by the
+    sum of the weights of the matched terms, a weight being the term's
+    frequency in the field normalized by the field's length
+    """
+    indexed = True
+
+    def search(self, search_model, queries, global_and_search=False, offset=0, limit=None):
+        entries = SearchIndexEntry.objects.filter(search_model=search_model.get_full_name())
+
+        object_query = None
+        rank_query = None
+        for search_field, terms in queries:
+            field_query = None
+            for term in terms:
+                for token in tokenize(term):
+                    term_query = Q(field=search_field.get_full_name(), term__startswith=token)
+                    query = Q(pk__in=entries.filter(term_query).values('object_id'))
+
+                    field_query = query if field_query is None else field_query & query
+                    rank_query = term_query if rank_query is None else rank_query | term_query
+
+            if field_query is None:
+                continue
+
+            if object_query is None:
+                object_query = field_query
+            elif global_and_search:
+                object_query &= field_query
+            else:
+                object_query |= field_query
+
+        if object_query is None:
+            return [], 0
+
+        # Matching is checked against the model so that objects deleted
+        # without updating the index are never returned
+        matches = search_model.model.objects.filter(object_query)
+        result_count = matches.count()
+
+        ranking = entries.filter(rank_query).filter(object_id__in=matches.values('pk')).values('object_id').annotate(score=Sum('weight')).order_by('-score', '-object_id')
+        if limit:
+            ranking = ranking[offset:offset + limit]
+        else:
+            ranking = ranking[offset:]
+
+        return [entry['object_id'] for entry in ranking], result_count
+
+    def update_object(self, search_model, pk):
+        logger.debug('indexing: %s, %s' % (search_model, pk))
+        index_entries = []
+        for search_field in search_model.get_all_search_fields():
+            frequencies = defaultdict(int)
+            for value in search_field.get_values(pk):
+                if value:
+                    for term in tokenize(unicode(value)):
+                        frequencies[term] += 1
+
+            length = math.sqrt(sum(frequencies.values()))
+            for term, frequency in frequencies.items():
+                index_entries.append(
+                    SearchIndexEntry(
+                        search_model=search_model.get_full_name(),
+                        field=search_field.get_full_name(),
+                        object_id=pk,
+                        term=term,
+                        weight=frequency / length
+                    )
+                )
+
+        with transaction.atomic():
+            SearchIndexEntry.objects.filter(search_model=search_model.get_full_name(), object_id=pk).delete()
+            SearchIndexEntry.objects.bulk_create(index_entries)
+
+    def clear(self, search_model):
+        SearchIndexEntry.objects.filter(search_model=search_model.get_full_name()).delete()
@@ -1,11 +1,13 @@
 from __future__ import absolute_import
 
+from contextlib import contextmanager
 import datetime
 import logging
 import re
+import threading
 
-from django.db.models import Q
 from django.db.models.loading import get_model
+from django.db.models.signals import post_delete, post_save, pre_delete
 
 from .conf.settings import LIMIT
 
@@ -14,6 +16,10 @@ logger = logging.getLogger(__name__)
 
 class SearchModel(object):
     registry = {}
+    # Index triggers added before their search model was registered
+    _pending_index_triggers = {}
+    # Index updates postponed by defer_index_updates, per thread
+    _local = threading.local()
 
     @classmethod
     def get_all(cls):
@@ -31,6 +37,9 @@ class SearchModel(object):
         self.label = label or self.model._meta.verbose_name
         self.__class__.registry[self.get_full_name()] = self
 
+        for model, get_pks, background in self.__class__._pending_index_triggers.pop(self.get_full_name(), []):
+            self.add_index_trigger(model, get_pks, background=background)
+
     def get_full_name(self):
         return '%s.%s' % (self.app_label, self.model_name)
 
@@ -77,146 +86,149 @@ class SearchModel(object):
         """
         return [normspace(' ', (t[0] or t[1]).strip()) for t in findterms(query_string)]
 
-    def simple_search(self, query_string):
-        search_dict = {}
-
-        for search_field in self.get_all_search_fields():
-            search_dict.setdefault(search_field.get_model(), {
-                'searches': [],
-                'label': search_field.label,
-                'return_value': search_field.return_value
-            })
-            search_dict[search_field.get_model()]['searches'].append(
-                {
-                    'field_name': [search_field.field],
-                    'terms': self.normalize_query(query_string)
-                }
-            )
+    def simple_search(self, query_string, offset=0):
+        terms = self.normalize_query(query_string)
+        queries = [(search_field, terms) for search_field in self.get_all_search_fields()]
 
-        logger.debug('search_dict: %s' % search_dict)
+        logger.debug('queries: %s' % queries)
 
-        return self.execute_search(search_dict, global_and_search=False)
+        return self.execute_search(queries, global_and_search=False, offset=offset)
 
-    def advanced_search(self, dictionary):
-        search_dict = {}
+    def advanced_search(self, dictionary, offset=0):
+        queries = []
 
         for key, value in dictionary.items():
             logger.debug('key: %s' % key)
             logger.debug('value: %s' % value)
 
-            if key == 'page':
+            if key in ('page', 'offset'):
                 continue
             if value:
                 search_field = self.get_search_field(key)
                 logger.debug('search_field: %s' % search_field)
-                search_dict.setdefault(search_field.get_model(), {
-                    'searches': [],
-                    'label': search_field.label,
-                    'return_value': search_field.return_value
-                })
-                search_dict[search_field.get_model()]['searches'].append(
-                    {
-                        'field_name': [search_field.field],
-                        'terms': self.normalize_query(value)
-                    }
-                )
-
-        logger.debug('search_dict: %s' % search_dict)
-
-        return self.execute_search(search_dict, global_and_search=True)
-
-    def execute_search(self, search_dict, global_and_search=False):
-        model_list = {}
-        flat_list = []
-        result_count = 0
-        shown_result_count = 0
-        elapsed_time = 0
-        start_time = datetime.datetime.now()
+                queries.append((search_field, self.normalize_query(value)))
 
-        for model, data in search_dict.items():
-            logger.debug('model: %s' % model)
+        logger.debug('queries: %s' % queries)
 
-            # Initialize per model result set
-            model_result_set = set()
+        return self.execute_search(queries, global_and_search=True, offset=offset)
 
-            for query_entry in data['searches']:
-                # Fashion a list of queries for a field for each term
-                field_query_list = self.assemble_query(query_entry['terms'], query_entry['field_name'])
+    def execute_search(self, queries, global_and_search=False, offset=0):
+        start_time = datetime.datetime.now()
 
-                logger.debug('field_query_list: %s' % field_query_list)
+        # Only LIMIT results, best first, are fetched starting at offset
+        result_pks, result_count = self.get_backend().search(self, queries, global_and_search=global_and_search, offset=offset, limit=LIMIT)
+        results = self.model.objects.in_bulk(result_pks)
+        flat_list = [results[pk] for pk in result_pks if pk in results]
 
-                # Initialize per field result set
-                field_result_set = set()
+        model_list = {}
+        if flat_list:
+            model_list[self.label] = flat_list
 
-                # Get results per search field
-                for query in field_query_list:
-                    logger.debug('query: %s' % query)
-                    term_query_result_set = set(model.objects.filter(query).values_list(data['return_value'], flat=True))
+        logger.debug('flat_list: %s' % flat_list)
 
-                    # Convert the QuerySet to a Python set and perform the
-                    # AND operation on the program and not as a query.
-                    # This operation ANDs all the field term results
-                    # belonging to a single model, making sure to only include
-                    # results in the final field result variable if all the terms
-                    # are found in a single field.
-                    if not field_result_set:
-                        field_result_set = term_query_result_set
-                    else:
-                        field_result_set &= term_query_result_set
+        elapsed_time = unicode(datetime.datetime.now() - start_time).split(':')[2]
 
-                    logger.debug('term_query_result_set: %s' % term_query_result_set)
-                    logger.debug('field_result_set: %s' % field_result_set)
+        return model_list, flat_list, len(flat_list), result_count, elapsed_time
 
-                if global_and_search:
-                    if not model_result_set:
-                        model_result_set = field_result_set
-                    else:
-                        model_result_set &= field_result_set
-                else:
-                    model_result_set |= field_result_set
+    def get_backend(self):
+        # Imported here, the index backends import the models which import
+        # this module
+        from .runtime import search_backend
+        return search_backend
 
-                logger.debug('model_result_set: %s' % model_result_set)
+    def get_pool(self):
+        from .runtime import search_index_pool
+        return search_index_pool
 
-            # Update the search result total count
-            result_count += len(model_result_set)
+    def update_index(self, pk):
+        """
+        Update the search index entries of an object, postponed until
+        the end of the current defer_index_updates block if any
+        """
+        if not self.get_backend().indexed:
+            return
 
-            # Search the field results return values (PK) in the SearchModel's model
-            results = self.model.objects.in_bulk(list(model_result_set)[: LIMIT]).values()
-            logger.debug('query model_result_set: %s' % model_result_set)
+        pending = getattr(SearchModel._local, 'pending', None)
+        if pending is not None:
+            pending.add((self.get_full_name(), pk))
+        else:
+            self.get_backend().update_object(self, pk)
 
-            # Update the search result visible count (limited by LIMIT config option)
-            shown_result_count += len(results)
+    @classmethod
+    @contextmanager
+    def defer_index_updates(cls):
+        """
+        Index each object changed inside the block only once when the
+        block ends, instead of once per change
+        """
+        if getattr(cls._local, 'pending', None) is not None:
+            # Nested, the outermost block updates the index
+            yield
+            return
+
+        cls._local.pending = set()
+        try:
+            yield
+        finally:
+            pending, cls._local.pending = cls._local.pending, None
+            for full_name, pk in pending:
+                cls.get(full_name).update_index(pk)
 
-            if results:
-                model_list[data['label']] = results
-                for result in results:
-                    if result not in flat_list:
-                        flat_list.append(result)
+    @classmethod
+    def add_index_trigger_for(cls, full_name, model, get_pks, background=False):
+        """
+        Same as add_index_trigger for the search model with the given
+        name, which doesn't need to be registered yet, apps are free to
+        be imported before the app that registers the search model
+        """
+        try:
+            search_model = cls.get(full_name)
+        except KeyError:
+            cls._pending_index_triggers.setdefault(full_name, []).append((model, get_pks, background))
+        else:
+            search_model.add_index_trigger(model, get_pks, background=background)
+
+    def rebuild_index(self):
+        backend = self.get_backend()
+        backend.clear(self)
+        for pk in self.model.objects.values_list('pk', flat=True).iterator():
+            backend.update_object(self, pk)
+
+    def update_index_list(self, pks):
+        for pk in pks:
+            self.update_index(pk)
+
+    def add_index_trigger(self, model, get_pks, background=False):
+        """
+        Keep the search index updated when instances of a model holding
+        searched content change, get_pks returns the primary keys of the
+        objects of this search model affected by an instance.
+        With background, the objects affected by a saved instance are
+        indexed by the search index worker when it is free, for models
+        whose instances are shared by many objects
+        """
+        dispatch_uid = u'search_index_%s_%s' % (self.get_full_name(), model._meta)
 
-            logger.debug('model_list: %s' % model_list)
-            logger.debug('flat_list: %s' % flat_list)
+        def instance_post_save(sender, instance, **kwargs):
+            if self.get_backend().indexed:
+                pks = list(get_pks(instance))
+                if background and self.get_pool().submit(self.update_index_list, pks):
+                    return
 
-        elapsed_time = unicode(datetime.datetime.now() - start_time).split(':')[2]
+                self.update_index_list(pks)
 
-        return model_list, flat_list, shown_result_count, result_count, elapsed_time
+        def instance_pre_delete(sender, instance, **kwargs):
+            # The relations are gone by the time the instance is deleted
+            if self.get_backend().indexed:
+                instance._search_index_pks = list(get_pks(instance))
 
-    def assemble_query(self, terms, search_fields):
-        """
-        Returns a query, that is a combination of Q objects. That combination
-        aims to search keywords within a model by testing the given search fields.
-        """
-        queries = []
-        for term in terms:
-            or_query = None
-            for field in search_fields:
-                q = Q(**{'%s__%s' % (field, 'icontains'): term})
-                if or_query is None:
-                    or_query = q
-                else:
-                    or_query = or_query | q
+        def instance_post_delete(sender, instance, **kwargs):
+            for pk in getattr(instance, '_search_index_pks', []):
+                self.update_index(pk)
 
-            queries.append(or_query)
-        return queries
+        post_save.connect(instance_post_save, sender=model, weak=False, dispatch_uid=dispatch_uid)
+        pre_delete.connect(instance_pre_delete, sender=model, weak=False, dispatch_uid=dispatch_uid)
+        post_delete.connect(instance_post_delete, sender=model, weak=False, dispatch_uid=dispatch_uid)
 
 
 # SearchField classes
@@ -236,6 +248,9 @@ class SearchField(object):
     def get_model(self):
         return self.search_model.model
 
+    def get_values(self, pk):
+        return self.search_model.model.objects.filter(pk=pk).values_list(self.field, flat=True)
+
 
 class RelatedSearchField(object):
     """
@@ -255,3 +270,6 @@ class RelatedSearchField(object):
 
     def get_model(self):
         return self.model
+
+    def get_values(self, pk):
+        return self.model.objects.filter(**{self.return_value: pk}).values_list(self.field, flat=True)
@@ -1,7 +1,8 @@
 from __future__ import absolute_import
 
-from .models import RecentSearch
+from .models import RecentSearch, SearchIndexEntry
 
 
 def cleanup():
     RecentSearch.objects.all().delete()
+    SearchIndexEntry.objects.all().delete()
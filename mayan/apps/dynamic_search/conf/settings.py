@@ -9,7 +9,8 @@ register_settings(
     module=u'dynamic_search.conf.settings',
     settings=[
         {'name': u'SHOW_OBJECT_TYPE', 'global_name': u'SEARCH_SHOW_OBJECT_TYPE', 'default': True, 'hidden': True},
-        {'name': u'LIMIT', 'global_name': u'SEARCH_LIMIT', 'default': 100, 'description': _(u'Maximum amount search hits to fetch and display.')},
+        {'name': u'LIMIT', 'global_name': u'SEARCH_LIMIT', 'default': 100, 'description': _(u'Maximum amount search hits to fetch and display at once.')},
+        {'name': u'BACKEND', 'global_name': u'SEARCH_BACKEND', 'default': u'dynamic_search.backends.inverted_index.InvertedIndexSearchBackend', 'description': _(u'Full path to the search backend to use.  Options are: dynamic_search.backends.inverted_index.InvertedIndexSearchBackend and dynamic_search.backends.database.DatabaseSearchBackend')},
         {'name': u'RECENT_COUNT', 'global_name': u'SEARCH_RECENT_COUNT', 'default': 5, 'description': _(u'Maximum number of search queries to remember per user.')},
     ]
 )
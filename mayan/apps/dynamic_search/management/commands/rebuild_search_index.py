@@ -0,0 +1,16 @@
+from __future__ import absolute_import
+
+from django.core.management.base import NoArgsCommand
+
+from ...classes import SearchModel
+
+
+class Command(NoArgsCommand):
+    help = 'Rebuild the search index of all the search models from scratch.'
+
+    def handle_noargs(self, **options):
+        for search_model in SearchModel.get_all():
+            print 'Indexing: %s' % search_model.get_full_name()
+            search_model.rebuild_index()
+
+        print 'Finished.'
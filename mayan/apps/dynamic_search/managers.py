@@ -16,6 +16,9 @@ class RecentSearchManager(models.Manager):
         for key, value in parsed_query.items():
             parsed_query[key] = ' '.join(value)
 
+        # The same search, whichever results are shown
+        parsed_query.pop('offset', None)
+
         if 'q=' in query:
             # Is a simple query
             if not parsed_query.get('q'):
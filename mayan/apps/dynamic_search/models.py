@@ -60,3 +60,23 @@ class RecentSearch(models.Model):
         ordering = ('-datetime_created',)
         verbose_name = _(u'recent search')
         verbose_name_plural = _(u'recent searches')
+
+
+class SearchIndexEntry(models.Model):
+    """
+    A term found in a search field of an object, used by the inverted
+    index search backend
+    """
+    search_model = models.CharField(max_length=128, verbose_name=_(u'search model'))
+    field = models.CharField(max_length=128, verbose_name=_(u'field'))
+    object_id = models.PositiveIntegerField(verbose_name=_(u'object id'))
+    term = models.CharField(max_length=64, db_index=True, verbose_name=_(u'term'))
+    weight = models.FloatField(verbose_name=_(u'weight'))
+
+    def __unicode__(self):
+        return self.term
+
+    class Meta:
+        index_together = [('search_model', 'object_id')]
+        verbose_name = _(u'search index entry')
+        verbose_name_plural = _(u'search index entries')
@@ -0,0 +1,12 @@
+from __future__ import absolute_import
+
+from common.utils import load_backend
+from job_processor.api import WorkerPool
+
+from .conf.settings import BACKEND
+
+search_backend = load_backend(BACKEND)()
+
+# Updates the search index entries of the many objects affected by a change
+# of a shared related object, such as a document type, away from the request
+search_index_pool = WorkerPool(name='search_index_updates', size=1)
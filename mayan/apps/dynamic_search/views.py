@@ -30,21 +30,33 @@ def results(request, extra_context=None):
         # Only do search if there is user input, otherwise just render
         # the template with the extra_context
 
+        # Results past the first LIMIT ones are fetched LIMIT at a time
+        try:
+            offset = max(int(request.GET.get('offset', 0)), 0)
+        except ValueError:
+            offset = 0
+
         if 'q' in request.GET:
             # Simple query
             logger.debug('simple search')
             query_string = request.GET.get('q', u'').strip()
-            model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.simple_search(query_string)
+            model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.simple_search(query_string, offset=offset)
         else:
             # Advanced search
             logger.debug('advanced search')
-            model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.advanced_search(request.GET)
+            model_list, flat_list, shown_result_count, result_count, elapsed_time = document_search.advanced_search(request.GET, offset=offset)
 
         if shown_result_count != result_count:
-            title = _(u'results, (showing only %(shown_result_count)s out of %(result_count)s)') % {
-                'shown_result_count': shown_result_count,
+            title = _(u'results, (showing %(first)s to %(last)s out of %(result_count)s)') % {
+                'first': offset + 1 if shown_result_count else offset,
+                'last': offset + shown_result_count,
                 'result_count': result_count}
 
+            if offset:
+                context['previous_results_url'] = get_results_url(request, max(offset - LIMIT, 0))
+
+            if offset + shown_result_count < result_count:
+                context['next_results_url'] = get_results_url(request, offset + LIMIT)
         else:
             title = _(u'results')
 
@@ -69,6 +81,17 @@ def results(request, extra_context=None):
                           context_instance=RequestContext(request))
 
 
+def get_results_url(request, offset):
+    """
+    Return the URL of the search results starting at offset for the same
+    query, from their first page
+    """
+    query = request.GET.copy()
+    query.pop('page', None)
+    query['offset'] = offset
+    return '%s?%s' % (request.path, query.urlencode())
+
+
 def search(request, advanced=False):
     if advanced:
         form = AdvancedSearchForm(data=request.GET, search_model=document_search)
@@ -5,6 +5,7 @@ import pickle
 
 from django.db import models
 from django.core import serializers
+from django.utils.timezone import now
 
 from .models import HistoryType, History
 from .runtime_data import history_types_dict
@@ -31,16 +32,36 @@ def create_history(history_type_dict, source_object=None, data=None):
     if source_object:
         new_history.content_object = source_object
     if data:
-        new_dict = {}
-        for key, value in data.items():
-            new_dict[key] = {}
-            if isinstance(value, models.Model):
-                new_dict[key]['value'] = serializers.serialize('json', [value])
-            elif isinstance(value, models.query.QuerySet):
-                new_dict[key]['value'] = serializers.serialize('json', value)
-            else:
-                new_dict[key]['value'] = json.dumps(value)
-            new_dict[key]['type'] = pickle.dumps(type(value))
-
-        new_history.dictionary = json.dumps(new_dict)
+        new_history.dictionary = serialize_history_data(data)
     new_history.save()
+
+
+def create_history_bulk(history_type_dict, source_objects, data=None):
+    """
+    Create the same history entry for several objects with a single
+    insert, the data is serialized only once
+    """
+    history_type, created = HistoryType.objects.get_or_create(namespace=history_type_dict['namespace'], name=history_type_dict['name'])
+
+    dictionary = serialize_history_data(data) if data else u''
+    # bulk_create doesn't call the model's save method
+    timestamp = now()
+    History.objects.bulk_create([
+        History(history_type=history_type, content_object=source_object, dictionary=dictionary, datetime=timestamp)
+        for source_object in source_objects
+    ])
+
+
+def serialize_history_data(data):
+    new_dict = {}
+    for key, value in data.items():
+        new_dict[key] = {}
+        if isinstance(value, models.Model):
+            new_dict[key]['value'] = serializers.serialize('json', [value])
+        elif isinstance(value, models.query.QuerySet):
+            new_dict[key]['value'] = serializers.serialize('json', value)
+        else:
+            new_dict[key]['value'] = json.dumps(value)
+        new_dict[key]['type'] = pickle.dumps(type(value))
+
+    return json.dumps(new_dict)
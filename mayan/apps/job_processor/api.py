@@ -1,2 +1,75 @@
+from __future__ import absolute_import
+
+import logging
+import Queue
+import threading
+
+from django import db
+
+logger = logging.getLogger(__name__)
+
+
 def process_job(func, *args, **kwargs):
     return func(*args, **kwargs)
+
+
+class WorkerPool(object):
+    """
+    Fixed size pool of worker threads executing jobs in the background.
+    Jobs are only accepted while there are free slots, so that callers
+    don't take work they can't start right away
+    """
+    _registry = {}
+
+    @classmethod
+    def get_all(cls):
+        return cls._registry.values()
+
+    @classmethod
+    def get(cls, name):
+        return cls._registry[name]
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.busy = 0
+        self._jobs = Queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self.__class__._registry[name] = self
+
+    def get_free_slots(self):
+        with self._lock:
+            return self.size - self.busy
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue a job for execution, return False if all the slots are taken
+        """
+        with self._lock:
+            if self.busy >= self.size:
+                return False
+
+            self.busy += 1
+            # Start the worker threads on first use only
+            while len(self._workers) < self.size:
+                worker = threading.Thread(target=self._work, name=u'%s-%d' % (self.name, len(self._workers)))
+                worker.daemon = True
+                worker.start()
+                self._workers.append(worker)
+
+        self._jobs.put((func, args, kwargs))
+        return True
+
+    def _work(self):
+        while True:
+            func, args, kwargs = self._jobs.get()
+            try:
+                func(*args, **kwargs)
+            except Exception as exception:
+                logger.error('unhandled exception in job: %s; %s' % (func, exception))
+            finally:
+                # Don't keep a connection open in an idle worker
+                db.close_connection()
+                with self._lock:
+                    self.busy -= 1
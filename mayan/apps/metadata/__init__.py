@@ -5,6 +5,7 @@ from django.utils.translation import ugettext_lazy as _
 from acls.api import class_permissions
 from common.utils import encapsulate
 from documents.models import Document, DocumentType
+from dynamic_search.classes import SearchModel
 from navigation.api import (register_links, register_multi_item_links,
     register_sidebar_template, register_model_list_columns)
 from project_setup.api import register_setup
@@ -16,7 +17,7 @@ from .links import (metadata_edit, metadata_view, metadata_multiple_edit,
     setup_metadata_type_create, setup_metadata_set_list, setup_metadata_set_edit,
     setup_metadata_set_members, setup_metadata_set_delete, setup_metadata_set_create,
     setup_document_type_metadata)
-from .models import MetadataType, MetadataSet
+from .models import DocumentMetadata, MetadataType, MetadataSet
 from .permissions import (PERMISSION_METADATA_DOCUMENT_EDIT,
     PERMISSION_METADATA_DOCUMENT_ADD, PERMISSION_METADATA_DOCUMENT_REMOVE,
     PERMISSION_METADATA_DOCUMENT_VIEW)
@@ -51,3 +52,6 @@ register_model_list_columns(Document, [
             'name': _(u'metadata'), 'attribute': encapsulate(lambda x: get_metadata_string(x))
         },
     ])
+
+SearchModel.add_index_trigger_for('documents.Document', DocumentMetadata, lambda instance: [instance.document_id])
+SearchModel.add_index_trigger_for('documents.Document', MetadataType, lambda instance: instance.documentmetadata_set.values_list('document', flat=True), background=True)
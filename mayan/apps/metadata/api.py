@@ -43,6 +43,23 @@ def save_metadata_list(metadata_list, document, create=False):
         save_metadata(item, document, create)
 
 
+def create_metadata_list_bulk(metadata_list, documents):
+    """
+    Associate the same list of metadata to several new documents with
+    a single insert
+    """
+    values = {}
+    for item in metadata_list:
+        # Later values for the same metadata type replace earlier ones
+        item_metadata_type = get_object_or_404(MetadataType, pk=item['id'])
+        values[item_metadata_type.pk] = (item_metadata_type, unquote_plus(item['value']))
+
+    DocumentMetadata.objects.bulk_create([
+        DocumentMetadata(document=document, metadata_type=metadata_type, value=value)
+        for document in documents for metadata_type, value in values.values()
+    ])
+
+
 def save_metadata(metadata_dict, document, create=False):
     """
     Take a dictionary of metadata type & value and associate it to a
@@ -3,6 +3,7 @@ from __future__ import absolute_import
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
+from django.db import transaction
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, render_to_response
 from django.template import RequestContext
@@ -16,6 +17,7 @@ from permissions.models import Permission
 
 from common.utils import generate_choices_w_labels, encapsulate, get_object_name
 from common.views import assign_remove
+from document_indexing.api import atomic_index_updates
 
 from .api import save_metadata_list
 from .classes import MetadataObjectWrapper
@@ -80,12 +82,18 @@ def metadata_edit(request, document_id=None, document_id_list=None):
             for document in documents:
 
                 errors = []
-                for form in formset.forms:
-                    if form.cleaned_data['update']:
-                        try:
-                            save_metadata_list([form.cleaned_data], document)
-                        except Exception as exception:
-                            errors.append(exception)
+                # The indexes of the document are updated once for all the
+                # metadata edited
+                with atomic_index_updates():
+                    for form in formset.forms:
+                        if form.cleaned_data['update']:
+                            try:
+                                # A failed form doesn't break the
+                                # transaction of the others
+                                with transaction.atomic():
+                                    save_metadata_list([form.cleaned_data], document)
+                            except Exception as exception:
+                                errors.append(exception)
 
                 if errors:
                     for error in errors:
@@ -230,17 +238,19 @@ def metadata_remove(request, document_id=None, document_id_list=None):
         if formset.is_valid():
             for document in documents:
 
-                for form in formset.forms:
-                    if form.cleaned_data['update']:
-                        metadata_type = get_object_or_404(MetadataType, pk=form.cleaned_data['id'])
-                        try:
-                            document_metadata = DocumentMetadata.objects.get(document=document, metadata_type=metadata_type)
-                            document_metadata.delete()
-                            messages.success(request, _(u'Successfully remove metadata type: %(metadata_type)s from document: %(document)s.') % {
-                                'metadata_type': metadata_type, 'document': document})
-                        except:
-                            messages.error(request, _(u'Error removing metadata type: %(metadata_type)s from document: %(document)s.') % {
-                                'metadata_type': metadata_type, 'document': document})
+                with atomic_index_updates():
+                    for form in formset.forms:
+                        if form.cleaned_data['update']:
+                            metadata_type = get_object_or_404(MetadataType, pk=form.cleaned_data['id'])
+                            try:
+                                with transaction.atomic():
+                                    document_metadata = DocumentMetadata.objects.get(document=document, metadata_type=metadata_type)
+                                    document_metadata.delete()
+                                messages.success(request, _(u'Successfully remove metadata type: %(metadata_type)s from document: %(document)s.') % {
+                                    'metadata_type': metadata_type, 'document': document})
+                            except:
+                                messages.error(request, _(u'Error removing metadata type: %(metadata_type)s from document: %(document)s.') % {
+                                    'metadata_type': metadata_type, 'document': document})
 
             return HttpResponseRedirect(next)
 
@@ -12,6 +12,8 @@ except:
 
 
 MIMETYPE_ICONS_DIRECTORY_NAME = os.path.join('images', 'mimetypes')
+# libmagic only looks at the start of a file, don't read more than this
+MAGIC_BUFFER_SIZE = 1024 * 1024
 
 UNKNWON_TYPE_FILE_NAME = 'unknown.png'
 ERROR_FILE_NAME = 'error.png'
@@ -94,19 +96,31 @@ def get_mimetype(file_description, filepath, mimetype_only=False):
     library via python-magic or fallback to use python's mimetypes
     library
     """
+    if USE_PYTHON_MAGIC:
+        buffer = file_description.read(MAGIC_BUFFER_SIZE)
+    else:
+        buffer = None
+
+    file_description.close()
+
+    return get_buffer_mimetype(buffer, filepath, mimetype_only=mimetype_only)
+
+
+def get_buffer_mimetype(buffer, filepath, mimetype_only=False):
+    """
+    Determine a file's mimetype from a buffer holding the start of its
+    content, for callers that already read it
+    """
     file_mimetype = None
     file_mime_encoding = None
     if USE_PYTHON_MAGIC:
         mime = magic.Magic(mime=True)
-        file_mimetype = mime.from_buffer(file_description.read())
+        file_mimetype = mime.from_buffer(buffer)
         if not mimetype_only:
-            file_description.seek(0)
             mime_encoding = magic.Magic(mime_encoding=True)
-            file_mime_encoding = mime_encoding.from_buffer(file_description.read())
+            file_mime_encoding = mime_encoding.from_buffer(buffer)
     else:
         path, filename = os.path.split(filepath)
         file_mimetype, file_mime_encoding = mimetypes.guess_type(filename)
 
-    file_description.close()
-
     return file_mimetype, file_mime_encoding
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import logging
+import platform
 
 from django.db import DatabaseError
 from django.db.models.signals import post_save
@@ -24,8 +25,7 @@ from .links import (submit_document, submit_document_multiple,
     document_queue_disable, document_queue_enable,
     all_document_ocr_cleanup, queue_document_list,
     ocr_tool_link)
-from .literals import QUEUEDOCUMENT_STATE_PENDING, QUEUEDOCUMENT_STATE_PROCESSING
-from .models import DocumentQueue
+from .models import DocumentQueue, QueueDocument
 from .permissions import PERMISSION_OCR_DOCUMENT
 from .statistics import OCRStatistics
 from .tasks import task_process_document_queues
@@ -64,12 +64,12 @@ def create_default_queue_signal_handler(sender, **kwargs):
 
 
 def reset_queue_documents():
+    # Queue documents claimed by this node before it was restarted will
+    # never be finished
     try:
-        default_queue = DocumentQueue.objects.get(name='default')
-    except (DatabaseError, DocumentQueue.DoesNotExist):
+        QueueDocument.objects.reset_orphans(node_name=platform.node())
+    except DatabaseError:
         pass
-    else:
-        default_queue.queuedocument_set.filter(state=QUEUEDOCUMENT_STATE_PROCESSING).update(state=QUEUEDOCUMENT_STATE_PENDING)
 
 
 register_interval_job('task_process_document_queues', _(u'Checks the OCR queue for pending documents.'), task_process_document_queues, seconds=QUEUE_PROCESSING_INTERVAL)
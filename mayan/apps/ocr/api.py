@@ -1,34 +1,30 @@
 from __future__ import absolute_import
 
 import logging
+import multiprocessing
 import os
-import tempfile
+import time
 
-import sh
+from PIL import Image
 
+from django.db import transaction
 from django.utils.translation import ugettext as _
 
-from common.conf.settings import TEMPORARY_DIRECTORY
-from common.utils import fs_cleanup
-from converter.api import convert
 from documents.models import DocumentPage
-
-from .conf.settings import UNPAPER_PATH, LANGUAGE
-from .exceptions import UnpaperError
-from .literals import (DEFAULT_OCR_FILE_FORMAT, UNPAPER_FILE_FORMAT,
-    DEFAULT_OCR_FILE_EXTENSION)
-from .parsers import parse_document_page
+from dynamic_search.classes import SearchModel
+
+from .conf.settings import (MEMORY_BUDGET, PAGE_CONCURRENT_EXECUTION,
+    PAGE_TIMEOUT)
+from .exceptions import OCRError
+from .literals import (PAGE_BITMAP_COPIES, PAGE_BYTES_PER_PIXEL,
+    PAGE_COMPRESSION_RATIO, PAGE_POLL_INTERVAL)
+from .parsers import parse_document_version
 from .parsers.exceptions import ParserError, ParserUnknownFile
-from .runtime import language_backend, ocr_backend
+from .runtime import get_page_pool, language_backend
+from .workers import execute_page_ocr
 
 logger = logging.getLogger(__name__)
 
-try:
-    UNPAPER = sh.Command(UNPAPER_PATH).bake(overwrite=True, no_multi_pages=True)
-except sh.CommandNotFound:
-    logger.debug('unpaper not found')
-    UNPAPER = None
-
 
 def do_document_ocr(queue_document):
     """
@@ -37,47 +33,137 @@ def do_document_ocr(queue_document):
     the document mimetype do a visual OCR by calling the corresponding
     OCR backend
     """
-    for document_page in queue_document.document.pages.all():
-        try:
-            # Try to extract text by means of a parser
-            parse_document_page(document_page)
-        except (ParserError, ParserUnknownFile):
-            # Fall back to doing visual OCR
+    document_pages = list(queue_document.document.pages.all())
+    if not document_pages:
+        return
+
+    try:
+        # Try to extract the text of all the pages in a single parser pass
+        page_texts = parse_document_version(document_pages[0].document_version)
+    except (ParserError, ParserUnknownFile):
+        page_texts = []
+
+    visual_ocr_pages = []
+    parsed_pages = False
+    with transaction.atomic():
+        for document_page in document_pages:
+            try:
+                content = page_texts[document_page.page_number - 1]
+            except IndexError:
+                content = None
 
-            document_filepath = document_page.document.get_image_cache_name(page=document_page.page_number, version=document_page.document_version.pk)
+            if content:
+                DocumentPage.objects.filter(pk=document_page.pk).update(content=content, page_label=_(u'Text extracted from PDF'))
+                parsed_pages = True
+            else:
+                # Fall back to doing visual OCR for the pages without text
+                visual_ocr_pages.append(document_page)
 
-            logger.debug('document_filepath: %s' % document_filepath)
+    if not visual_ocr_pages:
+        if parsed_pages:
+            # Bulk updates don't send the signals that keep the search index
+            # current, it is updated once the visual OCR is done otherwise
+            SearchModel.get('documents.Document').update_index(queue_document.document.pk)
+        return
 
-            unpaper_input = convert(document_filepath, file_format=UNPAPER_FILE_FORMAT)
+    # Render all the pages that need visual OCR in a single converter
+    # run instead of one run per page
+    document_version = visual_ocr_pages[0].document_version
+    document_version.document.create_image_cache(version=document_version.pk, pages=[document_page.page_number for document_page in visual_ocr_pages])
 
-            logger.debug('unpaper_input: %s' % unpaper_input)
+    page_images = []
+    for document_page in visual_ocr_pages:
+        document_filepath = document_page.document.get_image_cache_name(page=document_page.page_number, version=document_page.document_version.pk)
+        logger.debug('document_filepath: %s' % document_filepath)
+        page_images.append((document_page.pk, document_filepath))
 
-            unpaper_output = execute_unpaper(input_filepath=unpaper_input)
+    results, errors = execute_pages_ocr(page_images, pool=get_page_pool())
 
-            logger.debug('unpaper_output: %s' % unpaper_output)
+    # Write the text of all the pages that succeeded in a single transaction
+    with transaction.atomic():
+        for document_page_pk, ocr_text in results.items():
+            DocumentPage.objects.filter(pk=document_page_pk).update(content=ocr_cleanup(ocr_text), page_label=_(u'Text from OCR'))
 
-            # Convert to TIFF
-            pre_ocr_filepath = convert(input_filepath=unpaper_output, file_format=DEFAULT_OCR_FILE_FORMAT)
+    # Bulk updates don't send the signals that keep the search index current
+    SearchModel.get('documents.Document').update_index(queue_document.document.pk)
 
-            logger.debug('pre_ocr_filepath: %s' % pre_ocr_filepath)
+    if errors:
+        raise OCRError(u'\n'.join([u'%s: %s' % (document_page, errors[document_page.pk]) for document_page in visual_ocr_pages if document_page.pk in errors]))
 
-            # Tesseract needs an explicit file extension
-            pre_ocr_filepath_w_ext = os.extsep.join([pre_ocr_filepath, DEFAULT_OCR_FILE_EXTENSION])
 
-            logger.debug('pre_ocr_filepath_w_ext: %s' % pre_ocr_filepath_w_ext)
+def estimate_page_memory(document_filepath):
+    """
+    Approximate the memory needed to OCR a page image, from the size of
+    its uncompressed bitmap
+    """
+    try:
+        # Only the header is read to get the size
+        with open(document_filepath, 'rb') as descriptor:
+            width, height = Image.open(descriptor).size
+    except Exception:
+        return os.path.getsize(document_filepath) * PAGE_COMPRESSION_RATIO * PAGE_BITMAP_COPIES
+    else:
+        return width * height * PAGE_BYTES_PER_PIXEL * PAGE_BITMAP_COPIES
 
-            os.rename(pre_ocr_filepath, pre_ocr_filepath_w_ext)
-            try:
-                ocr_text = ocr_backend.execute(pre_ocr_filepath_w_ext, LANGUAGE)
 
-                document_page.content = ocr_cleanup(ocr_text)
-                document_page.page_label = _(u'Text from OCR')
-                document_page.save()
-            finally:
-                fs_cleanup(pre_ocr_filepath_w_ext)
-                fs_cleanup(unpaper_input)
-                fs_cleanup(document_filepath)
-                fs_cleanup(unpaper_output)
+def execute_pages_ocr(page_images, pool=None):
+    """
+    Do the visual OCR of a list of (key, page image filepath) tuples using
+    up to PAGE_CONCURRENT_EXECUTION processes of a pool at once, without
+    going over MEMORY_BUDGET, or one at a time without a pool.  Return a
+    dictionary of raw texts and a dictionary of exceptions, both by key; the
+    failure of one page, including taking longer than PAGE_TIMEOUT, doesn't
+    affect the others
+    """
+    results = {}
+    errors = {}
+
+    workers = min(PAGE_CONCURRENT_EXECUTION, len(page_images))
+    if workers <= 1 or not pool:
+        for key, document_filepath in page_images:
+            try:
+                results[key] = execute_page_ocr(document_filepath)
+            except Exception as exception:
+                logger.error('error executing OCR of page image: %s; %s' % (document_filepath, exception))
+                errors[key] = exception
+
+        return results, errors
+
+    queue = list(page_images)
+    pending = {}
+    reserved_memory = 0
+    while queue or pending:
+        # Always keep at least one page in flight, even if it alone goes
+        # over the memory budget
+        while queue and len(pending) < workers:
+            key, document_filepath = queue[0]
+            memory = estimate_page_memory(document_filepath)
+            if pending and MEMORY_BUDGET and reserved_memory + memory > MEMORY_BUDGET:
+                break
+
+            queue.pop(0)
+            pending[key] = (pool.apply_async(execute_page_ocr, (document_filepath,)), memory, document_filepath, time.time() + PAGE_TIMEOUT)
+            reserved_memory += memory
+
+        # Wait for the oldest page, then collect every finished one.  The
+        # result of a page whose process died never arrives, pages past
+        # their deadline are given up
+        pending.values()[0][0].wait(PAGE_POLL_INTERVAL)
+        for key, (async_result, memory, document_filepath, deadline) in pending.items():
+            if async_result.ready() or time.time() >= deadline:
+                try:
+                    results[key] = async_result.get(timeout=0)
+                except multiprocessing.TimeoutError:
+                    logger.error('timeout executing OCR of page image: %s' % document_filepath)
+                    errors[key] = OCRError(u'Page OCR timed out after %s seconds' % PAGE_TIMEOUT)
+                except Exception as exception:
+                    logger.error('error executing OCR of page image: %s; %s' % (document_filepath, exception))
+                    errors[key] = exception
+
+                del pending[key]
+                reserved_memory -= memory
+
+    return results, errors
 
 
 def ocr_cleanup(text):
@@ -110,24 +196,3 @@ def clean_pages():
         if page.content:
             page.content = ocr_cleanup(page.content)
             page.save()
-
-
-def execute_unpaper(input_filepath, output_filepath=None):
-    """
-    Executes the program unpaper using subprocess's Popen
-    """
-    if UNPAPER:
-        if not output_filepath:
-            fd, output_filepath = tempfile.mkstemp(dir=TEMPORARY_DIRECTORY)
-
-        try:
-            UNPAPER(input_filepath, output_filepath)
-        except sh.ErrorReturnCode as exception:
-            logger.error(exception)
-            raise UnpaperError(exception.stderr)
-        else:
-            return output_filepath
-        finally:
-            os.close(fd)
-    else:
-        return input_filepath
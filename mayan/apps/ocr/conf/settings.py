@@ -12,6 +12,10 @@ register_settings(
         {'name': u'LANGUAGE', 'global_name': u'OCR_LANGUAGE', 'default': u'eng'},
         {'name': u'REPLICATION_DELAY', 'global_name': u'OCR_REPLICATION_DELAY', 'default': 0, 'description': _(u'Amount of seconds to delay OCR of documents to allow for the node\'s storage replication overhead.')},
         {'name': u'NODE_CONCURRENT_EXECUTION', 'global_name': u'OCR_NODE_CONCURRENT_EXECUTION', 'default': 1, 'description': _(u'Maximum amount of concurrent document OCRs a node can perform.')},
+        {'name': u'PAGE_CONCURRENT_EXECUTION', 'global_name': u'OCR_PAGE_CONCURRENT_EXECUTION', 'default': 1, 'description': _(u'Maximum amount of pages of the same document to OCR concurrently, each one in its own process.  Nodes start a pool of OCR_NODE_CONCURRENT_EXECUTION times this amount of processes.')},
+        {'name': u'PAGE_TIMEOUT', 'global_name': u'OCR_PAGE_TIMEOUT', 'default': 10 * 60, 'description': _(u'Amount of seconds after which the OCR of a page is abandoned and the page is reported as failed.')},
+        {'name': u'MEMORY_BUDGET', 'global_name': u'OCR_MEMORY_BUDGET', 'default': 1024 * 1024 * 1024, 'description': _(u'Approximate amount of memory in bytes that the pages of a document being OCRed concurrently can use.  Use None to only limit the amount of concurrent pages.')},
+        {'name': u'LEASE_DURATION', 'global_name': u'OCR_LEASE_DURATION', 'default': 5 * 60, 'description': _(u'Amount of seconds a node keeps the claim of a queued document without renewing it.  Documents whose claim expires, for example because the node processing them crashed, are returned to the queue.')},
         {'name': u'AUTOMATIC_OCR', 'global_name': u'OCR_AUTOMATIC_OCR', 'default': True, 'description': _(u'Automatically queue newly created documents for OCR.')},
         {'name': u'QUEUE_PROCESSING_INTERVAL', 'global_name': u'OCR_QUEUE_PROCESSING_INTERVAL', 'default': 10},
         {'name': u'UNPAPER_PATH', 'global_name': u'OCR_UNPAPER_PATH', 'default': u'/usr/bin/unpaper', 'description': _(u'File path to unpaper program.'), 'exists': True},
@@ -18,6 +18,29 @@ QUEUEDOCUMENT_STATE_CHOICES = (
     (QUEUEDOCUMENT_STATE_ERROR, _(u'error')),
 )
 
+QUEUEDOCUMENT_PRIORITY_LOW = 0
+QUEUEDOCUMENT_PRIORITY_NORMAL = 1
+QUEUEDOCUMENT_PRIORITY_HIGH = 2
+
+QUEUEDOCUMENT_PRIORITY_CHOICES = (
+    (QUEUEDOCUMENT_PRIORITY_LOW, _(u'low')),
+    (QUEUEDOCUMENT_PRIORITY_NORMAL, _(u'normal')),
+    (QUEUEDOCUMENT_PRIORITY_HIGH, _(u'high')),
+)
+
+# Times a lease is renewed during its duration while a document is
+# processed, so a single delayed renewal doesn't lose it
+LEASE_RENEWALS = 3
+
 DEFAULT_OCR_FILE_FORMAT = u'tiff'
 DEFAULT_OCR_FILE_EXTENSION = u'tif'
 UNPAPER_FILE_FORMAT = u'ppm'
+
+# Used to estimate the memory needed to OCR a page: the page bitmap is
+# kept in memory in several forms along the convert, unpaper and OCR steps
+PAGE_BITMAP_COPIES = 3
+PAGE_BYTES_PER_PIXEL = 3
+# Used when the page image dimensions can't be read
+PAGE_COMPRESSION_RATIO = 10
+# Seconds to wait for a page OCR worker result before checking the others
+PAGE_POLL_INTERVAL = 1
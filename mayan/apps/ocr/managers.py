@@ -1,8 +1,18 @@
 from __future__ import absolute_import
 
-from django.db import models
+from datetime import timedelta
+import logging
 
+from django.db import connection, models, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .conf.settings import LEASE_DURATION, REPLICATION_DELAY
 from .exceptions import AlreadyQueued
+from .literals import (QUEUEDOCUMENT_PRIORITY_NORMAL,
+    QUEUEDOCUMENT_STATE_PENDING, QUEUEDOCUMENT_STATE_PROCESSING)
+
+logger = logging.getLogger(__name__)
 
 
 class DocumentQueueManager(models.Manager):
@@ -11,11 +21,116 @@ class DocumentQueueManager(models.Manager):
     queue
     """
 
-    def queue_document(self, document, queue_name='default'):
+    def queue_document(self, document, queue_name='default', priority=QUEUEDOCUMENT_PRIORITY_NORMAL):
         document_queue = self.model.objects.get(name=queue_name)
         if document_queue.queuedocument_set.filter(document=document):
             raise AlreadyQueued
 
-        document_queue.queuedocument_set.create(document=document, delay=True)
+        document_queue.queuedocument_set.create(document=document, delay=True, priority=priority)
 
         return document_queue
+
+
+class QueueDocumentManager(models.Manager):
+    """
+    Module manager class to atomically claim queued documents for
+    processing and to keep track of the nodes processing them by means
+    of renewable leases
+    """
+
+    def get_claimable(self, document_queue=None):
+        """
+        Return the pending queue documents, oldest and highest priority
+        first, whose replication delay has passed
+        """
+        q_pending = Q(state=QUEUEDOCUMENT_STATE_PENDING)
+        q_delayed = Q(delay=True)
+        q_delay_interval = Q(datetime_submitted__lt=now() - timedelta(seconds=REPLICATION_DELAY))
+
+        queryset = self.filter((q_pending & ~q_delayed) | (q_pending & q_delayed & q_delay_interval))
+        if document_queue:
+            queryset = queryset.filter(document_queue=document_queue)
+
+        return queryset.order_by('-priority', 'datetime_submitted')
+
+    def supports_skip_locked(self):
+        # PostgreSQL 9.5 and later
+        return connection.vendor == 'postgresql' and getattr(connection, 'pg_version', 0) >= 90500
+
+    def claim(self, node_name, count=1, document_queue=None):
+        """
+        Mark up to count claimable queue documents as being processed by
+        node_name, leased for LEASE_DURATION seconds, and return them.
+        Several nodes can claim at the same time without ever getting the
+        same queue document
+        """
+        if self.supports_skip_locked():
+            claimed_ids = self._claim_skip_locked(node_name, count, document_queue)
+        else:
+            claimed_ids = self._claim_compare_and_swap(node_name, count, document_queue)
+
+        return list(self.filter(pk__in=claimed_ids))
+
+    def _get_claim_values(self, node_name):
+        return {
+            'state': QUEUEDOCUMENT_STATE_PROCESSING,
+            'node_name': node_name,
+            'lease_expiration': now() + timedelta(seconds=LEASE_DURATION),
+        }
+
+    def _claim_skip_locked(self, node_name, count, document_queue):
+        # Rows locked by concurrent claims are skipped instead of waited
+        # for, select and update happen in the same transaction
+        with transaction.atomic():
+            sql, params = self.get_claimable(document_queue).values_list('pk', flat=True)[:count].query.sql_with_params()
+            cursor = connection.cursor()
+            cursor.execute(u'%s FOR UPDATE SKIP LOCKED' % sql, params)
+            claimed_ids = [row[0] for row in cursor.fetchall()]
+            if claimed_ids:
+                self.filter(pk__in=claimed_ids).update(**self._get_claim_values(node_name))
+
+        return claimed_ids
+
+    def _claim_compare_and_swap(self, node_name, count, document_queue):
+        # Each candidate is only claimed if it is still pending, concurrent
+        # claims of the same row update it only once
+        claimed_ids = []
+        for candidate_id in self.get_claimable(document_queue).values_list('pk', flat=True)[:count * 2]:
+            if self.filter(pk=candidate_id, state=QUEUEDOCUMENT_STATE_PENDING).update(**self._get_claim_values(node_name)):
+                claimed_ids.append(candidate_id)
+                if len(claimed_ids) == count:
+                    break
+
+        return claimed_ids
+
+    def renew_lease(self, queue_document_id, node_name):
+        """
+        Extend the lease of a queue document being processed, return False
+        if the lease was lost to another node
+        """
+        return self.filter(pk=queue_document_id, state=QUEUEDOCUMENT_STATE_PROCESSING, node_name=node_name).update(
+            lease_expiration=now() + timedelta(seconds=LEASE_DURATION)) == 1
+
+    def release(self, queue_document_id):
+        """
+        Return a claimed queue document to the pending state
+        """
+        self.filter(pk=queue_document_id, state=QUEUEDOCUMENT_STATE_PROCESSING).update(state=QUEUEDOCUMENT_STATE_PENDING, node_name=None, lease_expiration=None)
+
+    def reset_orphans(self, node_name=None):
+        """
+        Return to the pending state the queue documents whose lease has
+        expired, or all those being processed by node_name if given.
+        Return the amount of queue documents reset
+        """
+        queryset = self.filter(state=QUEUEDOCUMENT_STATE_PROCESSING)
+        if node_name:
+            queryset = queryset.filter(node_name=node_name)
+        else:
+            queryset = queryset.filter(lease_expiration__lt=now())
+
+        count = queryset.update(state=QUEUEDOCUMENT_STATE_PENDING, node_name=None, lease_expiration=None)
+        if count:
+            logger.info('reset %d orphan queue documents' % count)
+
+        return count
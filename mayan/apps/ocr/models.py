@@ -11,8 +11,9 @@ from documents.models import Document
 from .exceptions import ReQueueError
 from .literals import (DOCUMENTQUEUE_STATE_CHOICES,
     QUEUEDOCUMENT_STATE_PENDING, QUEUEDOCUMENT_STATE_CHOICES,
-    QUEUEDOCUMENT_STATE_PROCESSING, DOCUMENTQUEUE_STATE_ACTIVE)
-from .managers import DocumentQueueManager
+    QUEUEDOCUMENT_STATE_PROCESSING, DOCUMENTQUEUE_STATE_ACTIVE,
+    QUEUEDOCUMENT_PRIORITY_CHOICES, QUEUEDOCUMENT_PRIORITY_NORMAL)
+from .managers import DocumentQueueManager, QueueDocumentManager
 
 
 class DocumentQueue(models.Model):
@@ -44,9 +45,13 @@ class QueueDocument(models.Model):
         verbose_name=_(u'state'))
     result = models.TextField(blank=True, null=True, verbose_name=_(u'result'))
     node_name = models.CharField(max_length=32, verbose_name=_(u'node name'), blank=True, null=True)
+    priority = models.PositiveIntegerField(choices=QUEUEDOCUMENT_PRIORITY_CHOICES, default=QUEUEDOCUMENT_PRIORITY_NORMAL, verbose_name=_(u'priority'), db_index=True)
+    lease_expiration = models.DateTimeField(verbose_name=_(u'lease expiration'), blank=True, null=True, db_index=True)
+
+    objects = QueueDocumentManager()
 
     class Meta:
-        ordering = ('datetime_submitted',)
+        ordering = ('-priority', 'datetime_submitted')
         verbose_name = _(u'queue document')
         verbose_name_plural = _(u'queue documents')
 
@@ -59,6 +64,7 @@ class QueueDocument(models.Model):
             self.delay = False
             self.result = None
             self.node_name = None
+            self.lease_expiration = None
             self.save()
 
     def __unicode__(self):
@@ -6,12 +6,11 @@ import subprocess
 
 from django.utils.translation import ugettext as _
 
-from converter import office_converter
-from converter.office_converter import OfficeConverter
 from converter.office_converter import CONVERTER_OFFICE_FILE_MIMETYPES
+from converter.runtime import office_converter
 from converter.exceptions import OfficeConversionError
 from documents.utils import document_save_to_temp_dir
-from common.utils import copyfile
+from common.utils import copyfile, fs_cleanup
 from common.conf.settings import TEMPORARY_DIRECTORY
 
 from ocr.parsers.exceptions import ParserError, ParserUnknownFile
@@ -34,17 +33,21 @@ def register_parser(mimetypes, parsers):
                 mimetype_registry.setdefault(mimetype, []).append(parser_instance)
 
 
+def get_parser_mimetype(mimetype):
+    if mimetype.startswith('text/'):
+        if mimetype not in CONVERTER_OFFICE_FILE_MIMETYPES:
+            logger.debug('fallback to mimetype text/plain')
+            return 'text/plain'
+
+    return mimetype
+
+
 def parse_document_page(document_page, descriptor=None, mimetype=None):
     logger.debug('executing')
     logger.debug('document_page: %s' % document_page)
     logger.debug('document mimetype: %s' % document_page.document.file_mimetype)
 
-    if not mimetype:
-        mimetype = document_page.document.file_mimetype
-    if mimetype.startswith('text/'):
-        if mimetype not in CONVERTER_OFFICE_FILE_MIMETYPES:
-            mimetype = 'text/plain'
-            logger.debug('fallback to mimetype text/plain')
+    mimetype = get_parser_mimetype(mimetype or document_page.document.file_mimetype)
     logger.debug('used mimetype: %s' % mimetype)
 
     try:
@@ -64,6 +67,44 @@ def parse_document_page(document_page, descriptor=None, mimetype=None):
         raise ParserUnknownFile
 
 
+def parse_document_version(document_version, descriptor=None, mimetype=None):
+    """
+    Extract the text of all the pages of a document version in a single
+    pass of the first registered parser that succeeds.  Return a list of
+    page texts in page order, pages without text are empty strings
+    """
+    logger.debug('document_version: %s' % document_version)
+
+    mimetype = get_parser_mimetype(mimetype or document_version.mimetype)
+    logger.debug('used mimetype: %s' % mimetype)
+
+    try:
+        parsers = mimetype_registry[mimetype]
+    except KeyError:
+        raise ParserUnknownFile
+
+    for parser in parsers:
+        try:
+            return parser.parse_document(document_version, descriptor)
+        except ParserError:
+            # If parser raises error, try next parser in the list
+            pass
+
+    raise ParserError('Parser list exhausted')
+
+
+def split_pages(text):
+    """
+    Split the text of a PDF in to the text of each page, pages end with a
+    form feed
+    """
+    pages = text.split('\x0c')
+    if pages and not pages[-1].strip():
+        pages.pop()
+
+    return [page if page.strip() else u'' for page in pages]
+
+
 class Parser(object):
     """
     Parser base class
@@ -72,6 +113,9 @@ class Parser(object):
     def parse(self, document_page, descriptor=None):
         raise NotImplementedError("Your %s class has not defined a parse() method, which is required." % self.__class__.__name__)
 
+    def parse_document(self, document_version, descriptor=None):
+        raise NotImplementedError("Your %s class has not defined a parse_document() method, which is required." % self.__class__.__name__)
+
 
 class SlateParser(Parser):
     """
@@ -93,33 +137,64 @@ class SlateParser(Parser):
         document_page.page_label = _(u'Text extracted from PDF')
         document_page.save()
 
+    def parse_document(self, document_version, descriptor=None):
+        logger.debug('Starting SlateParser for all pages')
+
+        if not descriptor:
+            descriptor = document_version.open()
+
+        try:
+            pdf_pages = slate.PDF(descriptor)
+        except Exception as exception:
+            raise ParserError(exception)
+        finally:
+            descriptor.close()
+
+        # Pages end with a form feed, empty pages are only a form feed
+        return [page.rstrip('\x0c') if page.strip('\x0c').strip() else u'' for page in pdf_pages]
+
 
 class OfficeParser(Parser):
     """
     Parser for office document formats
     """
-    def parse(self, document_page, descriptor=None):
-        logger.debug('executing')
-        try:
-            office_converter = OfficeConverter()
-            document_file = document_save_to_temp_dir(document_page.document, document_page.document.checksum)
-            logger.debug('document_file: %s', document_file)
-
-            office_converter.convert(document_file, mimetype=document_page.document.file_mimetype)
-            if office_converter.exists:
-                input_filepath = office_converter.output_filepath
-                logger.debug('office_converter.output_filepath: %s', input_filepath)
-
-                # Now that the office document has been converted to PDF
-                # call the coresponding PDF parser in this new file
-                parse_document_page(document_page, descriptor=open(input_filepath), mimetype=u'application/pdf')
-            else:
-                raise ParserError
+    def get_pdf_filepath(self, document_version):
+        """
+        Return the path of the PDF conversion of a document version
+        """
+        if not office_converter:
+            raise ParserError('office converter not available')
 
+        try:
+            # Reuse the conversion made to count or render the pages
+            input_filepath = office_converter.get_cached_filepath(document_version.checksum)
+            if not input_filepath:
+                document_file = document_save_to_temp_dir(document_version, document_version.checksum)
+                logger.debug('document_file: %s', document_file)
+                input_filepath = office_converter.convert(document_file, mimetype=document_version.mimetype, checksum=document_version.checksum)
         except OfficeConversionError as exception:
             logger.error(exception)
             raise ParserError
 
+        if not input_filepath:
+            raise ParserError
+
+        logger.debug('office converter output: %s', input_filepath)
+        return input_filepath
+
+    def parse(self, document_page, descriptor=None):
+        logger.debug('executing')
+        input_filepath = self.get_pdf_filepath(document_page.document_version)
+
+        # Now that the office document has been converted to PDF
+        # call the coresponding PDF parser in this new file
+        parse_document_page(document_page, descriptor=open(input_filepath), mimetype=u'application/pdf')
+
+    def parse_document(self, document_version, descriptor=None):
+        logger.debug('executing')
+        input_filepath = self.get_pdf_filepath(document_version)
+        return parse_document_version(document_version, descriptor=open(input_filepath), mimetype=u'application/pdf')
+
 
 class PopplerParser(Parser):
     """
@@ -170,6 +245,40 @@ class PopplerParser(Parser):
         document_page.page_label = _(u'Text extracted from PDF')
         document_page.save()
 
+    def parse_document(self, document_version, descriptor=None):
+        logger.debug('parsing all the pages of the PDF with PopplerParser')
+
+        temp_filepath = None
+        if descriptor:
+            destination_descriptor, temp_filepath = tempfile.mkstemp(dir=TEMPORARY_DIRECTORY)
+            os.close(destination_descriptor)
+            copyfile(descriptor, temp_filepath)
+            document_file = temp_filepath
+        else:
+            document_file = document_save_to_temp_dir(document_version, document_version.checksum)
+
+        logger.debug('document_file: %s', document_file)
+
+        command = []
+        command.append(self.pdftotext_path)
+        command.append('-enc')
+        command.append('UTF-8')
+        command.append(document_file)
+        command.append('-')
+
+        try:
+            proc = subprocess.Popen(command, close_fds=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+            output, errors = proc.communicate()
+        finally:
+            if temp_filepath:
+                fs_cleanup(temp_filepath)
+
+        if proc.returncode != 0:
+            logger.error(errors)
+            raise ParserError
+
+        return split_pages(output.decode('utf-8', 'replace'))
+
 
 register_parser(mimetypes=[u'application/pdf'], parsers=[PopplerParser, SlateParser])
-register_parser(mimetypes=office_converter.CONVERTER_OFFICE_FILE_MIMETYPES, parsers=[OfficeParser])
+register_parser(mimetypes=CONVERTER_OFFICE_FILE_MIMETYPES, parsers=[OfficeParser])
@@ -1,12 +1,45 @@
 from __future__ import absolute_import
 
+import multiprocessing
+import threading
+
+from django.db import connection
+
 from common.utils import load_backend
+from job_processor.api import WorkerPool
 
-from .conf.settings import BACKEND, LANGUAGE
+from .conf.settings import (LANGUAGE, NODE_CONCURRENT_EXECUTION,
+    PAGE_CONCURRENT_EXECUTION)
 
 try:
     language_backend = load_backend(u'.'.join([u'ocr', u'lang', LANGUAGE, u'LanguageBackend']))()
 except ImportError:
     language_backend = None
 
-ocr_backend = load_backend(BACKEND)()
+worker_pool = WorkerPool(name='ocr', size=NODE_CONCURRENT_EXECUTION)
+
+# Processes doing the visual OCR of the pages for all the worker threads,
+# see get_page_pool
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+
+def get_page_pool():
+    """
+    Return the pool of page OCR processes of this process, created on first
+    use and shared by all the worker threads, or None when the pages are
+    OCRed one at a time
+    """
+    global _page_pool
+
+    if PAGE_CONCURRENT_EXECUTION <= 1:
+        return None
+
+    with _page_pool_lock:
+        if not _page_pool:
+            # The processes would inherit the database connection, close it
+            # so that it is not shared, it is reopened on the next query
+            connection.close()
+            _page_pool = multiprocessing.Pool(processes=NODE_CONCURRENT_EXECUTION * PAGE_CONCURRENT_EXECUTION)
+
+        return _page_pool
@@ -1,88 +1,108 @@
 from __future__ import absolute_import
 
-from datetime import timedelta
+from itertools import count
 import logging
 import platform
 import sys
+import threading
 import traceback
 
+from django import db
 from django.conf import settings
-from django.db.models import Q
-from django.utils.timezone import now
-
-from job_processor.api import process_job
-from lock_manager import Lock, LockError
 
 from .api import do_document_ocr
-from .conf.settings import NODE_CONCURRENT_EXECUTION, REPLICATION_DELAY
-from .literals import (QUEUEDOCUMENT_STATE_PENDING,
-    QUEUEDOCUMENT_STATE_PROCESSING, DOCUMENTQUEUE_STATE_ACTIVE,
-    QUEUEDOCUMENT_STATE_ERROR)
+from .conf.settings import LEASE_DURATION, NODE_CONCURRENT_EXECUTION
+from .literals import (QUEUEDOCUMENT_STATE_PROCESSING,
+    DOCUMENTQUEUE_STATE_ACTIVE, QUEUEDOCUMENT_STATE_ERROR, LEASE_RENEWALS)
 from .models import QueueDocument, DocumentQueue
-
-LOCK_EXPIRE = 60 * 2  # Lock expires in 2 minutes
-# TODO: Tie LOCK_EXPIRATION with hard task timeout
+from .runtime import worker_pool
 
 logger = logging.getLogger(__name__)
 
+# Rotates the queue served first on every dispatch, so that when there
+# are less free slots than active queues no queue is always left behind
+dispatch_counter = count()
+
+
+def renew_lease(queue_document_id, node_name, stop_event):
+    """
+    Renew the lease of a queue document until the stop event is set
+    """
+    try:
+        while not stop_event.wait(float(LEASE_DURATION) / LEASE_RENEWALS):
+            if not QueueDocument.objects.renew_lease(queue_document_id, node_name):
+                logger.warning('lost the lease of queue document: %s' % queue_document_id)
+                break
+    finally:
+        db.close_connection()
+
 
 def task_process_queue_document(queue_document_id):
-    lock_id = u'task_proc_queue_doc-%d' % queue_document_id
+    queue_document = QueueDocument.objects.get(pk=queue_document_id)
+
+    stop_event = threading.Event()
+    heartbeat = threading.Thread(target=renew_lease, args=(queue_document_id, queue_document.node_name, stop_event))
+    heartbeat.daemon = True
+    heartbeat.start()
     try:
-        logger.debug('trying to acquire lock: %s' % lock_id)
-        lock = Lock.acquire_lock(lock_id, LOCK_EXPIRE)
-        logger.debug('acquired lock: %s' % lock_id)
-        queue_document = QueueDocument.objects.get(pk=queue_document_id)
-        queue_document.state = QUEUEDOCUMENT_STATE_PROCESSING
-        queue_document.node_name = platform.node()
-        queue_document.save()
-        try:
-            do_document_ocr(queue_document)
-            queue_document.delete()
-        except Exception as exception:
-            queue_document.state = QUEUEDOCUMENT_STATE_ERROR
-
-            if settings.DEBUG:
-                result = []
-                type, value, tb = sys.exc_info()
-                result.append('%s: %s' % (type.__name__, value))
-                result.extend(traceback.format_tb(tb))
-                queue_document.result = '\n'.join(result)
-            else:
-                queue_document.result = exception
+        do_document_ocr(queue_document)
+        queue_document.delete()
+    except Exception as exception:
+        queue_document.state = QUEUEDOCUMENT_STATE_ERROR
+        queue_document.lease_expiration = None
 
-            queue_document.save()
+        if settings.DEBUG:
+            result = []
+            type, value, tb = sys.exc_info()
+            result.append('%s: %s' % (type.__name__, value))
+            result.extend(traceback.format_tb(tb))
+            queue_document.result = '\n'.join(result)
+        else:
+            queue_document.result = exception
 
-        lock.release()
-    except LockError:
-        logger.debug('unable to obtain lock')
-        pass
+        queue_document.save()
+    finally:
+        stop_event.set()
+        heartbeat.join()
 
 
 def task_process_document_queues():
     logger.debug('executed')
-    # TODO: reset_orphans()
-    q_pending = Q(state=QUEUEDOCUMENT_STATE_PENDING)
-    q_delayed = Q(delay=True)
-    q_delay_interval = Q(datetime_submitted__lt=now() - timedelta(seconds=REPLICATION_DELAY))
-    for document_queue in DocumentQueue.objects.filter(state=DOCUMENTQUEUE_STATE_ACTIVE):
-        current_local_processing_count = QueueDocument.objects.filter(
-            state=QUEUEDOCUMENT_STATE_PROCESSING).filter(
-            node_name=platform.node()).count()
-        if current_local_processing_count < NODE_CONCURRENT_EXECUTION:
-            try:
-                oldest_queued_document_qs = document_queue.queuedocument_set.filter(
-                    (q_pending & ~q_delayed) | (q_pending & q_delayed & q_delay_interval))
-
-                if oldest_queued_document_qs:
-                    oldest_queued_document = oldest_queued_document_qs.order_by('datetime_submitted')[0]
-                    process_job(task_process_queue_document, oldest_queued_document.pk)
-            except Exception as exception:
-                logger.error('unhandled exception: %s' % exception)
-            finally:
-                # Don't process anymore from this queryset, might be stale
+    QueueDocument.objects.reset_orphans()
+
+    node_name = platform.node()
+    current_local_processing_count = QueueDocument.objects.filter(
+        state=QUEUEDOCUMENT_STATE_PROCESSING).filter(
+        node_name=node_name).count()
+
+    free_slots = min(worker_pool.get_free_slots(), NODE_CONCURRENT_EXECUTION - current_local_processing_count)
+    if free_slots <= 0:
+        logger.debug('already processing maximum')
+        return
+
+    document_queues = list(DocumentQueue.objects.filter(state=DOCUMENTQUEUE_STATE_ACTIVE))
+    if not document_queues:
+        return
+
+    offset = next(dispatch_counter) % len(document_queues)
+    document_queues = document_queues[offset:] + document_queues[:offset]
+
+    # Claim one document from each queue in turn until the slots are full
+    # or the queues are exhausted
+    while free_slots and document_queues:
+        for document_queue in list(document_queues):
+            claimed = QueueDocument.objects.claim(node_name=node_name, count=1, document_queue=document_queue)
+            if not claimed:
+                document_queues.remove(document_queue)
+                continue
+
+            queue_document = claimed[0]
+            if worker_pool.submit(task_process_queue_document, queue_document.pk):
+                free_slots -= 1
+            else:
+                # Lost the slot, release the document for the next run
+                QueueDocument.objects.release(queue_document.pk)
+                free_slots = 0
+
+            if not free_slots:
                 break
-        else:
-            logger.debug('already processing maximum')
-    else:
-        logger.debug('nothing to process')
@@ -1,17 +1,56 @@
 from __future__ import absolute_import
 
+from datetime import timedelta
+import multiprocessing
 import os
+import shutil
+import tempfile
+import time
 
 from django.conf import settings
 from django.core.files.base import File
 from django.test import TestCase
+from django.utils.timezone import now
 
 from documents.models import Document, DocumentType
 
-from .api import do_document_ocr
+from . import api, runtime
+from .api import do_document_ocr, execute_pages_ocr
+from .exceptions import OCRError
+from .literals import (QUEUEDOCUMENT_PRIORITY_HIGH,
+    QUEUEDOCUMENT_STATE_PENDING, QUEUEDOCUMENT_STATE_PROCESSING)
 from .models import DocumentQueue, QueueDocument
+from .parsers import split_pages
 
 TEST_DOCUMENT_PATH = os.path.join(settings.BASE_DIR, 'contrib', 'sample_documents', 'title_page.png')
+# Seconds each page takes in the page pool tests
+TEST_PAGE_DURATION = 0.5
+
+
+def fake_execute_page_ocr(document_filepath):
+    """
+    Stand in for the visual OCR of a page, executed by the page pool
+    processes, return the number of pages being processed at once while
+    it runs.  Pages whose filename starts with 'error' fail and the ones
+    whose filename starts with 'crash' end the process, losing the task
+    """
+    if os.path.basename(document_filepath).startswith('error'):
+        raise ValueError('test error')
+
+    if os.path.basename(document_filepath).startswith('crash'):
+        os._exit(1)
+
+    running_filepath = document_filepath + '.running'
+    open(running_filepath, 'w').close()
+    try:
+        # Counted halfway, while the pages started at the same time run
+        time.sleep(TEST_PAGE_DURATION / 2)
+        directory = os.path.dirname(document_filepath)
+        running = len([filename for filename in os.listdir(directory) if filename.endswith('.running')])
+        time.sleep(TEST_PAGE_DURATION / 2)
+        return running
+    finally:
+        os.unlink(running_filepath)
 
 
 class DocumentSearchTestCase(TestCase):
@@ -83,3 +122,156 @@ class DocumentSearchTestCase(TestCase):
     def tearDown(self):
         self.document.delete()
         self.document_type.delete()
+
+
+class QueueDocumentClaimTestCase(TestCase):
+    def setUp(self):
+        self.default_queue = DocumentQueue.objects.get(name='default')
+        self.document_type = DocumentType.objects.create(name='test doc type')
+        self.queue_documents = []
+        for index in range(3):
+            document = Document.objects.create(document_type=self.document_type)
+            self.queue_documents.append(QueueDocument.objects.create(document_queue=self.default_queue, document=document))
+
+    def test_claim(self):
+        claimed = QueueDocument.objects.claim(node_name='node_1', count=2)
+        self.assertEqual(len(claimed), 2)
+        for queue_document in claimed:
+            self.assertEqual(queue_document.state, QUEUEDOCUMENT_STATE_PROCESSING)
+            self.assertEqual(queue_document.node_name, 'node_1')
+            self.assertTrue(queue_document.lease_expiration > now())
+
+        # Already claimed documents can't be claimed by another node
+        claimed_again = QueueDocument.objects.claim(node_name='node_2', count=3)
+        self.assertEqual(len(claimed_again), 1)
+        self.assertFalse(set(claimed) & set(claimed_again))
+
+    def test_claim_priority(self):
+        high_priority = self.queue_documents[-1]
+        high_priority.priority = QUEUEDOCUMENT_PRIORITY_HIGH
+        high_priority.save()
+
+        self.assertEqual(QueueDocument.objects.claim(node_name='node_1')[0], high_priority)
+
+    def test_renew_lease(self):
+        queue_document = QueueDocument.objects.claim(node_name='node_1')[0]
+        self.assertTrue(QueueDocument.objects.renew_lease(queue_document.pk, 'node_1'))
+        self.assertFalse(QueueDocument.objects.renew_lease(queue_document.pk, 'node_2'))
+
+    def test_reset_orphans(self):
+        claimed = QueueDocument.objects.claim(node_name='node_1', count=2)
+        QueueDocument.objects.filter(pk=claimed[0].pk).update(lease_expiration=now() - timedelta(seconds=1))
+
+        self.assertEqual(QueueDocument.objects.reset_orphans(), 1)
+        self.assertEqual(QueueDocument.objects.get(pk=claimed[0].pk).state, QUEUEDOCUMENT_STATE_PENDING)
+        self.assertEqual(QueueDocument.objects.get(pk=claimed[1].pk).state, QUEUEDOCUMENT_STATE_PROCESSING)
+
+        self.assertEqual(QueueDocument.objects.reset_orphans(node_name='node_1'), 1)
+        self.assertEqual(QueueDocument.objects.get(pk=claimed[1].pk).state, QUEUEDOCUMENT_STATE_PENDING)
+
+
+class ExecutePagesOCRTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.page_images = []
+        for key, filename in enumerate(['first', 'error', 'third']):
+            shutil.copy(TEST_DOCUMENT_PATH, os.path.join(self.directory, filename))
+            self.page_images.append((key, os.path.join(self.directory, filename)))
+
+        self.execute_page_ocr = api.execute_page_ocr
+        self.memory_budget = api.MEMORY_BUDGET
+        self.page_concurrent_execution = api.PAGE_CONCURRENT_EXECUTION
+        self.page_timeout = api.PAGE_TIMEOUT
+        api.execute_page_ocr = fake_execute_page_ocr
+        api.PAGE_CONCURRENT_EXECUTION = 2
+        # Forked after the patching, for the processes to see it
+        self.pool = multiprocessing.Pool(processes=2)
+
+    def test_page_error_isolation(self):
+        results, errors = execute_pages_ocr(self.page_images, pool=self.pool)
+        self.assertEqual(sorted(results.keys()), [0, 2])
+        self.assertEqual(errors.keys(), [1])
+        self.assertTrue(isinstance(errors[1], ValueError))
+
+    def test_page_error_isolation_without_pool(self):
+        results, errors = execute_pages_ocr(self.page_images, pool=None)
+        self.assertEqual(results, {0: 1, 2: 1})
+        self.assertEqual(errors.keys(), [1])
+
+    def test_concurrent_pages(self):
+        api.MEMORY_BUDGET = None
+        results, errors = execute_pages_ocr([self.page_images[0], self.page_images[2]], pool=self.pool)
+        self.assertEqual(results, {0: 2, 2: 2})
+
+    def test_memory_budget(self):
+        # Only one page fits in the budget at a time
+        api.MEMORY_BUDGET = api.estimate_page_memory(TEST_DOCUMENT_PATH) * 3 / 2
+        results, errors = execute_pages_ocr([self.page_images[0], self.page_images[2]], pool=self.pool)
+        self.assertEqual(results, {0: 1, 2: 1})
+        self.assertEqual(errors, {})
+
+    def test_lost_page_timeout(self):
+        api.PAGE_TIMEOUT = TEST_PAGE_DURATION * 4
+        crash_filepath = os.path.join(self.directory, 'crash')
+        shutil.copy(TEST_DOCUMENT_PATH, crash_filepath)
+
+        results, errors = execute_pages_ocr([self.page_images[0], (3, crash_filepath)], pool=self.pool)
+        self.assertEqual(results, {0: 1})
+        self.assertEqual(errors.keys(), [3])
+        self.assertTrue(isinstance(errors[3], OCRError))
+
+    def tearDown(self):
+        self.pool.terminate()
+        self.pool.join()
+        api.execute_page_ocr = self.execute_page_ocr
+        api.MEMORY_BUDGET = self.memory_budget
+        api.PAGE_CONCURRENT_EXECUTION = self.page_concurrent_execution
+        api.PAGE_TIMEOUT = self.page_timeout
+        shutil.rmtree(self.directory)
+
+
+class PagePoolTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.page_images = []
+        for key in range(2):
+            shutil.copy(TEST_DOCUMENT_PATH, os.path.join(self.directory, unicode(key)))
+            self.page_images.append((key, os.path.join(self.directory, unicode(key))))
+
+        self.page_concurrent_execution = api.PAGE_CONCURRENT_EXECUTION
+        self.page_timeout = api.PAGE_TIMEOUT
+        api.PAGE_CONCURRENT_EXECUTION = runtime.PAGE_CONCURRENT_EXECUTION = 2
+        # Pages the real OCR doesn't finish in time are reported as errors
+        # instead of hanging the test
+        api.PAGE_TIMEOUT = 60
+
+    def test_runtime_page_pool(self):
+        pool = runtime.get_page_pool()
+        self.assertTrue(pool)
+        self.assertTrue(runtime.get_page_pool() is pool)
+
+        # The real page OCR, run in the pool processes, gives the same
+        # results as when run in this process
+        results, errors = execute_pages_ocr(self.page_images, pool=pool)
+        expected_results, expected_errors = execute_pages_ocr(self.page_images, pool=None)
+        self.assertEqual(results, expected_results)
+        self.assertEqual(dict([(key, unicode(error)) for key, error in errors.items()]), dict([(key, unicode(error)) for key, error in expected_errors.items()]))
+        self.assertEqual(sorted(results.keys() + errors.keys()), [0, 1])
+
+    def tearDown(self):
+        if runtime._page_pool:
+            runtime._page_pool.terminate()
+            runtime._page_pool.join()
+            runtime._page_pool = None
+
+        api.PAGE_CONCURRENT_EXECUTION = runtime.PAGE_CONCURRENT_EXECUTION = self.page_concurrent_execution
+        api.PAGE_TIMEOUT = self.page_timeout
+        shutil.rmtree(self.directory)
+
+
+class SplitPagesTestCase(TestCase):
+    def test_split_pages(self):
+        self.assertEqual(split_pages(u'first\x0c\n \x0cthird\x0c'), [u'first', u'', u'third'])
+
+    def test_split_pages_without_trailing_form_feed(self):
+        self.assertEqual(split_pages(u'first\x0csecond'), [u'first', u'second'])
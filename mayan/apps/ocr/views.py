@@ -16,7 +16,8 @@ from permissions.models import Permission
 from .api import clean_pages
 from .exceptions import AlreadyQueued, ReQueueError
 from .literals import (QUEUEDOCUMENT_STATE_PROCESSING,
-    DOCUMENTQUEUE_STATE_STOPPED, DOCUMENTQUEUE_STATE_ACTIVE)
+    DOCUMENTQUEUE_STATE_STOPPED, DOCUMENTQUEUE_STATE_ACTIVE,
+    QUEUEDOCUMENT_PRIORITY_HIGH)
 from .models import DocumentQueue, QueueDocument
 from .permissions import (PERMISSION_OCR_DOCUMENT,
     PERMISSION_OCR_DOCUMENT_DELETE, PERMISSION_OCR_QUEUE_ENABLE_DISABLE,
@@ -42,6 +43,7 @@ def queue_document_list(request, queue_name='default'):
             {'name': 'submitted', 'attribute': encapsulate(lambda x: unicode(x.datetime_submitted).split('.')[0]), 'keep_together':True},
             {'name': 'delay', 'attribute': 'delay'},
             {'name': 'state', 'attribute': encapsulate(lambda x: x.get_state_display())},
+            {'name': 'priority', 'attribute': encapsulate(lambda x: x.get_priority_display())},
             {'name': 'node', 'attribute': 'node_name'},
             {'name': 'result', 'attribute': 'result'},
         ],
@@ -137,7 +139,9 @@ def submit_document_to_queue(request, document, post_submit_redirect=None):
     """
 
     try:
-        document_queue = DocumentQueue.objects.queue_document(document)
+        # Documents submitted by users go ahead of the automatically
+        # queued ones
+        document_queue = DocumentQueue.objects.queue_document(document, priority=QUEUEDOCUMENT_PRIORITY_HIGH)
         messages.success(request, _(u'Document: %(document)s was added to the OCR queue: %(queue)s.') % {
             'document': document, 'queue': document_queue.label}
         )
@@ -0,0 +1,85 @@
+"""
+Visual OCR of the page images, executed by the page OCR processes.  Doesn't
+import the runtime or the database models, so that the processes don't load
+them to unpickle the tasks
+"""
+from __future__ import absolute_import
+
+import logging
+import os
+import tempfile
+
+import sh
+
+from common.conf.settings import TEMPORARY_DIRECTORY
+from common.utils import fs_cleanup, load_backend
+from converter.api import convert
+
+from .conf.settings import BACKEND, LANGUAGE, UNPAPER_PATH
+from .exceptions import UnpaperError
+from .literals import (DEFAULT_OCR_FILE_EXTENSION, DEFAULT_OCR_FILE_FORMAT,
+    UNPAPER_FILE_FORMAT)
+
+logger = logging.getLogger(__name__)
+
+ocr_backend = load_backend(BACKEND)()
+
+try:
+    UNPAPER = sh.Command(UNPAPER_PATH).bake(overwrite=True, no_multi_pages=True)
+except sh.CommandNotFound:
+    logger.debug('unpaper not found')
+    UNPAPER = None
+
+
+def execute_page_ocr(document_filepath):
+    """
+    Do the visual OCR of a single page image and return the raw text.
+    Executed by the page OCR worker processes, must not access the database
+    """
+    unpaper_input = convert(document_filepath, file_format=UNPAPER_FILE_FORMAT)
+
+    logger.debug('unpaper_input: %s' % unpaper_input)
+
+    unpaper_output = execute_unpaper(input_filepath=unpaper_input)
+
+    logger.debug('unpaper_output: %s' % unpaper_output)
+
+    # Convert to TIFF
+    pre_ocr_filepath = convert(input_filepath=unpaper_output, file_format=DEFAULT_OCR_FILE_FORMAT)
+
+    logger.debug('pre_ocr_filepath: %s' % pre_ocr_filepath)
+
+    # Tesseract needs an explicit file extension
+    pre_ocr_filepath_w_ext = os.extsep.join([pre_ocr_filepath, DEFAULT_OCR_FILE_EXTENSION])
+
+    logger.debug('pre_ocr_filepath_w_ext: %s' % pre_ocr_filepath_w_ext)
+
+    os.rename(pre_ocr_filepath, pre_ocr_filepath_w_ext)
+    try:
+        return ocr_backend.execute(pre_ocr_filepath_w_ext, LANGUAGE)
+    finally:
+        fs_cleanup(pre_ocr_filepath_w_ext)
+        fs_cleanup(unpaper_input)
+        fs_cleanup(unpaper_output)
+
+
+
+def execute_unpaper(input_filepath, output_filepath=None):
+    """
+    Executes the program unpaper using subprocess's Popen
+    """
+    if UNPAPER:
+        if not output_filepath:
+            fd, output_filepath = tempfile.mkstemp(dir=TEMPORARY_DIRECTORY)
+
+        try:
+            UNPAPER(input_filepath, output_filepath)
+        except sh.ErrorReturnCode as exception:
+            logger.error(exception)
+            raise UnpaperError(exception.stderr)
+        else:
+            return output_filepath
+        finally:
+            os.close(fd)
+    else:
+        return input_filepath
@@ -1,16 +1,23 @@
 from __future__ import absolute_import
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Group, User
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.signals import post_save
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+    pre_delete)
+from django.dispatch import receiver
+from django.utils.translation import ugettext_lazy as _
 
 from navigation.api import register_links, register_multi_item_links
 from project_setup.api import register_setup
+from statistics.classes import StatisticNamespace
+
+from south.signals import post_migrate
 
 from .conf.settings import DEFAULT_ROLES
-from .models import Role
+from .models import Membership, Role, RoleMember
 from .links import (role_list, role_create, role_edit, role_members, role_permissions,
     role_delete, permission_grant, permission_revoke)
+from .statistics import PermissionResolverStatistics
 
 register_links(Role, [role_edit, role_delete, role_permissions, role_members])
 register_links([Role, 'role_list', 'role_create'], [role_list, role_create], menu_name='secondary_menu')
@@ -36,4 +43,60 @@ def user_post_save(sender, instance, **kwargs):
 
 post_save.connect(user_post_save, sender=User)
 
+
+@receiver(post_save, dispatch_uid='role_member_membership_update', sender=RoleMember)
+@receiver(post_delete, dispatch_uid='role_member_membership_delete', sender=RoleMember)
+def role_member_membership_update(sender, instance, **kwargs):
+    member = instance.member_object
+    if member:
+        Membership.objects.update_member(member)
+        if isinstance(member, Group):
+            for user in member.user_set.all():
+                Membership.objects.update_member(user)
+
+
+@receiver(m2m_changed, dispatch_uid='user_groups_membership_update', sender=User.groups.through)
+def user_groups_membership_update(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # The users of the group are unknown once cleared
+        instance._membership_users = list(instance.user_set.all())
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            users = [instance]
+        elif action == 'post_clear':
+            users = getattr(instance, '_membership_users', [])
+        else:
+            users = User.objects.filter(pk__in=pk_set)
+
+        for user in users:
+            Membership.objects.update_member(user)
+
+
+@receiver(pre_delete, dispatch_uid='group_membership_delete', sender=Group)
+def group_membership_delete(sender, instance, **kwargs):
+    instance._membership_users = list(instance.user_set.all())
+
+
+@receiver(post_delete, dispatch_uid='group_membership_post_delete', sender=Group)
+def group_membership_post_delete(sender, instance, **kwargs):
+    Membership.objects.delete_for(instance)
+    for user in getattr(instance, '_membership_users', []):
+        Membership.objects.update_member(user)
+
+
+@receiver(post_delete, dispatch_uid='user_membership_delete', sender=User)
+@receiver(post_delete, dispatch_uid='role_membership_delete', sender=Role)
+def membership_delete(sender, instance, **kwargs):
+    Membership.objects.delete_for(instance)
+
+
+@receiver(post_migrate, dispatch_uid='membership_rebuild')
+def membership_rebuild(sender, **kwargs):
+    if kwargs['app'] == 'permissions':
+        Membership.objects.rebuild()
+
+
 register_setup(role_list)
+
+namespace = StatisticNamespace(name='permissions', label=_(u'Permissions'))
+namespace.add_statistic(PermissionResolverStatistics(name='permission_resolver', label=_(u'Permission resolution')))
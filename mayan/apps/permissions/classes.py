@@ -0,0 +1,127 @@
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+
+from common.models import AnonymousUserSingleton
+
+from .conf.settings import RESOLVER_CACHE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class PermissionResolver(object):
+    """
+    Resolves the permission and access checks of a single actor.  The
+    groups, roles and permissions of the actor are loaded once and every
+    other check is remembered, so repeated checks during a request are
+    answered from memory.  Resolvers only exist between calls to begin
+    and end, which the middleware does for every request
+    """
+    _local = threading.local()
+    # Process wide counters
+    total_hits = 0
+    total_misses = 0
+
+    @classmethod
+    def begin(cls):
+        cls._local.resolvers = {}
+
+    @classmethod
+    def end(cls):
+        resolvers = getattr(cls._local, 'resolvers', None) or {}
+        cls._local.resolvers = None
+        for resolver in resolvers.values():
+            logger.debug('resolver: %s, hits: %d, misses: %d' % (resolver.actor, resolver.hits, resolver.misses))
+
+        return resolvers.values()
+
+    @classmethod
+    def get_for(cls, actor):
+        """
+        Return the resolver of an actor for the current request or None
+        if there is no request scope
+        """
+        resolvers = getattr(cls._local, 'resolvers', None)
+        if resolvers is None:
+            return None
+
+        actor = AnonymousUserSingleton.objects.passthru_check(actor)
+        key = (ContentType.objects.get_for_model(actor).pk, actor.pk)
+        try:
+            return resolvers[key]
+        except KeyError:
+            resolver = resolvers[key] = cls(actor)
+            return resolver
+
+    @classmethod
+    def invalidate(cls, actor):
+        """
+        Forget the cached permissions of an actor after its groups, roles
+        or permissions change
+        """
+        if RESOLVER_CACHE_TIMEOUT:
+            cache.delete(cls(actor).get_cache_key())
+
+    def __init__(self, actor):
+        self.actor = AnonymousUserSingleton.objects.passthru_check(actor)
+        self.hits = 0
+        self.misses = 0
+        self._permission_ids = None
+        self._results = {}
+
+    def _record(self, hit):
+        if hit:
+            self.hits += 1
+            PermissionResolver.total_hits += 1
+        else:
+            self.misses += 1
+            PermissionResolver.total_misses += 1
+
+    def get_cache_key(self):
+        return u'permissions.resolver.%s.%s' % (ContentType.objects.get_for_model(self.actor).pk, self.actor.pk)
+
+    def get_permission_ids(self):
+        """
+        Return the ids of the stored permissions held by the actor or by
+        any of its groups and roles
+        """
+        if self._permission_ids is not None:
+            self._record(hit=True)
+            return self._permission_ids
+
+        if RESOLVER_CACHE_TIMEOUT:
+            self._permission_ids = cache.get(self.get_cache_key())
+
+        if self._permission_ids is None:
+            # Imported here, the models import this module
+            from .models import Membership, PermissionHolder
+
+            self._record(hit=False)
+            self._permission_ids = frozenset(PermissionHolder.objects.filter(Membership.objects.get_holder_query(self.actor)).values_list('permission', flat=True))
+            if RESOLVER_CACHE_TIMEOUT:
+                cache.set(self.get_cache_key(), self._permission_ids, RESOLVER_CACHE_TIMEOUT)
+        else:
+            self._record(hit=True)
+
+        return self._permission_ids
+
+    def has_permission(self, stored_permission):
+        return stored_permission.pk in self.get_permission_ids()
+
+    def resolve(self, key, func):
+        """
+        Return the remembered result of a check or call func to do it
+        """
+        try:
+            result = self._results[key]
+        except KeyError:
+            self._record(hit=False)
+            result = self._results[key] = func()
+        else:
+            self._record(hit=True)
+
+        return result
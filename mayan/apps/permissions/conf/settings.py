@@ -8,5 +8,6 @@ register_settings(
     module=u'permissions.conf.settings',
     settings=[
         {'name': u'DEFAULT_ROLES', 'global_name': u'ROLES_DEFAULT_ROLES', 'default': [], 'description': _('A list of existing roles that are automatically assigned to newly created users')},
+        {'name': u'RESOLVER_CACHE_TIMEOUT', 'global_name': u'ROLES_RESOLVER_CACHE_TIMEOUT', 'default': 0, 'description': _('Number of seconds the permissions of a user are kept in the cache between requests, changes to roles and groups can take this long to apply.  0 disables the cache.')},
     ]
 )
@@ -1,10 +1,14 @@
 import logging
 
-from django.db import models
+from django.contrib.auth.models import Group, User
 from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models import Q
 
 from common.models import AnonymousUserSingleton
 
+from .classes import PermissionResolver
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,3 +26,84 @@ class StoredPermissionManager(models.Manager):
     def get_for_holder(self, holder):
         ct = ContentType.objects.get_for_model(holder)
         return self.model.objects.filter(permissionholder__holder_type=ct).filter(permissionholder__holder_id=holder.pk)
+
+
+class MembershipManager(models.Manager):
+    def get_holders(self, member_obj):
+        """
+        Return the groups and roles a member_obj belongs to, directly or
+        through one of its groups, read from the membership relations
+        """
+        member_obj = AnonymousUserSingleton.objects.passthru_check(member_obj)
+        # Imported here, the Role models import this module
+        from .models import RoleMember
+
+        if isinstance(member_obj, User):
+            members = [member_obj] + list(member_obj.groups.all())
+        else:
+            members = [member_obj]
+
+        holders = members[1:]
+        for member in members:
+            holders.extend(RoleMember.objects.get_roles_for_member(member))
+
+        return set(holders)
+
+    def update_member(self, member_obj):
+        """
+        Recalculate the stored memberships of a member_obj
+        """
+        member_obj = AnonymousUserSingleton.objects.passthru_check(member_obj)
+        member_type = ContentType.objects.get_for_model(member_obj)
+        PermissionResolver.invalidate(member_obj)
+
+        with transaction.atomic():
+            self.model.objects.filter(member_type=member_type, member_id=member_obj.pk).delete()
+            self.model.objects.bulk_create([
+                self.model(
+                    member_type=member_type, member_id=member_obj.pk,
+                    holder_type=ContentType.objects.get_for_model(holder), holder_id=holder.pk
+                ) for holder in self.get_holders(member_obj)
+            ])
+
+    def delete_for(self, obj):
+        """
+        Delete the memberships of an object as a member and as a holder
+        """
+        content_type = ContentType.objects.get_for_model(obj)
+        self.model.objects.filter(Q(member_type=content_type, member_id=obj.pk) | Q(holder_type=content_type, holder_id=obj.pk)).delete()
+
+    def rebuild(self):
+        from .models import RoleMember
+
+        self.model.objects.all().delete()
+        for user in User.objects.all():
+            self.update_member(user)
+
+        for group in Group.objects.all():
+            self.update_member(group)
+
+        for role_member in RoleMember.objects.exclude(member_type__in=[ContentType.objects.get_for_model(User), ContentType.objects.get_for_model(Group)]):
+            if role_member.member_object:
+                self.update_member(role_member.member_object)
+
+    def get_holder_query(self, member_obj):
+        """
+        Return a Q object matching the holder fields of an access or
+        permission entry to the member_obj itself or to any of the
+        groups and roles it belongs to, in a single query
+        """
+        member_obj = AnonymousUserSingleton.objects.passthru_check(member_obj)
+        member_type = ContentType.objects.get_for_model(member_obj)
+        memberships = self.model.objects.filter(member_type=member_type, member_id=member_obj.pk)
+
+        query = Q(holder_type=member_type, holder_id=member_obj.pk)
+        for holder_type in self.get_holder_types():
+            query |= Q(holder_type=holder_type, holder_id__in=memberships.filter(holder_type=holder_type).values('holder_id'))
+
+        return query
+
+    def get_holder_types(self):
+        from .models import Role
+
+        return [ContentType.objects.get_for_model(Group), ContentType.objects.get_for_model(Role)]
@@ -0,0 +1,16 @@
+from __future__ import absolute_import
+
+from ..classes import PermissionResolver
+
+
+class PermissionResolverMiddleware(object):
+    """
+    Share the permission and access checks of a request between the
+    views, the navigation and the REST API filters
+    """
+    def process_request(self, request):
+        PermissionResolver.begin()
+
+    def process_response(self, request, response):
+        PermissionResolver.end()
+        return response
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'Membership'
+        db.create_table(u'permissions_membership', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('member_type', self.gf('django.db.models.fields.related.ForeignKey')(related_name='membership_member', to=orm['contenttypes.ContentType'])),
+            ('member_id', self.gf('django.db.models.fields.PositiveIntegerField')()),
+            ('holder_type', self.gf('django.db.models.fields.related.ForeignKey')(related_name='membership_holder', to=orm['contenttypes.ContentType'])),
+            ('holder_id', self.gf('django.db.models.fields.PositiveIntegerField')()),
+        ))
+        db.send_create_signal(u'permissions', ['Membership'])
+
+        # Adding index on 'Membership', fields ['member_type', 'member_id']
+        db.create_index(u'permissions_membership', ['member_type_id', 'member_id'])
+
+    def backwards(self, orm):
+        # Removing index on 'Membership', fields ['member_type', 'member_id']
+        db.delete_index(u'permissions_membership', ['member_type_id', 'member_id'])
+
+        # Deleting model 'Membership'
+        db.delete_table(u'permissions_membership')
+
+    models = {
+        'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        'permissions.membership': {
+            'Meta': {'object_name': 'Membership', 'index_together': "[('member_type', 'member_id')]"},
+            'holder_id': ('django.db.models.fields.PositiveIntegerField', [], {}),
+            'holder_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'membership_holder'", 'to': "orm['contenttypes.ContentType']"}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'member_id': ('django.db.models.fields.PositiveIntegerField', [], {}),
+            'member_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'membership_member'", 'to': "orm['contenttypes.ContentType']"})
+        },
+        'permissions.permissionholder': {
+            'Meta': {'object_name': 'PermissionHolder'},
+            'holder_id': ('django.db.models.fields.PositiveIntegerField', [], {}),
+            'holder_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'permission_holder'", 'to': "orm['contenttypes.ContentType']"}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'permission': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['permissions.StoredPermission']"})
+        },
+        'permissions.role': {
+            'Meta': {'ordering': "('label',)", 'object_name': 'Role'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'label': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '64'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '64'})
+        },
+        'permissions.rolemember': {
+            'Meta': {'object_name': 'RoleMember'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'member_id': ('django.db.models.fields.PositiveIntegerField', [], {}),
+            'member_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'role_member'", 'to': "orm['contenttypes.ContentType']"}),
+            'role': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['permissions.Role']"})
+        },
+        'permissions.storedpermission': {
+            'Meta': {'ordering': "('namespace',)", 'unique_together': "(('namespace', 'name'),)", 'object_name': 'StoredPermission'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'namespace': ('django.db.models.fields.CharField', [], {'max_length': '64'})
+        }
+    }
+
+    complete_apps = ['permissions']
@@ -12,7 +12,9 @@ from django.utils.translation import ugettext_lazy as _
 
 from common.models import AnonymousUserSingleton
 
-from .managers import (RoleMemberManager, StoredPermissionManager)
+from .classes import PermissionResolver
+from .managers import (MembershipManager, RoleMemberManager,
+    StoredPermissionManager)
 
 logger = logging.getLogger(__name__)
 
@@ -156,29 +158,18 @@ class StoredPermission(models.Model):
             if actor.is_superuser or actor.is_staff:
                 return True
 
-        # Request is one of the permission's holders?
-        if actor in self.get_holders():
-            return True
+        resolver = PermissionResolver.get_for(actor)
+        if resolver:
+            return resolver.has_permission(self)
 
-        # If not check if the requesters memberships objects is one of
-        # the permission's holder?
-        roles = RoleMember.objects.get_roles_for_member(actor)
-
-        if isinstance(actor, User):
-            groups = actor.groups.all()
-        else:
-            groups = []
-
-        for membership in list(set(roles) | set(groups)):
-            if self.requester_has_this(membership):
-                return True
-
-        logger.debug('Fallthru')
-        return False
+        # Is the requester or one of its groups or roles one of the
+        # permission's holders?
+        return self.permissionholder_set.filter(Membership.objects.get_holder_query(actor)).exists()
 
     def grant_to(self, actor):
         actor = AnonymousUserSingleton.objects.passthru_check(actor)
         permission_holder, created = PermissionHolder.objects.get_or_create(permission=self, holder_type=ContentType.objects.get_for_model(actor), holder_id=actor.pk)
+        PermissionResolver.invalidate(actor)
         return created
 
     def revoke_from(self, actor):
@@ -189,6 +180,7 @@ class StoredPermission(models.Model):
         except PermissionHolder.DoesNotExist:
             return False
         else:
+            PermissionResolver.invalidate(actor)
             return True
 
 
@@ -265,3 +257,28 @@ class RoleMember(models.Model):
 
     def __unicode__(self):
         return unicode(self.member_object)
+
+
+class Membership(models.Model):
+    """
+    Flattened list of the groups and roles a member (user, group or
+    anonymous user) belongs to, directly or through one of its groups.
+    Kept updated on every role member and group change so that access
+    checks don't have to walk the membership relations
+    """
+    member_type = models.ForeignKey(ContentType, related_name='membership_member')
+    member_id = models.PositiveIntegerField()
+    member_object = generic.GenericForeignKey(ct_field='member_type', fk_field='member_id')
+    holder_type = models.ForeignKey(ContentType, related_name='membership_holder')
+    holder_id = models.PositiveIntegerField()
+    holder_object = generic.GenericForeignKey(ct_field='holder_type', fk_field='holder_id')
+
+    objects = MembershipManager()
+
+    class Meta:
+        index_together = [('member_type', 'member_id')]
+        verbose_name = _(u'membership')
+        verbose_name_plural = _(u'memberships')
+
+    def __unicode__(self):
+        return u'%s: %s' % (self.member_object, self.holder_object)
@@ -0,0 +1,21 @@
+from __future__ import absolute_import
+
+from django.utils.translation import ugettext as _
+
+from statistics.classes import Statistic
+
+from .classes import PermissionResolver
+
+
+class PermissionResolverStatistics(Statistic):
+    def get_results(self):
+        checks = PermissionResolver.total_hits + PermissionResolver.total_misses
+
+        return [
+            _(u'Permission checks: %d') % checks,
+            _(u'Answered from memory: %(hits)d, hit ratio: %(ratio).2f%%') % {
+                'hits': PermissionResolver.total_hits,
+                'ratio': PermissionResolver.total_hits * 100.0 / checks if checks else 0,
+            },
+            _(u'Database queries: %d') % PermissionResolver.total_misses,
+        ]
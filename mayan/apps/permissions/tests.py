@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+
+from django.contrib.auth.models import Group, User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+
+from .models import Membership, Role
+
+TEST_USER_USERNAME = 'test_user'
+TEST_USER_PASSWORD = 'test_user_password'
+
+
+class MembershipTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username=TEST_USER_USERNAME, password=TEST_USER_PASSWORD)
+        self.group = Group.objects.create(name='test group')
+        self.role = Role.objects.create(name='test_role', label='test role')
+
+    def _get_holders(self, member):
+        return set(membership.holder_object for membership in Membership.objects.filter(member_type=ContentType.objects.get_for_model(member), member_id=member.pk))
+
+    def test_group_membership(self):
+        self.assertEqual(self._get_holders(self.user), set())
+
+        self.user.groups.add(self.group)
+        self.assertEqual(self._get_holders(self.user), set([self.group]))
+
+        self.user.groups.remove(self.group)
+        self.assertEqual(self._get_holders(self.user), set())
+
+    def test_group_members_cleared(self):
+        self.user.groups.add(self.group)
+        self.group.user_set.clear()
+        self.assertEqual(self._get_holders(self.user), set())
+
+    def test_role_membership(self):
+        self.role.add_member(self.user)
+        self.assertEqual(self._get_holders(self.user), set([self.role]))
+
+        self.role.remove_member(self.user)
+        self.assertEqual(self._get_holders(self.user), set())
+
+    def test_role_membership_through_group(self):
+        self.user.groups.add(self.group)
+        self.role.add_member(self.group)
+        self.assertEqual(self._get_holders(self.group), set([self.role]))
+        self.assertEqual(self._get_holders(self.user), set([self.group, self.role]))
+
+        self.role.remove_member(self.group)
+        self.assertEqual(self._get_holders(self.user), set([self.group]))
+
+        # Group added to the role before the user joins it
+        self.role.add_member(self.group)
+        other_user = User.objects.create_user(username='other_user', password=TEST_USER_PASSWORD)
+        other_user.groups.add(self.group)
+        self.assertEqual(self._get_holders(other_user), set([self.group, self.role]))
+
+    def test_group_deleted(self):
+        self.user.groups.add(self.group)
+        self.role.add_member(self.group)
+        group_pk = self.group.pk
+        self.group.delete()
+
+        self.assertEqual(self._get_holders(self.user), set())
+        self.assertFalse(Membership.objects.filter(member_type=ContentType.objects.get_for_model(Group), member_id=group_pk).exists())
+
+    def test_role_deleted(self):
+        self.role.add_member(self.user)
+        self.role.delete()
+
+        self.assertFalse(Membership.objects.filter(holder_type=ContentType.objects.get_for_model(Role)).exists())
+
+    def test_user_deleted(self):
+        self.user.groups.add(self.group)
+        user_pk = self.user.pk
+        self.user.delete()
+
+        self.assertFalse(Membership.objects.filter(member_type=ContentType.objects.get_for_model(User), member_id=user_pk).exists())
+
+    def test_rebuild(self):
+        self.user.groups.add(self.group)
+        self.role.add_member(self.group)
+        memberships = sorted(Membership.objects.values_list('member_type', 'member_id', 'holder_type', 'holder_id'))
+
+        Membership.objects.rebuild()
+        self.assertEqual(sorted(Membership.objects.values_list('member_type', 'member_id', 'holder_type', 'holder_id')), memberships)
@@ -1 +1,5 @@
 SHUTDOWN_COMMANDS = ['syncdb', 'migrate', 'schemamigration', 'datamigration', 'collectstatic', 'shell', 'shell_plus', 'test', 'initialsetup']
+# Scripts running management commands, of those only the development
+# servers are long running processes
+MANAGEMENT_SCRIPTS = ['manage.py', 'mayan-edms.py', 'mayan-edms', 'django-admin.py', 'django-admin']
+SERVER_COMMANDS = ['runserver', 'runserver_plus']
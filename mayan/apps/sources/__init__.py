@@ -1,5 +1,9 @@
 from __future__ import absolute_import
 
+import os
+import sys
+
+from django.db import DatabaseError
 from django.utils.translation import ugettext_lazy as _
 
 from common.utils import encapsulate
@@ -7,6 +11,7 @@ from documents.models import Document
 from navigation.api import register_links, register_model_list_columns
 from project_setup.api import register_setup
 from rest_api.classes import APIEndPoint
+from scheduler.literals import MANAGEMENT_SCRIPTS, SERVER_COMMANDS
 
 from .classes import StagingFile
 from .links import (document_create_multiple, document_create_siblings,
@@ -16,6 +21,7 @@ from .links import (document_create_multiple, document_create_siblings,
     setup_source_transformation_list, setup_source_transformation_create,
     setup_source_transformation_edit, setup_source_transformation_delete,
     upload_version)
+from .literals import STAGING_FILE_THUMBNAIL_SIZE
 from .models import (WebForm, StagingFolder, SourceTransformation,
     WatchFolder)
 from .urls import api_urls
@@ -48,7 +54,7 @@ source_views = ['setup_web_form_list', 'setup_staging_folder_list', 'setup_watch
 register_model_list_columns(StagingFile, [
     {
         'name': _(u'thumbnail'), 'attribute':
-        encapsulate(lambda x: staging_file_thumbnail(x, gallery_name='staging_list', title=x.filename, size='100'))
+        encapsulate(lambda x: staging_file_thumbnail(x, gallery_name='staging_list', title=x.filename, size=STAGING_FILE_THUMBNAIL_SIZE))
     },
 ])
 
@@ -60,3 +66,20 @@ register_links(Document, [document_create_siblings])
 endpoint = APIEndPoint('sources')
 endpoint.register_urls(api_urls)
 endpoint.add_endpoint('stagingfolder-list', _(u'Returns a list of all the staging folders and the files they contain.'))
+
+
+def start_watch_folders():
+    # Only watched by the processes serving requests, not by the ones
+    # running management commands such as bulk uploads or index rebuilds
+    argv = getattr(sys, 'argv', None) or ['']
+    if os.path.basename(argv[0]) in MANAGEMENT_SCRIPTS and not any([command in argv for command in SERVER_COMMANDS]):
+        return
+
+    try:
+        for watch_folder in WatchFolder.objects.filter(enabled=True):
+            watch_folder.schedule()
+    except DatabaseError:
+        pass
+
+
+start_watch_folders()
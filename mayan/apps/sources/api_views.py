@@ -1,19 +1,25 @@
 from __future__ import absolute_import
 
+from json import loads
+
 from django.shortcuts import get_object_or_404
 
 from converter.exceptions import UnkownConvertError, UnknownFileFormat
-from converter.literals import (DEFAULT_PAGE_NUMBER,
-                                DEFAULT_ROTATION, DEFAULT_ZOOM_LEVEL)
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
-from documents.conf.settings import (DISPLAY_SIZE, ZOOM_MAX_LEVEL,
-                                     ZOOM_MIN_LEVEL)
+from documents.models import DocumentType
+from documents.permissions import PERMISSION_DOCUMENT_CREATE
+from metadata.api import convert_dict_to_dict_list
+from rest_api.permissions import MayanPermission
 
-from .models import StagingFolder
+from .literals import DEFAULT_BATCH_SIZE
+from .models import OutOfProcess, StagingFolder
 from .serializers import (StagingFolderFileSerializer, StagingFolderSerializer,
                           StagingSourceFileImageSerializer)
+from .utils import get_preview_arguments
 
 
 class APIStagingSourceFileView(generics.GenericAPIView):
@@ -50,6 +56,7 @@ class APIStagingSourceFileImageView(generics.GenericAPIView):
     size -- 'x' seprated width and height of the desired image representation.
     page -- Page number of the staging file to be imaged.
     zoom -- Zoom level of the image to be generated, numeric value only.
+    as_base64 -- Return the image itself encoded as a data URI instead of its URL.
     """
 
     serializer_class = StagingSourceFileImageSerializer
@@ -57,30 +64,77 @@ class APIStagingSourceFileImageView(generics.GenericAPIView):
     def get(self, request, staging_folder_pk, encoded_filename):
         staging_folder = get_object_or_404(StagingFolder, pk=staging_folder_pk)
         staging_file = staging_folder.get_file(encoded_filename=encoded_filename)
-
-        size = request.GET.get('size', DISPLAY_SIZE)
-
-        page = int(request.GET.get('page', DEFAULT_PAGE_NUMBER))
-
-        zoom = int(request.GET.get('zoom', DEFAULT_ZOOM_LEVEL))
-
-        if request.GET.get('as_base64', False):
-            base64_version = True
-
-        if zoom < ZOOM_MIN_LEVEL:
-            zoom = ZOOM_MIN_LEVEL
-
-        if zoom > ZOOM_MAX_LEVEL:
-            zoom = ZOOM_MAX_LEVEL
-
-        rotation = int(request.GET.get('rotation', DEFAULT_ROTATION)) % 360
+        preview_arguments = get_preview_arguments(request.GET)
 
         try:
+            if request.GET.get('as_base64', False):
+                data = staging_file.get_image(as_base64=True, **preview_arguments)
+            else:
+                # Rendered here, if not rendered already in the background,
+                # so that conversion errors are reported to the caller
+                staging_file.get_preview(**preview_arguments)
+                data = request.build_absolute_uri(staging_file.get_preview_url(**preview_arguments))
+
             return Response({
                 'status': 'success',
-                'data': staging_file.get_image(size=size, page=page, zoom=zoom, rotation=rotation, as_base64=True)
+                'data': data
             })
         except UnknownFileFormat as exception:
             return Response({'status': 'error', 'detail': 'unknown_file_format', 'message': unicode(exception)})
         except UnkownConvertError as exception:
             return Response({'status': 'error', 'detail': 'converter_error', 'message': unicode(exception)})
+
+
+class APIStagingSourceFileListView(generics.ListAPIView):
+    """
+    Returns a paginated list of the files in the selected staging folder.
+    """
+
+    serializer_class = StagingFolderFileSerializer
+
+    def get_queryset(self):
+        staging_folder = get_object_or_404(StagingFolder, pk=self.kwargs['staging_folder_pk'])
+        try:
+            return list(staging_folder.get_files())
+        except Exception as exception:
+            raise APIException(unicode(exception))
+
+
+class APIBatchUploadView(generics.GenericAPIView):
+    """
+    Create a new document for each of the uploaded files.
+    file -- One or more files, each one becomes a new document.
+    document_type -- ID of the document type of the new documents.
+    description -- Description of the new documents.
+    metadata -- JSON dictionary of metadata type names and values to apply to the new documents.
+    """
+
+    permission_classes = (MayanPermission,)
+    mayan_view_permissions = {'POST': [PERMISSION_DOCUMENT_CREATE]}
+
+    def post(self, request):
+        file_objects = request.FILES.getlist('file')
+        if not file_objects:
+            return Response({'file': 'No files were uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.DATA.get('document_type'):
+            document_type = get_object_or_404(DocumentType, pk=request.DATA['document_type'])
+        else:
+            document_type = None
+
+        if request.DATA.get('metadata'):
+            try:
+                metadata_dict_list = convert_dict_to_dict_list(loads(request.DATA['metadata']))
+            except ValueError as exception:
+                return Response({'metadata': unicode(exception)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            metadata_dict_list = None
+
+        source = OutOfProcess()
+        documents = []
+        for index in range(0, len(file_objects), DEFAULT_BATCH_SIZE):
+            documents.extend(source.upload_batch(file_objects[index:index + DEFAULT_BATCH_SIZE], document_type=document_type, metadata_dict_list=metadata_dict_list, user=request.user, description=request.DATA.get('description')))
+
+        return Response({
+            'documents': [reverse('document-detail', args=[document.pk], request=request) for document in documents]
+        }, status=status.HTTP_201_CREATED)
@@ -1,13 +1,59 @@
 from __future__ import absolute_import
 
 import base64
+import hashlib
+import logging
 import os
+import threading
+import time
 import urllib
+import uuid
 
 from django.core.files import File
+from django.core.urlresolvers import reverse
+from django.utils.encoding import smart_str
+from django.utils.http import urlencode
 
 from converter.api import convert
-from mimetype.api import get_mimetype
+from converter.literals import (DEFAULT_FILE_FORMAT_MIMETYPE,
+                                DEFAULT_PAGE_NUMBER, DEFAULT_ROTATION,
+                                DEFAULT_ZOOM_LEVEL)
+
+from .runtime import staging_preview_cache, staging_preview_pool
+
+logger = logging.getLogger(__name__)
+
+# A listing is not reused when the folder changed less than this amount of
+# seconds before it was read, file systems with a coarse modification time
+# resolution could record a later change with the same time
+LISTING_SETTLE_TIME = 2
+
+
+class StagingFolderListing(object):
+    """
+    Sorted names of the files of folders, reused while the modification
+    time of a folder doesn't change, which is the case until a file is
+    added, removed or renamed
+    """
+    _listings = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_filenames(cls, path):
+        mtime = os.stat(path).st_mtime
+        with cls._lock:
+            listing = cls._listings.get(path)
+
+        if listing and listing[0] == mtime:
+            return listing[1]
+
+        filenames = sorted([os.path.normcase(f) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))])
+
+        if time.time() - mtime > LISTING_SETTLE_TIME:
+            with cls._lock:
+                cls._listings[path] = (mtime, filenames)
+
+        return filenames
 
 
 class StagingFile(object):
@@ -33,18 +79,82 @@ class StagingFile(object):
     def get_full_path(self):
         return os.path.join(self.staging_folder.folder_path, self.filename)
 
+    def get_signature(self):
+        """
+        Return a value that changes when the file is replaced or modified
+        """
+        stat = os.stat(self.get_full_path())
+        return u'%d-%d' % (stat.st_size, int(stat.st_mtime))
+
+    def get_preview_key(self, size, page, zoom, rotation, signature=None):
+        return hashlib.sha256('\0'.join([smart_str(part) for part in [
+            self.staging_folder.pk, self.filename, signature or self.get_signature(),
+            size, page, zoom, rotation
+        ]])).hexdigest()
+
+    def get_preview(self, size, page=DEFAULT_PAGE_NUMBER, zoom=DEFAULT_ZOOM_LEVEL, rotation=DEFAULT_ROTATION):
+        """
+        Return the path of the preview image of the file, rendering it
+        in to the preview cache if needed
+        """
+        cache_key = self.get_preview_key(size, page, zoom, rotation)
+        preview_path = staging_preview_cache.get_path(cache_key)
+        if not staging_preview_cache.exists(cache_key):
+            # Rendered next to its final path and moved in place, so that
+            # a concurrent request never reads a partial image.  The
+            # converter skips existing output paths, the name must be unused
+            temporary_path = os.path.join(os.path.dirname(preview_path), u'.%s' % uuid.uuid4().hex)
+            try:
+                convert(self.get_full_path(), output_filepath=temporary_path, size=size, page=page, zoom=zoom, rotation=rotation)
+                os.rename(temporary_path, preview_path)
+            finally:
+                if os.path.exists(temporary_path):
+                    os.unlink(temporary_path)
+
+            staging_preview_cache.commit(cache_key)
+
+        return preview_path
+
+    def get_preview_url(self, size, page=DEFAULT_PAGE_NUMBER, zoom=DEFAULT_ZOOM_LEVEL, rotation=DEFAULT_ROTATION):
+        """
+        Return the URL of the preview image, it includes the signature of
+        the file so that browsers can keep the image until the file changes
+        """
+        return u'%s?%s' % (reverse('staging_file_preview', args=[self.staging_folder.pk, self.encoded_filename]), urlencode({
+            'size': size, 'page': page, 'zoom': zoom, 'rotation': rotation,
+            'signature': self.get_signature(),
+        }))
+
     def get_image(self, size, page, zoom, rotation, as_base64=True):
         # TODO: add support for transformations
-        converted_file_path = convert(self.get_full_path(), size=size)
+        preview_path = self.get_preview(size=size, page=page, zoom=zoom, rotation=rotation)
 
         if as_base64:
-            mimetype = get_mimetype(open(converted_file_path, 'r'), converted_file_path, mimetype_only=True)[0]
-            image = open(converted_file_path, 'r')
-            base64_data = base64.b64encode(image.read())
-            image.close()
-            return u'data:%s;base64,%s' % (mimetype, base64_data)
+            with open(preview_path, 'rb') as image:
+                return u'data:%s;base64,%s' % (DEFAULT_FILE_FORMAT_MIMETYPE, base64.b64encode(image.read()))
         else:
-            return converted_file_path
+            return preview_path
 
     def delete(self):
         os.unlink(self.get_full_path())
+
+
+def render_staging_previews(staging_files, size):
+    """
+    Render the missing preview images of a list of staging files, so that
+    they are ready by the time a browser requests them
+    """
+    for staging_file in staging_files:
+        try:
+            staging_file.get_preview(size=size)
+        except Exception as exception:
+            # Reported again when the preview is requested
+            logger.debug('error rendering preview of staging file: %s; %s' % (staging_file.filename, exception))
+
+
+def queue_staging_previews(staging_files, size):
+    """
+    Render the previews of staging files in the background, return False
+    if all the preview render slots are taken
+    """
+    return staging_preview_pool.submit(render_staging_previews, list(staging_files), size)
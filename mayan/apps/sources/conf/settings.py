@@ -0,0 +1,21 @@
+"""Configuration options for the sources app"""
+
+import os
+
+from django.conf import settings
+from django.utils.translation import ugettext_lazy as _
+
+from smart_settings.api import register_settings
+
+register_settings(
+    namespace=u'sources',
+    module=u'sources.conf.settings',
+    settings=[
+        {'name': u'WATCH_FOLDER_INOTIFY', 'global_name': u'SOURCES_WATCH_FOLDER_INOTIFY', 'default': True, 'description': _(u'Use inotify to detect new files in watch folders when pyinotify is installed, instead of checking the folders periodically.')},
+        {'name': u'WATCH_FOLDER_SETTLE_TIME', 'global_name': u'SOURCES_WATCH_FOLDER_SETTLE_TIME', 'default': 5, 'description': _(u'Amount of seconds a file in a watch folder must stay unchanged before it is uploaded, so that files still being copied are not uploaded partially.')},
+        {'name': u'WATCH_FOLDER_CONCURRENT_UPLOADS', 'global_name': u'SOURCES_WATCH_FOLDER_CONCURRENT_UPLOADS', 'default': 2, 'description': _(u'Maximum amount of batches of files from watch folders a node uploads concurrently.')},
+        {'name': u'STAGING_PREVIEW_CACHE_PATH', 'global_name': u'SOURCES_STAGING_PREVIEW_CACHE_PATH', 'default': os.path.join(settings.MEDIA_ROOT, 'staging_preview_cache'), 'exists': True},
+        {'name': u'STAGING_PREVIEW_CACHE_MAXIMUM_SIZE', 'global_name': u'SOURCES_STAGING_PREVIEW_CACHE_MAXIMUM_SIZE', 'default': 100 * 1024 * 1024, 'description': _(u'Maximum size in bytes of the cache of staging file preview images.  Use None to disable the limit.')},
+        {'name': u'STAGING_PREVIEW_CONCURRENT_RENDERS', 'global_name': u'SOURCES_STAGING_PREVIEW_CONCURRENT_RENDERS', 'default': 1, 'description': _(u'Maximum amount of staging folders whose file previews a node renders in the background at the same time.')},
+    ]
+)
@@ -54,3 +54,12 @@ SOURCE_CHOICES_PLURAL = (
     (SOURCE_CHOICE_STAGING, _(u'server staging folders')),
     (SOURCE_CHOICE_WATCH, _(u'server watch folders')),
 )
+
+# Number of files uploaded together by the batch upload paths
+DEFAULT_BATCH_SIZE = 100
+
+# Size of the staging file thumbnails of the staging folder file list
+STAGING_FILE_THUMBNAIL_SIZE = u'100'
+# Seconds browsers can reuse a staging file preview image, its URL changes
+# when the file is modified
+STAGING_FILE_PREVIEW_MAX_AGE = 30 * 24 * 60 * 60
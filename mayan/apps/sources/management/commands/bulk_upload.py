@@ -1,21 +1,31 @@
 from __future__ import absolute_import
 
 from json import loads
+from multiprocessing import Pool, cpu_count
 from optparse import make_option
 import os
 import sys
+import zipfile
 
+from django import db
+from django.core.files import File
 from django.core.management.base import CommandError, LabelCommand
+from django.utils.encoding import smart_str
 
 from documents.models import DocumentType
 from metadata.api import convert_dict_to_dict_list
 
+from ...literals import DEFAULT_BATCH_SIZE
 from ...models import OutOfProcess
-from common.compressed_files import NotACompressedFile
+
+# Extension of the checkpoint manifest created next to the uploaded
+# directory or compressed file when no manifest path is given
+MANIFEST_EXTENSION = '.manifest'
+
 
 class Command(LabelCommand):
-    args = '<filename>'
-    help = 'Upload documents from a compressed file in to the database.'
+    args = '<directory or filename>'
+    help = 'Upload documents from a directory or a compressed file in to the database.'
     option_list = LabelCommand.option_list + (
         make_option('--noinput', action='store_false', dest='interactive',
             default=True, help='Do not ask the user for confirmation before '
@@ -24,12 +34,31 @@ class Command(LabelCommand):
             help='A metadata dictionary list to apply to the documents.'),
         make_option('--document_type', action='store', dest='document_type_name',
             help='The document type to apply to the uploaded documents.'),
+        make_option('--batch_size', action='store', dest='batch_size', type='int',
+            default=DEFAULT_BATCH_SIZE, help='Number of documents stored together '
+                'in a single transaction.'),
+        make_option('--processes', action='store', dest='processes', type='int',
+            default=cpu_count(), help='Number of processes uploading documents '
+                'at the same time.'),
+        make_option('--manifest', action='store', dest='manifest',
+            help='File in which the uploaded files are recorded, the files '
+                'already recorded are skipped, so that an interrupted upload '
+                'can be resumed.  Defaults to the directory or compressed file '
+                'name followed by %s.' % MANIFEST_EXTENSION),
     )
 
     def handle_label(self, label, **options):
         if not os.access(label, os.R_OK):
             raise CommandError("File '%s' is not readable." % label)
 
+        if os.path.isdir(label):
+            names = get_directory_names(label)
+        elif zipfile.is_zipfile(label):
+            names = get_archive_names(label)
+        else:
+            print '%s is not a directory or a compressed file.' % label
+            return
+
         if options['metadata']:
             try:
                 metadata_dict = loads(options['metadata'])
@@ -47,6 +76,10 @@ class Command(LabelCommand):
         else:
             document_type = None
 
+        manifest_path = options['manifest'] or os.path.normpath(label) + MANIFEST_EXTENSION
+        uploaded = read_manifest(manifest_path)
+        names = [name for name in names if smart_str(name) not in uploaded]
+
         if _confirm(options['interactive']) == 'yes':
             print 'Beginning upload...'
             if metadata_dict_list:
@@ -57,24 +90,125 @@ class Command(LabelCommand):
             if document_type:
                 print 'Uploaded document will be of type: %s' % options['document_type_name']
 
-            source = OutOfProcess()
-            fd = open(label)
-            try:
-                result = source.upload_file(fd, filename=None, use_file_name=False, document_type=document_type, expand=True, metadata_dict_list=metadata_dict_list, user=None, document=None, new_version_data=None, command_line=True)
-                pass
-            except NotACompressedFile:
-                print '%s is not a compressed file.' % label
+            if uploaded:
+                print 'Skipping %d files already uploaded according to: %s' % (len(uploaded), manifest_path)
+
+            batch_size = max(options['batch_size'], 1)
+            jobs = [
+                (label, names[index:index + batch_size], document_type.pk if document_type else None, metadata_dict_list)
+                for index in range(0, len(names), batch_size)
+            ]
+
+            if options['processes'] > 1 and len(jobs) > 1:
+                # The processes must not share the parent's connection
+                db.close_connection()
+                pool = Pool(processes=options['processes'])
+                results = pool.imap_unordered(upload_job, jobs)
             else:
-                print 'Finished.'
+                pool = None
+                results = (upload_job(job) for job in jobs)
 
-            fd.close()
+            count = 0
+            errors = 0
+            with open(manifest_path, 'a') as manifest:
+                try:
+                    for job_names, error in results:
+                        if error:
+                            errors += len(job_names)
+                            print 'Error uploading files: %s; %s' % (', '.join(job_names), error)
+                        else:
+                            # Recorded only once the batch is committed
+                            for name in job_names:
+                                count += 1
+                                print 'Uploaded file #%d: %s' % (count, name)
+                                manifest.write(smart_str(name) + '\n')
+                            manifest.flush()
+                            os.fsync(manifest.fileno())
+                finally:
+                    if pool:
+                        pool.terminate()
+                        pool.join()
+
+            if errors:
+                print 'Finished with %d files not uploaded, run the command again to retry them.' % errors
+            else:
+                print 'Finished.'
         else:
             print 'Cancelled.'
 
 
+def get_directory_names(path):
+    """
+    Return the paths of all the files under a directory, relative to it
+    """
+    names = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            names.append(os.path.relpath(os.path.join(dirpath, filename), path))
+
+    return names
+
+
+def get_archive_names(path):
+    archive = zipfile.ZipFile(path)
+    try:
+        return [name for name in archive.namelist() if not name.endswith('/')]
+    finally:
+        archive.close()
+
+
+def read_manifest(path):
+    try:
+        with open(path) as manifest:
+            return set(line.rstrip('\n') for line in manifest if line.strip())
+    except IOError:
+        return set()
+
+
+def upload_job(job):
+    """
+    Upload a batch of files from a directory or a compressed file, return
+    the names of the files and the error that prevented uploading them
+    if any
+    """
+    path, names, document_type_pk, metadata_dict_list = job
+    file_objects = []
+    archive = None
+    try:
+        if os.path.isdir(path):
+            for name in names:
+                file_objects.append(File(open(os.path.join(path, name), 'rb'), name=os.path.basename(name)))
+        else:
+            # Opened by filename, every member gets its own descriptor
+            # and is read from disk as it is stored, not loaded in memory
+            archive = zipfile.ZipFile(path)
+            for name in names:
+                file_object = File(archive.open(name), name=os.path.basename(name))
+                file_object.size = archive.getinfo(name).file_size
+                file_objects.append(file_object)
+
+        if document_type_pk:
+            document_type = DocumentType.objects.get(pk=document_type_pk)
+        else:
+            document_type = None
+
+        OutOfProcess().upload_batch(file_objects, document_type=document_type, metadata_dict_list=metadata_dict_list)
+    except Exception as exception:
+        return names, '%s' % exception
+    else:
+        return names, None
+    finally:
+        for file_object in file_objects:
+            file_object.close()
+
+        if archive:
+            archive.close()
+
+
 def _confirm(interactive):
     if not interactive:
         return 'yes'
-    return raw_input('You have requested to bulk upload a number of documents from a compressed file.\n'
+    return raw_input('You have requested to bulk upload a number of documents from a directory or a compressed file.\n'
             'Are you sure you want to do this?\n'
             'Type \'yes\' to continue, or any other value to cancel: ')
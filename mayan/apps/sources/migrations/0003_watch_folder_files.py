@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'WatchFolderFile'
+        db.create_table(u'sources_watchfolderfile', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('watch_folder', self.gf('django.db.models.fields.related.ForeignKey')(related_name='processed_files', to=orm['sources.WatchFolder'])),
+            ('filename', self.gf('django.db.models.fields.CharField')(max_length=255)),
+            ('size', self.gf('django.db.models.fields.BigIntegerField')()),
+            ('modified', self.gf('django.db.models.fields.BigIntegerField')()),
+        ))
+        db.send_create_signal(u'sources', ['WatchFolderFile'])
+
+        # Adding unique constraint on 'WatchFolderFile', fields ['watch_folder', 'filename']
+        db.create_unique(u'sources_watchfolderfile', ['watch_folder_id', 'filename'])
+
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'WatchFolderFile', fields ['watch_folder', 'filename']
+        db.delete_unique(u'sources_watchfolderfile', ['watch_folder_id', 'filename'])
+
+        # Deleting model 'WatchFolderFile'
+        db.delete_table(u'sources_watchfolderfile')
+
+
+    models = {
+        u'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        u'sources.outofprocess': {
+            'Meta': {'ordering': "('title',)", 'object_name': 'OutOfProcess'},
+            'blacklist': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'enabled': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'whitelist': ('django.db.models.fields.TextField', [], {'blank': 'True'})
+        },
+        u'sources.sourcetransformation': {
+            'Meta': {'ordering': "('order',)", 'object_name': 'SourceTransformation'},
+            'arguments': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['contenttypes.ContentType']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'object_id': ('django.db.models.fields.PositiveIntegerField', [], {}),
+            'order': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0', 'null': 'True', 'db_index': 'True', 'blank': 'True'}),
+            'transformation': ('django.db.models.fields.CharField', [], {'max_length': '128'})
+        },
+        u'sources.stagingfolder': {
+            'Meta': {'ordering': "('title',)", 'object_name': 'StagingFolder'},
+            'blacklist': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'delete_after_upload': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'enabled': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'folder_path': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'icon': ('django.db.models.fields.CharField', [], {'max_length': '24', 'null': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'preview_height': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'preview_width': ('django.db.models.fields.IntegerField', [], {}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'uncompress': ('django.db.models.fields.CharField', [], {'max_length': '1'}),
+            'whitelist': ('django.db.models.fields.TextField', [], {'blank': 'True'})
+        },
+        u'sources.watchfolder': {
+            'Meta': {'ordering': "('title',)", 'object_name': 'WatchFolder'},
+            'blacklist': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'delete_after_upload': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'enabled': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'folder_path': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'interval': ('django.db.models.fields.PositiveIntegerField', [], {}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'uncompress': ('django.db.models.fields.CharField', [], {'max_length': '1'}),
+            'whitelist': ('django.db.models.fields.TextField', [], {'blank': 'True'})
+        },
+        u'sources.watchfolderfile': {
+            'Meta': {'unique_together': "(('watch_folder', 'filename'),)", 'object_name': 'WatchFolderFile'},
+            'filename': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'modified': ('django.db.models.fields.BigIntegerField', [], {}),
+            'size': ('django.db.models.fields.BigIntegerField', [], {}),
+            'watch_folder': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'processed_files'", 'to': u"orm['sources.WatchFolder']"})
+        },
+        u'sources.webform': {
+            'Meta': {'ordering': "('title',)", 'object_name': 'WebForm'},
+            'blacklist': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'enabled': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'icon': ('django.db.models.fields.CharField', [], {'max_length': '24', 'null': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'uncompress': ('django.db.models.fields.CharField', [], {'max_length': '1'}),
+            'whitelist': ('django.db.models.fields.TextField', [], {'blank': 'True'})
+        }
+    }
+
+    complete_apps = ['sources']
\ No newline at end of file
@@ -1,33 +1,38 @@
 from __future__ import absolute_import
 
 from ast import literal_eval
+from functools import partial
 import logging
 import os
+import zipfile
 
 from django.contrib.contenttypes import generic
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
+from django.core.files import File
 from django.db import models, transaction
 from django.utils.translation import ugettext_lazy as _
 
-from acls.utils import apply_default_acls
+from acls.utils import apply_default_acls, apply_default_acls_bulk
 from common.compressed_files import CompressedFile, NotACompressedFile
+from common.utils import fs_cleanup
 from converter.api import get_available_transformations_choices
 from converter.literals import DIMENSION_SEPARATOR
-from document_indexing.api import update_indexes
+from document_indexing.api import atomic_index_updates, update_indexes
 from documents.events import HISTORY_DOCUMENT_CREATED
-from documents.models import Document
-from history.api import create_history
-from metadata.api import save_metadata_list
-from scheduler.api import register_interval_job, remove_job
+from documents.models import Document, DocumentPage, DocumentPageTransformation
+from dynamic_search.classes import SearchModel
+from history.api import create_history, create_history_bulk
+from metadata.api import create_metadata_list_bulk, save_metadata_list
 
-from .classes import StagingFile
+from .classes import StagingFile, StagingFolderListing
 from .literals import (SOURCE_CHOICES, SOURCE_CHOICES_PLURAL,
     SOURCE_INTERACTIVE_UNCOMPRESS_CHOICES, SOURCE_CHOICE_WEB_FORM,
     SOURCE_CHOICE_STAGING, SOURCE_ICON_DISK, SOURCE_ICON_DRIVE,
     SOURCE_ICON_CHOICES, SOURCE_CHOICE_WATCH, SOURCE_UNCOMPRESS_CHOICES,
     SOURCE_UNCOMPRESS_CHOICE_Y)
 from .managers import SourceTransformationManager
+from .watchers import FolderWatcher
 
 logger = logging.getLogger(__name__)
 
@@ -131,9 +136,52 @@ class BaseModel(models.Model):
         # TODO: new HISTORY for version updates
 
         if metadata_dict_list and new_document:
-            # Only do for new documents
-            save_metadata_list(metadata_dict_list, document, create=True)
-            warnings = update_indexes(document)
+            # Only do for new documents, the indexes are updated once for
+            # all the metadata
+            with atomic_index_updates():
+                save_metadata_list(metadata_dict_list, document, create=True)
+
+    @transaction.atomic
+    def upload_batch(self, file_objects, document_type=None, metadata_dict_list=None, user=None, description=None):
+        """
+        Create a new document for each file in a single transaction using
+        bulk inserts, the indexes and the history of the new documents are
+        updated in one pass at the end.  The files are expected to be a
+        batch of moderate size, not a whole import
+        """
+        # Search index entries are updated once per document when the
+        # block ends
+        with SearchModel.defer_index_updates():
+            documents = Document.objects.create_from_files(file_objects, document_type=document_type, description=description)
+
+            apply_default_acls_bulk(documents, user)
+
+            transformations, errors = self.get_transformation_list()
+            if transformations:
+                DocumentPageTransformation.objects.bulk_create([
+                    DocumentPageTransformation(
+                        document_page=document_page,
+                        order=0,
+                        transformation=transformation.get('transformation'),
+                        arguments=transformation.get('arguments')
+                    ) for document_page in DocumentPage.objects.filter(document_version__document__in=documents) for transformation in transformations
+                ])
+
+            if metadata_dict_list:
+                create_metadata_list_bulk(metadata_dict_list, documents)
+
+        if user:
+            for document in documents:
+                document.add_as_recent_document_for_user(user)
+            create_history_bulk(HISTORY_DOCUMENT_CREATED, documents, {'user': user})
+        else:
+            create_history_bulk(HISTORY_DOCUMENT_CREATED, documents)
+
+        if metadata_dict_list:
+            for document in documents:
+                update_indexes(document)
+
+        return documents
 
     class Meta:
         ordering = ('title',)
@@ -176,7 +224,7 @@ class StagingFolder(InteractiveBaseModel):
 
     def get_files(self):
         try:
-            for entry in sorted([os.path.normcase(f) for f in os.listdir(self.folder_path) if os.path.isfile(os.path.join(self.folder_path, f))]):
+            for entry in StagingFolderListing.get_filenames(self.folder_path):
                 yield self.get_file(filename=entry)
         except OSError as exception:
             raise Exception(_(u'Unable get list of staging files: %s') % exception)
@@ -209,31 +257,108 @@ class WatchFolder(BaseModel):
     interval = models.PositiveIntegerField(verbose_name=_(u'interval'), help_text=_(u'Inverval in seconds where the watch folder path is checked for new documents.'))
 
     def save(self, *args, **kwargs):
-        if self.pk:
-            remove_job(self.internal_name())
         super(WatchFolder, self).save(*args, **kwargs)
         self.schedule()
 
+    def delete(self, *args, **kwargs):
+        FolderWatcher.stop(self.internal_name())
+        return super(WatchFolder, self).delete(*args, **kwargs)
+
     def schedule(self):
         if self.enabled:
-            register_interval_job(self.internal_name(),
-                title=self.fullname(), func=self.execute,
-                kwargs={'source_id': self.pk}, seconds=self.interval
+            FolderWatcher.start(self.internal_name(), path=self.folder_path,
+                handler=partial(WatchFolder.execute, source_id=self.pk),
+                interval=self.interval
             )
+        else:
+            FolderWatcher.stop(self.internal_name())
 
-    def execute(self, source_id):
+    @staticmethod
+    def execute(filenames, source_id):
+        """
+        Upload files picked up by the watcher of a watch folder, skipping
+        the ones kept in the folder after being uploaded before
+        """
         source = WatchFolder.objects.get(pk=source_id)
-        if source.uncompress == SOURCE_UNCOMPRESS_CHOICE_Y:
-            expand = True
-        else:
-            expand = False
-        print 'execute: %s' % self.internal_name()
+        signatures = {}
+        for filename in filenames:
+            try:
+                signatures[filename] = WatchFolderFile.get_signature(os.path.join(source.folder_path, filename))
+            except OSError:
+                # Removed since it was picked up
+                continue
+
+        for processed_file in source.processed_files.filter(filename__in=signatures.keys()):
+            if signatures[processed_file.filename] == (processed_file.size, processed_file.modified):
+                del signatures[processed_file.filename]
+
+        filenames = sorted(signatures)
+        if not filenames:
+            return
+
+        file_objects = []
+        with transaction.atomic():
+            try:
+                for filename in filenames:
+                    filepath = os.path.join(source.folder_path, filename)
+                    if source.uncompress == SOURCE_UNCOMPRESS_CHOICE_Y and zipfile.is_zipfile(filepath):
+                        file_object = File(open(filepath, 'rb'), name=filename)
+                        try:
+                            source.upload_file(file_object, expand=True)
+                        finally:
+                            file_object.close()
+                    else:
+                        file_objects.append(File(open(filepath, 'rb'), name=filename))
+
+                if file_objects:
+                    source.upload_batch(file_objects)
+            finally:
+                for file_object in file_objects:
+                    file_object.close()
+
+            if not source.delete_after_upload:
+                # Committed with the documents, so that a restarted watcher
+                # doesn't upload the files again
+                source.processed_files.filter(filename__in=filenames).delete()
+                WatchFolderFile.objects.bulk_create([
+                    WatchFolderFile(watch_folder=source, filename=filename, size=signatures[filename][0], modified=signatures[filename][1])
+                    for filename in filenames
+                ])
+
+        if source.delete_after_upload:
+            for filename in filenames:
+                fs_cleanup(os.path.join(source.folder_path, filename))
 
     class Meta(BaseModel.Meta):
         verbose_name = _(u'watch folder')
         verbose_name_plural = _(u'watch folders')
 
 
+class WatchFolderFile(models.Model):
+    """
+    File uploaded from a watch folder and kept in it, identified by its
+    size and modification time so that it is uploaded again only if it
+    is replaced
+    """
+    watch_folder = models.ForeignKey(WatchFolder, related_name='processed_files', verbose_name=_(u'watch folder'))
+    filename = models.CharField(max_length=255, verbose_name=_(u'filename'))
+    size = models.BigIntegerField(verbose_name=_(u'size'))
+    modified = models.BigIntegerField(verbose_name=_(u'modified'))
+
+    @staticmethod
+    def get_signature(filepath):
+        stat = os.stat(filepath)
+        return stat.st_size, int(stat.st_mtime)
+
+    def __unicode__(self):
+        return self.filename
+
+    class Meta:
+        unique_together = ('watch_folder', 'filename')
+        verbose_name = _(u'watch folder file')
+        verbose_name_plural = _(u'watch folder files')
+
+
 class ArgumentsValidator(object):
     message = _(u'Enter a valid value.')
     code = 'invalid'
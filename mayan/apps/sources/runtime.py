@@ -0,0 +1,29 @@
+from __future__ import absolute_import
+
+import tempfile
+
+from django.utils.translation import ugettext_lazy as _
+
+from common.file_caches import FileCache
+from common.utils import validate_path
+from job_processor.api import WorkerPool
+
+from .conf import settings as sources_settings
+from .conf.settings import (STAGING_PREVIEW_CACHE_MAXIMUM_SIZE,
+                            STAGING_PREVIEW_CONCURRENT_RENDERS,
+                            WATCH_FOLDER_CONCURRENT_UPLOADS)
+
+if (not validate_path(sources_settings.STAGING_PREVIEW_CACHE_PATH)) or (not sources_settings.STAGING_PREVIEW_CACHE_PATH):
+    setattr(sources_settings, 'STAGING_PREVIEW_CACHE_PATH', tempfile.mkdtemp())
+
+watch_folder_pool = WorkerPool(name='watch_folders', size=WATCH_FOLDER_CONCURRENT_UPLOADS)
+
+# Preview images of staging files, keyed by the size and modification time
+# of the file they were created from, so that replaced files get new ones
+staging_preview_cache = FileCache(
+    name='staging_file_previews', label=_(u'Staging file previews'),
+    path=sources_settings.STAGING_PREVIEW_CACHE_PATH,
+    maximum_size=STAGING_PREVIEW_CACHE_MAXIMUM_SIZE
+)
+
+staging_preview_pool = WorkerPool(name='staging_previews', size=STAGING_PREVIEW_CONCURRENT_RENDERS)
@@ -0,0 +1,123 @@
+from __future__ import absolute_import
+
+import os
+import Queue
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.test import TestCase
+
+from documents.models import Document, DocumentType
+
+from .literals import SOURCE_UNCOMPRESS_CHOICE_N
+from .models import WatchFolder
+from .watchers import FolderWatcher
+
+TEST_DOCUMENT_PATH = os.path.join(settings.BASE_DIR, 'contrib', 'sample_documents', 'title_page.png')
+TEST_SETTLE_TIME = 1
+# Seconds to wait for the watcher to hand over the files
+TEST_TIMEOUT = 10
+
+
+class FolderWatcherTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.uploads = Queue.Queue()
+        self.watcher = None
+
+    def _start_watcher(self, handler=None):
+        self.watcher = FolderWatcher('test_watch_folder', self.directory, handler or self.uploads.put, interval=0.1, settle_time=TEST_SETTLE_TIME)
+        self.watcher.thread.start()
+
+    def _write_file(self, filename, data='test data', mode='w'):
+        with open(os.path.join(self.directory, filename), mode) as descriptor:
+            descriptor.write(data)
+
+    def test_settled_file(self):
+        self._write_file('settled')
+        written = time.time()
+        self._start_watcher()
+
+        self.assertEqual(self.uploads.get(timeout=TEST_TIMEOUT), ['settled'])
+        self.assertTrue(time.time() - written >= TEST_SETTLE_TIME)
+
+        # Not handed over again while it doesn't change
+        time.sleep(TEST_SETTLE_TIME * 2)
+        self.assertTrue(self.uploads.empty())
+
+    def test_growing_file(self):
+        self._start_watcher()
+        growing_until = time.time() + TEST_SETTLE_TIME * 3
+        while time.time() < growing_until:
+            self._write_file('growing', mode='a')
+            time.sleep(0.2)
+
+        self.assertTrue(self.uploads.empty())
+        self.assertEqual(self.uploads.get(timeout=TEST_TIMEOUT), ['growing'])
+
+    def test_failed_batch_retried(self):
+        def handler(filenames):
+            if 'bad' in filenames:
+                raise IOError('test error')
+            self.uploads.put(filenames)
+
+        for filename in ['first', 'bad', 'second', 'third']:
+            self._write_file(filename)
+        self._start_watcher(handler=handler)
+
+        uploaded = []
+        while len(uploaded) < 3:
+            uploaded.extend(self.uploads.get(timeout=TEST_TIMEOUT))
+
+        self.assertEqual(sorted(uploaded), ['first', 'second', 'third'])
+
+    def tearDown(self):
+        if self.watcher:
+            self.watcher.stop_event.set()
+            self.watcher.thread.join()
+        shutil.rmtree(self.directory)
+
+
+class WatchFolderExecuteTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.document_type = DocumentType.objects.create(name='test doc type')
+        # Not enabled, the tests call the handler of the watcher directly
+        self.watch_folder = WatchFolder.objects.create(
+            title='test watch folder', enabled=False, folder_path=self.directory,
+            uncompress=SOURCE_UNCOMPRESS_CHOICE_N, delete_after_upload=False, interval=60
+        )
+        shutil.copy(TEST_DOCUMENT_PATH, os.path.join(self.directory, 'title_page.png'))
+
+    def test_kept_file_skipped(self):
+        WatchFolder.execute(['title_page.png'], source_id=self.watch_folder.pk)
+        self.assertEqual(Document.objects.count(), 1)
+
+        # Picked up again, after a restart of the watcher
+        WatchFolder.execute(['title_page.png'], source_id=self.watch_folder.pk)
+        self.assertEqual(Document.objects.count(), 1)
+
+        # Uploaded again once changed
+        with open(os.path.join(self.directory, 'title_page.png'), 'a') as descriptor:
+            descriptor.write('changed')
+        WatchFolder.execute(['title_page.png'], source_id=self.watch_folder.pk)
+        self.assertEqual(Document.objects.count(), 2)
+
+    def test_delete_after_upload(self):
+        self.watch_folder.delete_after_upload = True
+        self.watch_folder.save()
+
+        WatchFolder.execute(['title_page.png'], source_id=self.watch_folder.pk)
+        self.assertEqual(Document.objects.count(), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'title_page.png')))
+
+    def test_removed_file(self):
+        WatchFolder.execute(['missing.png'], source_id=self.watch_folder.pk)
+        self.assertEqual(Document.objects.count(), 0)
+
+    def tearDown(self):
+        for document in Document.objects.all():
+            document.delete()
+        shutil.rmtree(self.directory)
@@ -2,7 +2,8 @@ from __future__ import absolute_import
 
 from django.conf.urls import patterns, url
 
-from .api_views import (APIStagingSourceFileView, APIStagingSourceFileImageView,
+from .api_views import (APIBatchUploadView, APIStagingSourceFileListView,
+                        APIStagingSourceFileView, APIStagingSourceFileImageView,
                         APIStagingSourceListView, APIStagingSourceView)
 from .literals import (SOURCE_CHOICE_STAGING, SOURCE_CHOICE_WATCH,
                        SOURCE_CHOICE_WEB_FORM)
@@ -10,6 +11,7 @@ from .wizards import DocumentCreateWizard
 
 urlpatterns = patterns('sources.views',
     url(r'^staging_file/(?P<staging_folder_pk>\d+)/(?P<encoded_filename>.+)/delete/$', 'staging_file_delete', name='staging_file_delete'),
+    url(r'^staging_file/(?P<staging_folder_pk>\d+)/(?P<encoded_filename>.+)/preview/$', 'staging_file_preview', name='staging_file_preview'),
 
     url(r'^upload/document/new/interactive/(?P<source_type>\w+)/(?P<source_id>\d+)/$', 'upload_interactive', (), 'upload_interactive'),
     url(r'^upload/document/new/interactive/$', 'upload_interactive', (), 'upload_interactive'),
@@ -43,5 +45,7 @@ api_urls = patterns('',
     url(r'^staging_folders/file/(?P<staging_folder_pk>[0-9]+)/(?P<encoded_filename>.+)/image/$', APIStagingSourceFileImageView.as_view(), name='stagingfolderfile-image-view'),
     url(r'^staging_folders/file/(?P<staging_folder_pk>[0-9]+)/(?P<encoded_filename>.+)/$', APIStagingSourceFileView.as_view(), name='stagingfolderfile-detail'),
     url(r'^staging_folders/$', APIStagingSourceListView.as_view(), name='stagingfolder-list'),
-    url(r'^staging_folders/(?P<pk>[0-9]+)/$', APIStagingSourceView.as_view(), name='stagingfolder-detail')
+    url(r'^staging_folders/(?P<pk>[0-9]+)/$', APIStagingSourceView.as_view(), name='stagingfolder-detail'),
+    url(r'^staging_folders/(?P<staging_folder_pk>[0-9]+)/files/$', APIStagingSourceFileListView.as_view(), name='stagingfolderfile-list'),
+    url(r'^upload/batch/$', APIBatchUploadView.as_view(), name='document-batch-upload'),
 )
@@ -3,6 +3,11 @@ import re
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext
 
+from converter.literals import (DEFAULT_PAGE_NUMBER, DEFAULT_ROTATION,
+                                DEFAULT_ZOOM_LEVEL)
+from documents.conf.settings import (DISPLAY_SIZE, ZOOM_MAX_LEVEL,
+                                     ZOOM_MIN_LEVEL)
+
 
 # From http://www.peterbe.com/plog/whitelist-blacklist-logic
 def accept_item(value, whitelist, blacklist, default_accept=True):
@@ -33,3 +38,24 @@ def accept_item(value, whitelist, blacklist, default_accept=True):
 def validate_whitelist_blacklist(value, whitelist, blacklist):
     if not accept_item(value, whitelist, blacklist):
         raise ValidationError(ugettext(u'Whitelist Blacklist validation error.'))
+
+
+def get_preview_arguments(query_dict):
+    """
+    Return the size, page, zoom and rotation of a staging file preview
+    request, with the zoom level clamped to the allowed range
+    """
+    zoom = int(query_dict.get('zoom', DEFAULT_ZOOM_LEVEL))
+
+    if zoom < ZOOM_MIN_LEVEL:
+        zoom = ZOOM_MIN_LEVEL
+
+    if zoom > ZOOM_MAX_LEVEL:
+        zoom = ZOOM_MAX_LEVEL
+
+    return {
+        'size': query_dict.get('size', DISPLAY_SIZE),
+        'page': int(query_dict.get('page', DEFAULT_PAGE_NUMBER)),
+        'zoom': zoom,
+        'rotation': int(query_dict.get('rotation', DEFAULT_ROTATION)) % 360,
+    }
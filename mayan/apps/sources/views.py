@@ -4,9 +4,10 @@ from django.conf import settings
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import render_to_response, get_object_or_404
 from django.template import RequestContext
+from django.utils.cache import patch_cache_control
 from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext
@@ -14,6 +15,8 @@ from django.utils.translation import ugettext_lazy as _
 
 from acls.models import AccessEntry
 from common.utils import encapsulate
+from converter.exceptions import UnkownConvertError, UnknownFileFormat
+from converter.literals import DEFAULT_FILE_FORMAT_MIMETYPE
 from documents.exceptions import NewDocumentVersionNotAllowed
 from documents.models import DocumentType, Document
 from documents.permissions import (PERMISSION_DOCUMENT_CREATE,
@@ -21,16 +24,19 @@ from documents.permissions import (PERMISSION_DOCUMENT_CREATE,
 from metadata.api import decode_metadata_from_url, metadata_repr_as_list
 from permissions.models import Permission
 
+from .classes import queue_staging_previews
 from .forms import (SourceTransformationForm, SourceTransformationForm_create,
     WebFormSetupForm, StagingFolderSetupForm, StagingDocumentForm, WebFormForm,
     WatchFolderSetupForm)
 from .literals import (SOURCE_CHOICE_WEB_FORM, SOURCE_CHOICE_STAGING,
-    SOURCE_CHOICE_WATCH, SOURCE_UNCOMPRESS_CHOICE_Y, SOURCE_UNCOMPRESS_CHOICE_ASK)
+    SOURCE_CHOICE_WATCH, SOURCE_UNCOMPRESS_CHOICE_Y, SOURCE_UNCOMPRESS_CHOICE_ASK,
+    STAGING_FILE_PREVIEW_MAX_AGE, STAGING_FILE_THUMBNAIL_SIZE)
 from .models import (WebForm, StagingFolder, SourceTransformation,
     WatchFolder)
 from .permissions import (PERMISSION_SOURCES_SETUP_VIEW,
     PERMISSION_SOURCES_SETUP_EDIT, PERMISSION_SOURCES_SETUP_DELETE,
     PERMISSION_SOURCES_SETUP_CREATE)
+from .utils import get_preview_arguments
 
 
 def document_create_siblings(request, document_id):
@@ -287,6 +293,17 @@ def upload_interactive(request, source_type=None, source_id=None, document_pk=No
             except Exception as exception:
                 messages.error(request, exception)
                 staging_filelist = []
+            else:
+                # Render the thumbnails of the page being displayed ahead
+                # of the browser requesting them
+                page_size = getattr(settings, 'PAGINATION_DEFAULT_PAGINATION', 20)
+                try:
+                    page_number = max(int(request.GET.get('page', 1)), 1)
+                except ValueError:
+                    page_number = 1
+                page_files = staging_filelist[(page_number - 1) * page_size:page_number * page_size]
+                if page_files:
+                    queue_staging_previews(page_files, size=STAGING_FILE_THUMBNAIL_SIZE)
             finally:
                 if document:
                     title = _(u'upload a new version from staging source: %s') % staging_folder.title
@@ -399,6 +416,37 @@ def staging_file_delete(request, staging_folder_pk, encoded_filename):
     }, context_instance=RequestContext(request))
 
 
+def staging_file_preview(request, staging_folder_pk, encoded_filename):
+    try:
+        Permission.objects.check_permissions(request.user, [PERMISSION_DOCUMENT_CREATE])
+    except PermissionDenied:
+        Permission.objects.check_permissions(request.user, [PERMISSION_DOCUMENT_NEW_VERSION])
+
+    staging_folder = get_object_or_404(StagingFolder, pk=staging_folder_pk)
+    staging_file = staging_folder.get_file(encoded_filename=encoded_filename)
+    preview_arguments = get_preview_arguments(request.GET)
+
+    try:
+        signature = staging_file.get_signature()
+    except OSError:
+        raise Http404
+
+    if request.GET.get('signature') != signature:
+        # The file changed, the cached responses of the old URL are stale
+        return HttpResponseRedirect(staging_file.get_preview_url(**preview_arguments))
+
+    try:
+        preview_path = staging_file.get_preview(**preview_arguments)
+    except (UnknownFileFormat, UnkownConvertError):
+        raise Http404
+
+    with open(preview_path, 'rb') as image:
+        response = HttpResponse(image.read(), content_type=DEFAULT_FILE_FORMAT_MIMETYPE)
+
+    patch_cache_control(response, private=True, max_age=STAGING_FILE_PREVIEW_MAX_AGE)
+    return response
+
+
 # Setup views
 def setup_source_list(request, source_type):
     Permission.objects.check_permissions(request.user, [PERMISSION_SOURCES_SETUP_VIEW])
@@ -0,0 +1,240 @@
+from __future__ import absolute_import
+
+import errno
+import fcntl
+import logging
+import os
+import threading
+import time
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+from common.conf.settings import TEMPORARY_DIRECTORY
+
+from .conf.settings import WATCH_FOLDER_INOTIFY, WATCH_FOLDER_SETTLE_TIME
+from .literals import DEFAULT_BATCH_SIZE
+from .runtime import watch_folder_pool
+
+logger = logging.getLogger(__name__)
+
+
+class FolderWatcher(object):
+    """
+    Watch a folder from a background thread and hand the files that
+    stopped changing to a handler, in batches executed by the watch
+    folder worker pool.  Only one process per node watches a given
+    folder, the others wait to take over.
+    This class detects new files by listing the folder periodically,
+    InotifyFolderWatcher is used instead when possible
+    """
+    _registry = {}
+
+    @classmethod
+    def get_all(cls):
+        return cls._registry.values()
+
+    @classmethod
+    def get(cls, name):
+        return cls._registry[name]
+
+    @classmethod
+    def start(cls, name, path, handler, interval):
+        """
+        Start watching a folder, replacing the watcher of the same name
+        """
+        cls.stop(name)
+        if WATCH_FOLDER_INOTIFY and pyinotify:
+            watcher = InotifyFolderWatcher(name, path, handler, interval)
+        else:
+            watcher = FolderWatcher(name, path, handler, interval)
+
+        FolderWatcher._registry[name] = watcher
+        watcher.thread.start()
+        return watcher
+
+    @classmethod
+    def stop(cls, name):
+        watcher = FolderWatcher._registry.pop(name, None)
+        if watcher:
+            watcher.stop_event.set()
+
+    def __init__(self, name, path, handler, interval, settle_time=WATCH_FOLDER_SETTLE_TIME, batch_size=DEFAULT_BATCH_SIZE):
+        self.name = name
+        self.path = path
+        self.handler = handler
+        self.interval = interval
+        self.settle_time = settle_time
+        self.batch_size = batch_size
+        # Files that may be ready, filename: (signature, time of the last change)
+        self.candidates = {}
+        # Signatures of the files already handed to the handler
+        self.submitted = {}
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=u'watch_folder-%s' % name)
+        self.thread.daemon = True
+
+    def run(self):
+        lock = self.acquire_lock()
+        try:
+            if lock:
+                self.setup()
+                # Pick up the files copied while nobody was watching
+                self.scan()
+                while not self.stop_event.is_set():
+                    self.wait()
+                    self.check_candidates()
+                    self.dispatch()
+        except Exception as exception:
+            logger.error('watch folder: %s stopped; %s' % (self.name, exception))
+        finally:
+            self.teardown()
+            if lock:
+                lock.close()
+
+    def acquire_lock(self):
+        """
+        Block until this process holds the lock of the watched folder,
+        return None if the watcher was stopped in the meantime
+        """
+        lock = open(os.path.join(TEMPORARY_DIRECTORY, u'%s.lock' % self.name), 'a')
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError as exception:
+                if exception.errno not in (errno.EACCES, errno.EAGAIN):
+                    raise
+            else:
+                return lock
+
+            if self.stop_event.wait(self.interval):
+                lock.close()
+                return None
+
+    def setup(self):
+        pass
+
+    def teardown(self):
+        pass
+
+    def wait(self):
+        self.stop_event.wait(self.interval)
+        self.scan()
+
+    def scan(self):
+        """
+        Observe every file of the folder and forget the removed ones
+        """
+        filenames = set(self.list_files())
+        for filename in filenames:
+            self.observe(filename)
+
+        for filename in set(self.submitted) - filenames:
+            del self.submitted[filename]
+
+    def list_files(self):
+        for filename in os.listdir(self.path):
+            # Hidden files are commonly temporary files of copies in progress
+            if not filename.startswith('.') and os.path.isfile(os.path.join(self.path, filename)):
+                yield filename
+
+    def observe(self, filename):
+        """
+        Record a file whose signature changed as a candidate, the time of
+        the last change is used to wait until the file settles
+        """
+        try:
+            stat = os.stat(os.path.join(self.path, filename))
+        except OSError:
+            self.forget(filename)
+            return
+
+        signature = (stat.st_size, stat.st_mtime)
+        if self.submitted.get(filename) == signature:
+            return
+
+        if filename not in self.candidates or self.candidates[filename][0] != signature:
+            self.candidates[filename] = (signature, time.time())
+
+    def forget(self, filename):
+        self.candidates.pop(filename, None)
+        self.submitted.pop(filename, None)
+
+    def check_candidates(self):
+        for filename in list(self.candidates):
+            self.observe(filename)
+
+    def dispatch(self):
+        """
+        Hand the files that didn't change during the settle time to the
+        handler in batches, as long as the worker pool has free slots
+        """
+        settled_time = time.time() - self.settle_time
+        ready = sorted((changed, filename) for filename, (signature, changed) in self.candidates.items() if changed <= settled_time)
+        filenames = [filename for changed, filename in ready]
+
+        for index in range(0, len(filenames), self.batch_size):
+            batch = filenames[index:index + self.batch_size]
+            if not watch_folder_pool.submit(self.process, batch):
+                # The remaining files are retried on the next check
+                break
+
+            for filename in batch:
+                self.submitted[filename] = self.candidates.pop(filename)[0]
+
+    def process(self, filenames):
+        """
+        Hand a batch of files to the handler.  A failed batch is retried in
+        halves until the files that fail are found, so that a single bad
+        file doesn't keep the rest of its batch from being uploaded
+        """
+        logger.debug('watch folder: %s, uploading: %s' % (self.name, filenames))
+        try:
+            self.handler(filenames)
+        except Exception as exception:
+            if len(filenames) == 1:
+                # Not retried until the file changes or the watcher restarts
+                logger.error('watch folder: %s, error uploading: %s; %s' % (self.name, filenames[0], exception))
+            else:
+                logger.warning('watch folder: %s, error uploading batch, retrying in smaller batches; %s' % (self.name, exception))
+                middle = len(filenames) / 2
+                self.process(filenames[:middle])
+                self.process(filenames[middle:])
+
+
+class InotifyFolderWatcher(FolderWatcher):
+    """
+    Folder watcher notified of the changed files by the kernel, instead
+    of listing the folder periodically
+    """
+    mask = (pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MOVED_TO | pyinotify.IN_MODIFY |
+            pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM) if pyinotify else 0
+
+    def setup(self):
+        self.watch_manager = pyinotify.WatchManager()
+        self.notifier = pyinotify.Notifier(self.watch_manager, default_proc_fun=self.process_event)
+        self.watch_manager.add_watch(self.path, self.mask)
+
+    def teardown(self):
+        if hasattr(self, 'notifier'):
+            self.notifier.stop()
+
+    def wait(self):
+        # Wake up in time to dispatch the files as soon as they settle
+        timeout = min(self.interval, self.settle_time) if self.candidates else self.interval
+        if self.notifier.check_events(timeout=max(timeout, 1) * 1000):
+            self.notifier.read_events()
+            self.notifier.process_events()
+
+    def process_event(self, event):
+        if event.mask & pyinotify.IN_Q_OVERFLOW:
+            # Events were lost, fall back to looking at every file
+            self.scan()
+        elif event.mask & pyinotify.IN_ISDIR or not event.name or event.name.startswith('.'):
+            return
+        elif event.mask & (pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM):
+            self.forget(event.name)
+        else:
+            self.observe(event.name)
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import os
+import tempfile
 import zipfile
 
 try:
@@ -9,16 +10,76 @@ try:
 except:
     COMPRESSION = zipfile.ZIP_STORED
 
-try:
-    from cStringIO import StringIO
-except ImportError:
-    from StringIO import StringIO
-
 from django.core.files import File
 from django.core.files.storage import FileSystemStorage
 
+from common.conf.settings import TEMPORARY_DIRECTORY
+
 from ..conf.settings import FILESTORAGE_LOCATION
 
+# Size of the blocks in which content is copied
+CHUNK_SIZE = 64 * 1024
+MEMBER_NAME = 'document'
+
+
+class CompressedMemberFile(object):
+    """
+    Read only file like object that decompresses a member of a zip file on
+    demand, only a small buffer is kept in memory.  Seeking backwards
+    restarts the decompression from the beginning of the member
+    """
+    def __init__(self, storage_file, member_name=MEMBER_NAME):
+        self.storage_file = storage_file
+        self.zip_file = zipfile.ZipFile(storage_file)
+        self.member_name = member_name
+        self.size = self.zip_file.getinfo(member_name).file_size
+        self.closed = False
+        self._open_member()
+
+    def _open_member(self):
+        self.member = self.zip_file.open(self.member_name)
+        self.position = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self.member.read()
+        else:
+            data = self.member.read(size)
+
+        self.position += len(data)
+        return data
+
+    def __iter__(self):
+        while True:
+            data = self.read(CHUNK_SIZE)
+            if not data:
+                break
+            yield data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.size
+
+        if offset < self.position:
+            self.member.close()
+            self._open_member()
+
+        while self.position < offset:
+            if not self.read(min(CHUNK_SIZE, offset - self.position)):
+                break
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        if not self.closed:
+            self.member.close()
+            self.zip_file.close()
+            self.storage_file.close()
+            self.closed = True
+
 
 class CompressedStorage(FileSystemStorage):
     """Simple wrapper for the stock Django FileSystemStorage class"""
@@ -30,22 +91,40 @@ class CompressedStorage(FileSystemStorage):
         self.location = FILESTORAGE_LOCATION
 
     def save(self, name, content):
-        descriptor = StringIO()
-        zf = zipfile.ZipFile(descriptor, mode='w', compression=COMPRESSION)
+        try:
+            source_filepath = content.temporary_file_path()
+        except AttributeError:
+            # zipfile can only compress in chunks from a file in the
+            # filesystem, spool the content to disk first
+            source_descriptor = tempfile.NamedTemporaryFile(dir=TEMPORARY_DIRECTORY)
+            if hasattr(content, 'chunks'):
+                chunks = content.chunks(CHUNK_SIZE)
+            else:
+                chunks = iter(lambda: content.read(CHUNK_SIZE), '')
+
+            for chunk in chunks:
+                source_descriptor.write(chunk)
+
+            source_descriptor.flush()
+            source_filepath = source_descriptor.name
+        else:
+            source_descriptor = None
 
-        zf.writestr('document', content.read())
+        try:
+            with tempfile.NamedTemporaryFile(dir=TEMPORARY_DIRECTORY) as descriptor:
+                zf = zipfile.ZipFile(descriptor, mode='w', compression=COMPRESSION, allowZip64=True)
+                zf.write(source_filepath, MEMBER_NAME)
 
-        for file in zf.filelist:
-            file.create_system = 0
+                for file in zf.filelist:
+                    file.create_system = 0
 
-        zf.close()
-        descriptor.seek(0)
-        return super(CompressedStorage, self).save(name, File(descriptor))
+                zf.close()
+                descriptor.seek(0)
+                return super(CompressedStorage, self).save(name, File(descriptor))
+        finally:
+            if source_descriptor:
+                source_descriptor.close()
 
     def open(self, name, mode='rb'):
         storage_file = super(CompressedStorage, self).open(name, mode)
-        zf = zipfile.ZipFile(storage_file)
-        descriptor = StringIO()
-        descriptor.write(zf.read('document'))
-        descriptor.seek(0)
-        return File(descriptor)
+        return File(CompressedMemberFile(storage_file))
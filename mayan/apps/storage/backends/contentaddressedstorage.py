@@ -0,0 +1,80 @@
+from __future__ import absolute_import
+
+import errno
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+from ..conf.settings import FILESTORAGE_LOCATION
+
+# Size of the blocks in which content is hashed and copied
+CHUNK_SIZE = 64 * 1024
+# Two levels of 256 sub directories each
+SHARD_DEPTH = 2
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that stores each file under the hash of its
+    content.  Saving content that is already stored doesn't write anything
+    and returns the name of the existing file, so identical files share
+    the same name and the same bytes on disk.  Because of this, callers
+    must only delete a name once nothing else references it
+    """
+
+    separator = os.path.sep
+
+    def __init__(self, *args, **kwargs):
+        super(ContentAddressedStorage, self).__init__(*args, **kwargs)
+        self.location = FILESTORAGE_LOCATION
+
+    def get_content_name(self, digest):
+        return os.path.join(*([digest[level * 2:level * 2 + 2] for level in range(SHARD_DEPTH)] + [digest]))
+
+    def save(self, name, content):
+        # The name suggested by the caller is ignored, the content is hashed
+        # while it is copied to a temporary file in the storage location, so
+        # that it can be moved in place atomically
+        if not os.path.exists(self.location):
+            os.makedirs(self.location)
+
+        content_hash = hashlib.sha256()
+        handle, temporary_path = tempfile.mkstemp(dir=self.location, prefix='.')
+        try:
+            with os.fdopen(handle, 'wb') as descriptor:
+                if hasattr(content, 'chunks'):
+                    chunks = content.chunks(CHUNK_SIZE)
+                else:
+                    chunks = iter(lambda: content.read(CHUNK_SIZE), '')
+
+                for chunk in chunks:
+                    content_hash.update(chunk)
+                    descriptor.write(chunk)
+
+            name = self.get_content_name(content_hash.hexdigest())
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                # Already stored, skip the write.  The modification time
+                # is updated so that the file is not deleted as unreferenced
+                # before the new reference to it is committed
+                os.utime(full_path, None)
+                return name
+
+            try:
+                os.makedirs(os.path.dirname(full_path))
+            except OSError as exception:
+                if exception.errno != errno.EEXIST:
+                    raise
+
+            if settings.FILE_UPLOAD_PERMISSIONS is not None:
+                os.chmod(temporary_path, settings.FILE_UPLOAD_PERMISSIONS)
+
+            os.rename(temporary_path, full_path)
+            temporary_path = None
+            return name
+        finally:
+            if temporary_path:
+                os.unlink(temporary_path)
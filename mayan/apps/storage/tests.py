@@ -0,0 +1,132 @@
+from __future__ import absolute_import
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import TestCase
+
+from documents.utils import IngestFile
+
+from .backends.compressedstorage import CHUNK_SIZE, CompressedStorage
+from .backends.contentaddressedstorage import ContentAddressedStorage
+
+TEST_CONTENT = 'test content'
+# Spans several decompression chunks
+TEST_LARGE_CONTENT = os.urandom(CHUNK_SIZE * 3 + 100)
+
+
+class ContentAddressedStorageTestCase(TestCase):
+    def setUp(self):
+        self.storage = ContentAddressedStorage()
+        self.storage.location = tempfile.mkdtemp()
+
+    def _get_stored_files(self):
+        return [
+            os.path.join(directory, filename)
+            for directory, directories, filenames in os.walk(self.storage.location) for filename in filenames
+        ]
+
+    def test_identical_content_shared(self):
+        name = self.storage.save('first', ContentFile(TEST_CONTENT))
+        self.assertEqual(self.storage.save('second', ContentFile(TEST_CONTENT)), name)
+        self.assertEqual(self._get_stored_files(), [self.storage.path(name)])
+
+        with self.storage.open(name) as descriptor:
+            self.assertEqual(descriptor.read(), TEST_CONTENT)
+
+    def test_different_content(self):
+        first_name = self.storage.save('first', ContentFile(TEST_CONTENT))
+        second_name = self.storage.save('first', ContentFile('other content'))
+        self.assertNotEqual(first_name, second_name)
+        self.assertEqual(sorted(self._get_stored_files()), sorted([self.storage.path(first_name), self.storage.path(second_name)]))
+
+    def test_saving_again_updates_modification_time(self):
+        name = self.storage.save('first', ContentFile(TEST_CONTENT))
+        os.utime(self.storage.path(name), (0, 0))
+        self.storage.save('second', ContentFile(TEST_CONTENT))
+        self.assertNotEqual(os.path.getmtime(self.storage.path(name)), 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.storage.location)
+
+
+class CompressedStorageTestCase(TestCase):
+    def setUp(self):
+        self.storage = CompressedStorage()
+        self.storage.location = tempfile.mkdtemp()
+        self.name = self.storage.save('test', ContentFile(TEST_LARGE_CONTENT))
+
+    def test_round_trip(self):
+        with self.storage.open(self.name) as descriptor:
+            self.assertEqual(descriptor.read(), TEST_LARGE_CONTENT)
+
+        with self.storage.open(self.name) as descriptor:
+            self.assertEqual(''.join(descriptor.chunks()), TEST_LARGE_CONTENT)
+
+        # Stored in a zip file, not as is
+        with open(self.storage.path(self.name), 'rb') as descriptor:
+            self.assertNotEqual(descriptor.read(), TEST_LARGE_CONTENT)
+
+    def test_size(self):
+        with self.storage.open(self.name) as descriptor:
+            self.assertEqual(descriptor.size, len(TEST_LARGE_CONTENT))
+
+    def test_seek(self):
+        descriptor = self.storage.open(self.name)
+        try:
+            # Forward, past the first chunks
+            descriptor.seek(CHUNK_SIZE * 2 + 10)
+            self.assertEqual(descriptor.tell(), CHUNK_SIZE * 2 + 10)
+            self.assertEqual(descriptor.read(20), TEST_LARGE_CONTENT[CHUNK_SIZE * 2 + 10:CHUNK_SIZE * 2 + 30])
+
+            # Backward
+            descriptor.seek(5)
+            self.assertEqual(descriptor.read(10), TEST_LARGE_CONTENT[5:15])
+
+            descriptor.seek(10, os.SEEK_CUR)
+            self.assertEqual(descriptor.read(10), TEST_LARGE_CONTENT[25:35])
+
+            descriptor.seek(-10, os.SEEK_END)
+            self.assertEqual(descriptor.tell(), len(TEST_LARGE_CONTENT) - 10)
+            self.assertEqual(descriptor.read(), TEST_LARGE_CONTENT[-10:])
+            self.assertEqual(descriptor.read(), '')
+        finally:
+            descriptor.close()
+
+    def test_temporary_file(self):
+        upload = TemporaryUploadedFile('test', 'application/octet-stream', len(TEST_LARGE_CONTENT), None)
+        upload.write(TEST_LARGE_CONTENT)
+        upload.seek(0)
+        try:
+            name = self.storage.save('test', upload)
+        finally:
+            upload.close()
+
+        with self.storage.open(name) as descriptor:
+            self.assertEqual(descriptor.read(), TEST_LARGE_CONTENT)
+
+    def test_ingest_file(self):
+        upload = TemporaryUploadedFile('test', 'application/octet-stream', len(TEST_LARGE_CONTENT), None)
+        upload.write(TEST_LARGE_CONTENT)
+        upload.seek(0)
+        ingest = IngestFile(upload)
+        try:
+            # Read through the ingest file instead of from the path of the
+            # temporary file, so that every byte is seen
+            self.assertFalse(hasattr(ingest, 'temporary_file_path'))
+            name = self.storage.save('test', ingest)
+            self.assertTrue(ingest.is_complete())
+            self.assertEqual(ingest.get_checksum(), hashlib.sha256(TEST_LARGE_CONTENT).hexdigest())
+        finally:
+            ingest.cleanup()
+            upload.close()
+
+        with self.storage.open(name) as descriptor:
+            self.assertEqual(descriptor.read(), TEST_LARGE_CONTENT)
+
+    def tearDown(self):
+        shutil.rmtree(self.storage.location)
@@ -2,12 +2,15 @@ from __future__ import absolute_import
 
 from django.utils.translation import ugettext_lazy as _
 
+from django.contrib.contenttypes.models import ContentType
+
 from taggit.managers import TaggableManager
-from taggit.models import Tag
+from taggit.models import Tag, TaggedItem
 
 from acls.api import class_permissions
 from common.utils import encapsulate
 from documents.models import Document
+from dynamic_search.classes import SearchModel
 from navigation.api import (register_links, register_top_menu,
     register_model_list_columns, register_multi_item_links)
 from rest_api.classes import APIEndPoint
@@ -63,6 +66,9 @@ class_permissions(Tag, [
 
 Document.add_to_class('tags', TaggableManager())
 
+SearchModel.add_index_trigger_for('documents.Document', Tag, lambda instance: Document.objects.filter(tags=instance).values_list('pk', flat=True), background=True)
+SearchModel.add_index_trigger_for('documents.Document', TaggedItem, lambda instance: [instance.object_id] if instance.content_type == ContentType.objects.get_for_model(Document) else [])
+
 endpoint = APIEndPoint('tags')
 endpoint.register_urls(api_urls)
 endpoint.add_endpoint('tag-list', _(u'Returns a list of all the tags.'))